@@ -2,16 +2,34 @@
 import streamlit as st
 import os
 import json
+import logging
+import time
 from streamlit_ace import st_ace
 
 # Assuming these utility files exist and are correct
-from config import GEMINI_API_KEY
-from gemini_utils import generate_test_cases, generate_script
-from selenium_utils import scrape_url
-from execution_utils import execute_script_subprocess
-from reporting_utils import format_report
+from config import (
+    GEMINI_API_KEY, JOB_POLL_INTERVAL_SECONDS, METRICS_HOST, METRICS_PORT, REPORT_PAGE_SIZE,
+    SELECTOR_CHECK_ENABLED, SELECTOR_SKIP_DEAD_TESTS, HISTORY_ENABLED,
+)
+from gemini_utils import get_cache_stats, clear_cache, get_client_stats, get_routing_stats
+from selenium_utils import clear_scrape_cache, get_driver_pool
+from execution_utils import default_worker_count
+from reporting_utils import (
+    parse_execution_output, failed_test_ids, merge_rerun, build_report, log_page_count, read_log_page,
+    report_header_markdown, results_table_markdown, report_details_markdown, analysis_markdown, NO_RESULTS_NOTE,
+)
+from job_utils import get_job_manager, ACTIVE_STATUSES
+from notes_utils import is_problem
+from metrics_utils import get_metrics_registry, start_metrics_server
+from pipeline_utils import run_test_case_generation, run_script_generation, run_execution, check_selectors
+from preflight_utils import preflight_script, preflight_errors, format_issue
+from selector_utils import missing_selectors, format_locator
+from history_utils import get_run_history
+from testcase_utils import TestCaseSet, apply_editor_deltas, load_test_cases_json
 
 st.set_page_config(layout="wide", page_title="Auto Test Case Generator")
+# Driver pool, job store and metrics server diagnostics (module loggers) go to the console
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
 st.title("Auto Test Case Generator")
 st.markdown("Generate Selenium test scripts from requirements using AI, edit them, then run.")
@@ -22,39 +40,213 @@ if not GEMINI_API_KEY:
      st.warning("Please create a `.env` file with `GEMINI_API_KEY=YOUR_API_KEY` or set it system-wide.")
      st.stop()
 
-def apply_editor_deltas(base_data_list, editor_deltas_dict):
-    if not isinstance(base_data_list, list):
-        # st.warning("Base data for delta application is not a list.")
-        added_rows_val = editor_deltas_dict.get("added_rows", [])
-        return added_rows_val[:] if isinstance(added_rows_val, list) else []
-
-    current_rows_copy = [row.copy() for row in base_data_list]
-
-    deleted_indices = set(editor_deltas_dict.get("deleted_rows", []))
-    edited_row_instructions = editor_deltas_dict.get("edited_rows", {})
-    added_row_data = editor_deltas_dict.get("added_rows", [])
-
-    temp_rows_after_edits = []
-    for original_idx, row in enumerate(current_rows_copy):
-        if str(original_idx) in edited_row_instructions:
-            changes = edited_row_instructions[str(original_idx)]
-            if isinstance(changes, dict):
-                 row.update(changes)
-        temp_rows_after_edits.append(row)
-    
-    final_rows_after_deletes = []
-    for original_idx, row in enumerate(temp_rows_after_edits):
-        if original_idx not in deleted_indices:
-            final_rows_after_deletes.append(row)
-    
-    if isinstance(added_row_data, list):
-        for new_row in added_row_data:
-            if isinstance(new_row, dict):
-                final_rows_after_deletes.append(new_row.copy())
-            # else:
-                # st.warning(f"Encountered non-dictionary item in added_rows: {new_row}")
-    
-    return final_rows_after_deletes
+def load_generated_test_cases(test_cases_result_object):
+    """Puts a finished test case generation result into the editor state."""
+    if test_cases_result_object is not None and isinstance(test_cases_result_object, list):
+        st.session_state.test_cases_list_original = test_cases_result_object
+        # Converted once; the editor rows and JSON are derived (and memoized) from these records
+        st.session_state.test_case_set = TestCaseSet.from_test_cases(test_cases_result_object)
+        st.session_state.data_editor_base_data = st.session_state.test_case_set.editor_rows()
+
+        try:
+            st.session_state.test_cases_json_str = json.dumps(test_cases_result_object, indent=4)
+            st.session_state.json_generated_flag = True
+            st.success("Test cases generated successfully!")
+        except Exception as e:
+            st.error(f"Failed to format generated test cases as JSON string: {e}")
+            st.session_state.test_cases_json_str = str(test_cases_result_object)
+            st.session_state.json_generated_flag = True
+    elif test_cases_result_object is not None:
+        st.error("Generated test cases are not in the expected list format. Displaying raw output.")
+        st.session_state.test_cases_list_original = None
+        st.session_state.test_case_set = None
+        st.session_state.data_editor_base_data = None
+        st.session_state.test_cases_json_str = str(test_cases_result_object)
+        st.session_state.json_generated_flag = True
+    else:
+        st.error("Failed to generate test cases or result was empty.")
+        st.session_state.json_generated_flag = False
+
+def track_job(stage, job_id):
+    """Remembers the job for a stage in the session and the URL, so a browser refresh reattaches to it."""
+    st.session_state.jobs[stage] = job_id
+    if job_id:
+        st.query_params[f"{stage}_job"] = job_id
+    elif f"{stage}_job" in st.query_params:
+        del st.query_params[f"{stage}_job"]
+
+def show_job_progress(job):
+    """Renders a running job's stage list and elapsed time."""
+    elapsed = time.time() - (job.get('started_at') or job['created_at'])
+    if job['status'] == "queued":
+        st.info(f"Job `{job['id']}` is queued behind other runs...")
+        return
+    stage_marks = {"running": "⏳", "succeeded": "✅", "failed": "❌"}
+    stages = " → ".join(f"{stage_marks.get(info['status'], '')} {name}" for name, info in job['stages'].items())
+    st.info(f"Job `{job['id']}` running for {elapsed:.0f}s: {stages or 'starting'}")
+    for note in job['notes']:
+        st.caption(note)
+
+def show_job_notes(job):
+    """Shows a finished job's notes; warnings and errors reported by the pipeline stand out."""
+    for note in job['notes']:
+        if is_problem(note):
+            st.warning(note)
+        else:
+            st.caption(note)
+
+def script_checks(script, test_cases_json_str, url):
+    """Preflight issues and selector report for the script, kept until one of their inputs changes.
+
+    Job polls rerun the page about once a second, so the script is not re-parsed nor the DOM
+    index rebuilt unless the script, test cases, URL or scraped page structure changed.
+    """
+    key = (script, test_cases_json_str, url, st.session_state.page_structure_hash, SELECTOR_CHECK_ENABLED)
+    cached = st.session_state.script_checks
+    if cached is None or cached['key'] != key:
+        cached = st.session_state.script_checks = {
+            'key': key,
+            'preflight': preflight_script(script, load_test_cases_json(test_cases_json_str)),
+            'selectors': check_selectors(script, url) if SELECTOR_CHECK_ENABLED else None,
+        }
+    return cached
+
+def show_job_failure(job):
+    if job['status'] == "failed":
+        st.error(f"Job `{job['id']}` failed: {job['error']}")
+    elif job['status'] == "interrupted":
+        st.error(f"Job `{job['id']}` was interrupted: {job['error']}")
+    show_job_notes(job)
+
+with st.sidebar.expander("Gemini Response Cache"):
+    cache_stats = get_cache_stats()
+    if not cache_stats['enabled']:
+        st.caption("Cache is disabled (`GEMINI_CACHE_ENABLED=false`).")
+    st.write(f"Hits: {cache_stats['hits']} | Misses: {cache_stats['misses']} | Hit rate: {cache_stats['hit_rate']:.0%}")
+    st.write(f"Writes: {cache_stats['writes']} | Evictions: {cache_stats['evictions']}")
+    if st.button("Clear Cache", key="clear_gemini_cache"):
+        clear_cache()
+        st.success("Gemini response cache cleared.")
+
+with st.sidebar.expander("Gemini Client"):
+    client_stats = get_client_stats()
+    circuit_note = {"open": "🔴 open (failing fast)", "half-open": "🟡 half-open (probing)"}.get(client_stats['circuit'], "🟢 closed")
+    st.write(f"Circuit: {circuit_note}")
+    st.write(
+        f"Requests: {client_stats['requests']} | Retries: {client_stats['retries']} | "
+        f"Hedged: {client_stats['hedges']} (duplicate won {client_stats['hedge_wins']}) | "
+        f"Refused: {client_stats['circuit_rejections']}"
+    )
+    for model_name, p95 in client_stats['p95_seconds'].items():
+        if p95 is not None:
+            st.caption(f"{model_name}: p95 {p95:.1f}s")
+
+with st.sidebar.expander("Model Routing"):
+    routing_stats = get_routing_stats()
+    if not routing_stats['enabled']:
+        st.caption("Routing is disabled (`MODEL_ROUTING_ENABLED=false`); each stage uses its fixed model.")
+    st.write(f"Fast: {routing_stats['fast']} | Strong: {routing_stats['strong']} | Escalated: {routing_stats['escalations']}")
+    st.write(f"Saved ~{routing_stats['saved_seconds']:.0f}s | Wasted on escalations: {routing_stats['wasted_seconds']:.0f}s")
+    if routing_stats['recent']:
+        st.dataframe(
+            [{'task': entry['task'], 'tier': entry['tier'], 'outcome': entry['outcome'],
+              'prompt tokens': entry['prompt_tokens'], 'reason': entry['reason'],
+              'problem': next((a['problem'] for a in entry['attempts'] if a['problem']), ""),
+              'seconds': sum(a['seconds'] for a in entry['attempts'])}
+             for entry in reversed(routing_stats['recent'])],
+            use_container_width=True, hide_index=True,
+        )
+
+# Process-wide: the first session resolves chromedriver and pre-launches a headless browser
+driver_pool = get_driver_pool()
+
+with st.sidebar.expander("Page Scrape Cache"):
+    st.caption("Scraped pages are reused until they are older than the configured TTL.")
+    pool_stats = driver_pool.stats()
+    st.write(f"Browser pool: {pool_stats['idle']} idle / {pool_stats['total']} running (max {pool_stats['max_size']})")
+    if st.button("Clear Scrape Cache", key="clear_scrape_cache"):
+        clear_scrape_cache()
+        st.success("Scrape cache cleared.")
+
+job_manager = get_job_manager()
+
+with st.sidebar.expander("Background Jobs"):
+    job_stats = job_manager.stats()
+    st.write(f"Running: {job_stats['running']} | Queued: {job_stats['queued']}")
+    recent_jobs = job_manager.list_jobs(limit=10)
+    if recent_jobs:
+        st.dataframe(
+            [{'id': job['id'], 'kind': job['kind'], 'label': job['label'], 'status': job['status'], 'stage': job['stage']}
+             for job in recent_jobs],
+            use_container_width=True, hide_index=True,
+        )
+
+if METRICS_PORT:
+    start_metrics_server(METRICS_HOST, METRICS_PORT)
+metrics_registry = get_metrics_registry()
+
+with st.sidebar.expander("Latency Breakdown"):
+    metrics_snapshot = metrics_registry.snapshot()
+    if metrics_snapshot['stages']:
+        st.caption("Per-stage durations in this server process (p50/p95 over recent runs).")
+        st.dataframe(
+            [{'stage': row['stage'],
+              'labels': ", ".join(f"{name}={value}" for name, value in row['labels'].items()),
+              'count': row['count'],
+              'p50 s': round(row['p50_seconds'], 3),
+              'p95 s': round(row['p95_seconds'], 3),
+              'max s': round(row['max_seconds'], 3),
+              'total s': round(row['sum_seconds'], 1)}
+             for row in metrics_snapshot['stages']],
+            use_container_width=True, hide_index=True,
+        )
+    else:
+        st.caption("No stages timed yet.")
+    token_totals = {}
+    for row in metrics_snapshot['counters']:
+        token_totals[row['name']] = token_totals.get(row['name'], 0) + row['value']
+    if token_totals:
+        st.write(
+            f"Gemini tokens in: {token_totals.get('gemini_input_tokens', 0):,} | "
+            f"out: {token_totals.get('gemini_output_tokens', 0):,} | "
+            f"prompt chars: {token_totals.get('gemini_prompt_chars', 0):,}"
+        )
+    st.download_button("Prometheus metrics", metrics_registry.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+    st.download_button("JSON metrics", metrics_registry.to_json(), file_name="metrics.json", mime="application/json")
+    if METRICS_PORT:
+        st.caption(f"Also served at `:{METRICS_PORT}/metrics` and `/metrics.json`.")
+
+with st.sidebar.expander("Run History"):
+    if not HISTORY_ENABLED:
+        st.caption("History is disabled (`HISTORY_ENABLED=false`); tests run in their script order.")
+    else:
+        st.caption("Past runs order new ones (recent failures first, then longest first) and balance the workers.")
+        run_history = get_run_history()
+        recent_runs = run_history.recent_runs(limit=10)
+        if recent_runs:
+            st.dataframe(
+                [{'run': run['id'], 'script': run['script_hash'][:8],
+                  'when': time.strftime("%Y-%m-%d %H:%M", time.localtime(run['finished_at'])),
+                  'seconds': round(run['finished_at'] - run['started_at'], 1),
+                  'passed': run['passed'], 'failed': run['failed'], 'errored': run['errored'],
+                  'rerun': bool(run['rerun'])}
+                 for run in recent_runs],
+                use_container_width=True, hide_index=True,
+            )
+        else:
+            st.caption("No runs recorded yet.")
+        flaky = run_history.flaky_tests()
+        if flaky:
+            st.write(f"Flaky tests (status changed under an unchanged script): {len(flaky)}")
+            st.dataframe(
+                [{'test': entry['test_id'], 'script': entry['script_hash'][:8], 'runs': entry['runs'],
+                  'flips': entry['flips'], 'pass rate': f"{entry['pass_rate']:.0%}", 'last': entry['last_status']}
+                 for entry in flaky],
+                use_container_width=True, hide_index=True,
+            )
+        if st.button("Clear History", key="clear_run_history"):
+            run_history.clear()
+            st.success("Run history cleared.")
 
 default_requirement = "Users should be able to log in with valid credentials (student/Password123) and be redirected to the dashboard."
 default_url = "https://practicetestautomation.com/practice-test-login/"
@@ -65,6 +257,8 @@ if 'weburl' not in st.session_state:
     st.session_state.weburl = default_url
 if 'test_cases_list_original' not in st.session_state:
     st.session_state.test_cases_list_original = None
+if 'test_case_set' not in st.session_state:
+    st.session_state.test_case_set = None
 if 'data_editor_base_data' not in st.session_state:
     st.session_state.data_editor_base_data = None
 if 'test_cases_json_str' not in st.session_state:
@@ -83,6 +277,23 @@ if 'execution_stderr' not in st.session_state:
     st.session_state.execution_stderr = None
 if 'execution_exit_code' not in st.session_state:
     st.session_state.execution_exit_code = None
+if 'execution_parsed' not in st.session_state:
+    st.session_state.execution_parsed = None
+if 'execution_report' not in st.session_state:
+    st.session_state.execution_report = None
+if 'script_function_store' not in st.session_state:
+    st.session_state.script_function_store = {}
+if 'page_structure_hash' not in st.session_state:
+    st.session_state.page_structure_hash = None
+if 'script_checks' not in st.session_state:
+    st.session_state.script_checks = None
+if 'jobs' not in st.session_state:
+    # Job IDs are mirrored into the URL so a refreshed page picks its runs back up
+    st.session_state.jobs = {stage: st.query_params.get(f"{stage}_job") for stage in ("test_cases", "script", "execution")}
+if 'applied_jobs' not in st.session_state:
+    st.session_state.applied_jobs = set()
+
+current_jobs = {stage: job_manager.get(job_id) for stage, job_id in st.session_state.jobs.items()}
 
 st.subheader("1. Define Requirement & Target URL")
 st.session_state.requirement_text = st.text_area(
@@ -100,12 +311,15 @@ st.session_state.weburl = st.text_input(
 st.subheader("2. Generate Test Cases")
 if st.button("Generate Test Cases", key="generate_json", type="primary"):
     st.session_state.test_cases_list_original = None
+    st.session_state.test_case_set = None
     st.session_state.data_editor_base_data = None
     st.session_state.test_cases_json_str = None
     st.session_state.python_script = None
     st.session_state.execution_stdout = None
     st.session_state.execution_stderr = None
     st.session_state.execution_exit_code = None
+    st.session_state.execution_parsed = None
+    st.session_state.execution_report = None
     st.session_state.json_generated_flag = False
     st.session_state.script_generated = False
     st.session_state.data_editor_active_display_flag = False
@@ -120,37 +334,32 @@ if st.button("Generate Test Cases", key="generate_json", type="primary"):
     if not req_text or not url_text:
         st.warning("Please provide both the requirement description and the target URL.")
     else:
-        with st.spinner("Generating Test Cases via Gemini... This may take a minute."):
-            test_cases_result_object = generate_test_cases(req_text, GEMINI_API_KEY)
-
-            if test_cases_result_object is not None and isinstance(test_cases_result_object, list):
-                st.session_state.test_cases_list_original = test_cases_result_object
-                data_for_editor_display_initial = []
-                for tc in test_cases_result_object:
-                    if not isinstance(tc, dict): continue
-                    editable_tc = tc.copy()
-                    editable_tc['preconditions_edit'] = "\n".join(tc.get('preconditions', []) if isinstance(tc.get('preconditions'), list) else [])
-                    editable_tc['steps_edit'] = "\n".join(tc.get('steps', []) if isinstance(tc.get('steps'), list) else [])
-                    data_for_editor_display_initial.append(editable_tc)
-                st.session_state.data_editor_base_data = data_for_editor_display_initial
-                
-                try:
-                    st.session_state.test_cases_json_str = json.dumps(test_cases_result_object, indent=4)
-                    st.session_state.json_generated_flag = True
-                    st.success("Test cases generated successfully!")
-                except Exception as e:
-                    st.error(f"Failed to format generated test cases as JSON string: {e}")
-                    st.session_state.test_cases_json_str = str(test_cases_result_object)
-                    st.session_state.json_generated_flag = True
-            elif test_cases_result_object is not None:
-                st.error("Generated test cases are not in the expected list format. Displaying raw output.")
-                st.session_state.test_cases_list_original = None
-                st.session_state.data_editor_base_data = None
-                st.session_state.test_cases_json_str = str(test_cases_result_object)
-                st.session_state.json_generated_flag = True
-            else:
-                st.error("Failed to generate test cases or result was empty.")
-                st.session_state.json_generated_flag = False
+        track_job("script", None)
+        track_job("execution", None)
+        job_id = job_manager.submit(
+            "test_cases", run_test_case_generation, req_text, GEMINI_API_KEY, label=url_text
+        )
+        track_job("test_cases", job_id)
+        st.rerun()
+
+test_cases_job = current_jobs["test_cases"]
+if test_cases_job:
+    if test_cases_job['status'] in ACTIVE_STATUSES:
+        show_job_progress(test_cases_job)
+        st.caption("Rows appear as soon as they are ready.")
+        if test_cases_job['partial_results']:
+            st.dataframe(
+                test_cases_job['partial_results'],
+                column_order=["id", "description", "test_type", "expected_outcome"],
+                use_container_width=True,
+            )
+    elif test_cases_job['status'] == "succeeded":
+        show_job_notes(test_cases_job)
+        if test_cases_job['id'] not in st.session_state.applied_jobs:
+            st.session_state.applied_jobs.add(test_cases_job['id'])
+            load_generated_test_cases(test_cases_job['result'])
+    else:
+        show_job_failure(test_cases_job)
 
 if st.session_state.json_generated_flag and isinstance(st.session_state.get('data_editor_base_data'), list):
     st.subheader("Review & Edit Test Cases")
@@ -166,7 +375,6 @@ if st.session_state.json_generated_flag and isinstance(st.session_state.get('dat
             "expected_outcome": st.column_config.TextColumn("Expected Outcome", width="large", required=True),
             "test_type": st.column_config.SelectboxColumn("Test Type", width="medium",
                 options=["Functional", "UI", "Negative", "Security", "Performance", "Usability", "Accessibility", "Edge Case", "Boundary", "Other"], required=True),
-            "preconditions": None, "steps": None,
         },
         num_rows="dynamic", use_container_width=True, height=max(350, len(st.session_state.data_editor_base_data) * 55 + 55) if st.session_state.data_editor_base_data else 350
     )
@@ -179,103 +387,96 @@ elif st.session_state.json_generated_flag and not isinstance(st.session_state.ge
     st.session_state.data_editor_active_display_flag = False
 
 
+def show_log(report, name, title):
+    """Head/tail preview of one of the run's logs; the full log is read from disk a page at a time only when asked for."""
+    log = report.logs[name]
+    with st.expander(f"{title} - {log['lines']:,} lines, {log['bytes'] / 1024:,.1f} KB"):
+        if not log['head']:
+            st.caption("Nothing captured.")
+            return
+        st.code(log['head'], language=None)
+        if log['tail']:
+            st.caption(f"... {log['omitted_lines']:,} lines omitted ...")
+            st.code(log['tail'], language=None)
+        if log['path'] is None or not st.toggle("Browse the full log", key=f"browse_{name}_{report.report_id}"):
+            return
+        pages = log_page_count(log)
+        page = 1
+        if pages > 1:
+            page = st.number_input(f"Page (of {pages})", 1, pages, 1, key=f"{name}_page_{report.report_id}")
+        try:
+            st.code(read_log_page(log['path'], page), language=None)
+            with open(log['path'], 'rb') as log_file:
+                st.download_button(f"Download {name}.log", log_file, file_name=f"{name}.log", key=f"download_{name}_{report.report_id}")
+        except OSError:
+            st.warning("The full log is no longer on disk; older reports are pruned.")
+
+def show_execution_report(report):
+    """Renders a run's ExecutionReport; the cost stays the same however large its logs or result list."""
+    st.markdown(report_header_markdown(report), unsafe_allow_html=True)
+    st.markdown("---")
+    if report.results:
+        st.markdown("### Individual Test Case Results")
+        only_failed = st.toggle(
+            f"Only failed/errored ({len(report.not_passed)})", False,
+            key=f"only_failed_{report.report_id}", disabled=not report.not_passed
+        )
+        pages = report.page_count(only_failed=only_failed)
+        page = 1
+        if pages > 1:
+            page = st.number_input(
+                f"Page (of {pages}, {REPORT_PAGE_SIZE} results each)", 1, pages, 1,
+                key=f"results_page_{report.report_id}_{only_failed}"
+            )
+        st.markdown(
+            results_table_markdown(report.results_page(page, only_failed=only_failed), report.show_duration),
+            unsafe_allow_html=True
+        )
+        st.download_button(
+            "Download results (JSON)", json.dumps(report.results, indent=2), file_name="results.json",
+            mime="application/json", key=f"download_results_{report.report_id}"
+        )
+    else:
+        st.markdown(NO_RESULTS_NOTE)
+    details = report_details_markdown(report)
+    if details:
+        st.markdown(details, unsafe_allow_html=True)
+    st.markdown("---")
+    show_log(report, "stdout", "Standard Output (`stdout`)")
+    show_log(report, "stderr", "Standard Error (`stderr`)")
+    st.markdown(analysis_markdown(report), unsafe_allow_html=True)
+
 if st.session_state.json_generated_flag:
     st.subheader("3. Generate Python Script")
+    force_refresh_scrape = st.checkbox(
+        "Force refresh page scrape", value=False, key="force_refresh_scrape",
+        help="Ignore the cached page snapshot and load the target URL in a fresh browser."
+    )
     if st.button("Generate Python Script", key="generate_script_btn"):
         st.session_state.python_script = None
         st.session_state.script_generated = False
         st.session_state.execution_stdout = None
         st.session_state.execution_stderr = None
         st.session_state.execution_exit_code = None
+        st.session_state.execution_parsed = None
+        st.session_state.execution_report = None
 
         url_text = st.session_state.weburl
-        processed_test_cases_for_script = [] 
-        source_data_for_transformation = []
-
-        # st.write("--- Debug Info: Inside 'Generate Python Script' ---")
-        # st.write(f"1. `st.session_state.data_editor_active_display_flag`: {st.session_state.get('data_editor_active_display_flag')}")
-        
+        # Only the rows touched in the editor are converted; the rest reuse the loaded records
+        base_test_cases = st.session_state.get('test_case_set')
+        if base_test_cases is None and isinstance(st.session_state.get('test_cases_list_original'), list):
+            base_test_cases = TestCaseSet.from_test_cases(st.session_state.test_cases_list_original)
+        edited_test_cases = None
         editor_content_raw = st.session_state.get('data_editor_content')
-        editor_content_exists = editor_content_raw is not None
-        # st.write(f"2. `'data_editor_content' exists`: {editor_content_exists}")
-        
-        # if editor_content_exists:
-            # st.write(f"3. `st.session_state.data_editor_content` (Type: {type(editor_content_raw)}):")
-            # try:
-            #     st.json(editor_content_raw)
-            # except Exception as ex:
-            #     st.text(str(editor_content_raw))
-        # else:
-            # st.write("3. `st.session_state.data_editor_content` not found.")
-
-        # st.write(f"4. `st.session_state.data_editor_base_data` (Type: {type(st.session_state.get('data_editor_base_data'))}):")
-        # st.json(st.session_state.get('data_editor_base_data', "Not set")) # Can be large
-
-        if st.session_state.get('data_editor_active_display_flag', False) and editor_content_exists:
-            if isinstance(editor_content_raw, dict):
-                # st.write("Processing DELTA structure from `data_editor_content`.")
-                base_data = st.session_state.get('data_editor_base_data', [])
-                if base_data is None: base_data = [] 
-                source_data_for_transformation = apply_editor_deltas(base_data, editor_content_raw)
-                # st.write(f"Data after applying deltas: {len(source_data_for_transformation)} rows.")
+        if st.session_state.get('data_editor_active_display_flag', False) and editor_content_raw is not None:
+            if isinstance(editor_content_raw, dict) and base_test_cases is not None:
+                edited_test_cases = apply_editor_deltas(base_test_cases, editor_content_raw)
             elif isinstance(editor_content_raw, list):
-                # st.write("Processing LIST structure from `data_editor_content` (unexpected based on logs).")
-                source_data_for_transformation = editor_content_raw
-            # else:
-                # st.warning("`data_editor_content` is not a recognized dict (deltas) or list. Trying fallback.")
-        
-        if not source_data_for_transformation:
-            # st.write("Editor data not used or resulted in no cases. Attempting to use original formatted base data.")
-            base_data_for_fallback = st.session_state.get('data_editor_base_data')
-            if isinstance(base_data_for_fallback, list):
-                source_data_for_transformation = base_data_for_fallback
-                # st.write(f"Using `data_editor_base_data` directly. Found {len(source_data_for_transformation)} cases.")
-            else:
-                # st.write("`data_editor_base_data` not usable. Attempting `test_cases_list_original`.")
-                original_gemini_output = st.session_state.get('test_cases_list_original')
-                if isinstance(original_gemini_output, list):
-                    temp_formatted_list = []
-                    for tc in original_gemini_output:
-                        if not isinstance(tc, dict): continue
-                        editable_tc = tc.copy()
-                        editable_tc['preconditions_edit'] = "\n".join(tc.get('preconditions', []) if isinstance(tc.get('preconditions'), list) else [])
-                        editable_tc['steps_edit'] = "\n".join(tc.get('steps', []) if isinstance(tc.get('steps'), list) else [])
-                        temp_formatted_list.append(editable_tc)
-                    source_data_for_transformation = temp_formatted_list
-                    # st.write(f"Using formatted `test_cases_list_original`. Found {len(source_data_for_transformation)} cases.")
-                # else:
-                    # st.write("No valid source data found for transformation.")
-                    # source_data_for_transformation = []
-
-        if isinstance(source_data_for_transformation, list):
-            for i, editor_row_dict in enumerate(source_data_for_transformation):
-                if not isinstance(editor_row_dict, dict):
-                    # st.warning(f"Skipping non-dictionary item #{i} during final transformation: {editor_row_dict}")
-                    continue
-                
-                final_tc = {}
-                final_tc['id'] = str(editor_row_dict.get('id', f"TC_AutoGen_ID_{len(processed_test_cases_for_script)+1}"))
-                final_tc['description'] = str(editor_row_dict.get('description', 'N/A'))
-                final_tc['test_type'] = str(editor_row_dict.get('test_type', 'Functional'))
-                final_tc['expected_outcome'] = str(editor_row_dict.get('expected_outcome', 'N/A'))
-                
-                preconditions_str = editor_row_dict.get('preconditions_edit', '')
-                final_tc['preconditions'] = [p.strip() for p in str(preconditions_str).split('\n') if p.strip()]
-                
-                steps_str = editor_row_dict.get('steps_edit', '')
-                final_tc['steps'] = [s.strip() for s in str(steps_str).split('\n') if s.strip()]
-                
-                for key, value in editor_row_dict.items():
-                    if key not in final_tc and not key.endswith('_edit') and key not in ['preconditions', 'steps']:
-                        final_tc[key] = value
-                processed_test_cases_for_script.append(final_tc)
-            # st.write(f"Final transformation complete. {len(processed_test_cases_for_script)} test cases prepared for script generation.")
-        # else:
-            # st.error("Source data for transformation was not a list. Cannot proceed.")
-            # processed_test_cases_for_script = []
-
-
-        # st.write(f"Final check: `processed_test_cases_for_script` has {len(processed_test_cases_for_script)} items.")
+                edited_test_cases = TestCaseSet.from_editor_rows(editor_content_raw)
+        if not edited_test_cases: # Nothing usable from the editor: fall back to the generated test cases
+            edited_test_cases = base_test_cases
+        processed_test_cases_for_script = edited_test_cases.to_dicts() if edited_test_cases else []
+
         if not processed_test_cases_for_script:
             st.error("No valid test cases available to generate a script.")
             st.session_state.test_cases_json_str = "[]"
@@ -284,27 +485,47 @@ if st.session_state.json_generated_flag:
             # st.json(processed_test_cases_for_script[0])
             # st.write("--- End Debug ---")
             try:
-                st.session_state.test_cases_json_str = json.dumps(processed_test_cases_for_script, indent=4)
+                st.session_state.test_cases_json_str = edited_test_cases.to_json()
             except Exception as e:
                 st.error(f"Error serializing final test cases for display: {e}")
 
-            with st.spinner("🕸️ Scraping target URL & Generating Selenium Script..."):
-                html_content = scrape_url(url_text)
-                if html_content:
-                    html_excerpt = html_content[:75000]
-                    script_result = generate_script(
-                        processed_test_cases_for_script, url_text, html_excerpt, GEMINI_API_KEY
-                    )
-                    st.session_state.python_script = script_result
-                    if st.session_state.python_script:
-                        st.success("Python script generated successfully!")
-                        st.session_state.script_generated = True
-                    else:
-                        st.error("Failed to generate Python script.")
-                        st.session_state.script_generated = False
-                else:
-                    st.error("Failed to scrape target URL.")
-                    st.session_state.script_generated = False
+            track_job("execution", None)
+            job_id = job_manager.submit(
+                "script", run_script_generation, processed_test_cases_for_script, url_text, GEMINI_API_KEY,
+                dict(st.session_state.script_function_store), force_refresh=force_refresh_scrape, label=url_text
+            )
+            track_job("script", job_id)
+            st.rerun()
+
+    script_job = current_jobs["script"]
+    if script_job:
+        if script_job['status'] in ACTIVE_STATUSES:
+            show_job_progress(script_job)
+        elif script_job['status'] == "succeeded":
+            page = script_job['result']['page']
+            fetched_ago = time.time() - page['fetched_at']
+            readiness = page.get('readiness') or {}
+            settle_note = ""
+            if readiness.get('settled_ms') is not None:
+                settle_note = f", {'gave up waiting' if readiness.get('timed_out') else 'settled'} after {readiness['settled_ms']} ms"
+            st.caption(
+                f"Page snapshot {page['content_hash'][:12]} "
+                f"({'cached, ' if page['from_cache'] else ''}fetched {fetched_ago:.0f}s ago{settle_note})"
+            )
+            show_job_notes(script_job)
+            if script_job['id'] not in st.session_state.applied_jobs:
+                st.session_state.applied_jobs.add(script_job['id'])
+                st.session_state.python_script = script_job['result']['script']
+                # The job worked on a copy; its updated store replaces the session's here, on the script thread
+                st.session_state.script_function_store = dict(script_job['result'].get('function_store') or {})
+                st.session_state.page_structure_hash = page.get('structure_hash')
+                st.session_state.test_cases_json_str = json.dumps(script_job['result']['test_cases'], indent=4)
+                st.session_state.script_generated = True
+                if "ace_editor" in st.session_state:
+                    del st.session_state.ace_editor
+                st.success("Python script generated successfully!")
+        else:
+            show_job_failure(script_job)
 
 if st.session_state.script_generated and st.session_state.python_script is not None:
     st.subheader("✏️ Review & Edit Python Script")
@@ -320,24 +541,126 @@ if st.session_state.script_generated and st.session_state.python_script is not N
 if st.session_state.script_generated:
     st.subheader("4. Execute Tests")
     headless_mode = st.toggle("Run in Headless Mode", True, key="headless_toggle")
+    parallel_mode = st.toggle("Run tests in parallel", True, key="parallel_toggle",
+                              help="Splits the test functions across worker processes, each with its own browser.")
+    worker_count = st.number_input(
+        "Worker processes", min_value=1, max_value=64, value=min(default_worker_count(), 64),
+        key="worker_count", disabled=not parallel_mode
+    )
+    # Static checks take milliseconds, so they run after every edit instead of after a browser starts
+    checks = script_checks(st.session_state.python_script, st.session_state.test_cases_json_str, st.session_state.weburl)
+    preflight_issues = checks['preflight']
+    blocking_issues = preflight_errors(preflight_issues)
+    for issue in preflight_issues:
+        (st.error if issue['level'] == "error" else st.warning)(f"Preflight: {format_issue(issue)}")
+    run_anyway = False
+    if blocking_issues:
+        run_anyway = st.checkbox("Run anyway despite preflight errors", False, key="preflight_override")
+
+    skip_dead_selectors = False
+    selector_report = checks['selectors']
+    if selector_report is not None:
+        dead_selectors = missing_selectors(selector_report)
+        selector_counts = selector_report['counts']
+        with st.expander(
+            f"Selector check: {selector_counts['found']} found, {selector_counts['missing']} missing, "
+            f"{selector_counts['unverified']} unverified", expanded=bool(dead_selectors)
+        ):
+            st.caption("Locators are resolved against the scraped page. Lookups after a click, submit or navigation can't be checked offline.")
+            for function_name, locators in dead_selectors.items():
+                st.warning(f"{function_name}: not on the page: {', '.join(map(format_locator, locators))}")
+            st.dataframe([
+                {'function': function_name, 'locator': format_locator(locator), 'status': locator['status'], 'reason': locator['reason']}
+                for function_name, locators in selector_report['functions'].items() for locator in locators
+            ], use_container_width=True)
+        skip_dead_selectors = st.toggle(
+            "Skip tests with dead selectors", SELECTOR_SKIP_DEAD_TESTS, key="skip_dead_selectors_toggle",
+            help="Reports them as ERROR straight away instead of waiting for each lookup to time out.",
+            disabled=not dead_selectors
+        )
     if st.button("🚀 Run Generated Script", key="run_script"):
          st.session_state.execution_stdout = None
          st.session_state.execution_stderr = None
          st.session_state.execution_exit_code = None
+         st.session_state.execution_parsed = None
+         st.session_state.execution_report = None
          script_to_run = st.session_state.python_script
          if not script_to_run:
              st.error("Cannot run an empty script.")
+         elif blocking_issues and not run_anyway:
+             st.error("Fix the preflight errors above (or tick 'Run anyway') before running the script.")
          else:
-             with st.spinner("Executing script... Please wait."):
-                stdout, stderr, exit_code = execute_script_subprocess(script_to_run, headless_mode)
-                st.session_state.execution_stdout = stdout
-                st.session_state.execution_stderr = stderr
-                st.session_state.execution_exit_code = exit_code
+             job_id = job_manager.submit(
+                 "execution", run_execution, script_to_run, headless_mode,
+                 parallel=parallel_mode, workers=int(worker_count), test_cases=load_test_cases_json(st.session_state.test_cases_json_str),
+                 allow_preflight_errors=run_anyway, url=st.session_state.weburl,
+                 skip_dead_selectors=skip_dead_selectors, label=st.session_state.weburl
+             )
+             track_job("execution", job_id)
+             st.rerun()
 
-if st.session_state.execution_exit_code is not None:
+    previous_failures = failed_test_ids(st.session_state.execution_parsed.results) if st.session_state.execution_parsed else []
+    if previous_failures and st.button(
+        f"🔁 Rerun Failed/Errored Tests ({len(previous_failures)})", key="rerun_failed",
+        help="Runs only the tests that did not pass with the current script; their new results replace the old ones in the report."
+    ):
+        if blocking_issues and not run_anyway:
+            st.error("Fix the preflight errors above (or tick 'Run anyway') before running the script.")
+        else:
+            job_id = job_manager.submit(
+                "execution", run_execution, st.session_state.python_script, headless_mode,
+                parallel=parallel_mode, workers=int(worker_count), test_cases=load_test_cases_json(st.session_state.test_cases_json_str),
+                allow_preflight_errors=run_anyway, url=st.session_state.weburl,
+                skip_dead_selectors=skip_dead_selectors, test_ids=previous_failures,
+                label=f"{st.session_state.weburl} (rerun)"
+            )
+            track_job("execution", job_id)
+            st.rerun()
+
+    execution_job = current_jobs["execution"]
+    if execution_job:
+        if execution_job['status'] in ACTIVE_STATUSES:
+            show_job_progress(execution_job)
+            live_results = execution_job['partial_results']
+            statuses = [r['status'] for r in live_results]
+            st.markdown(
+                f"**Completed:** {len(live_results)} &nbsp; "
+                f"**Passed:** {statuses.count('PASS')} &nbsp; "
+                f"**Failed:** {statuses.count('FAIL')} &nbsp; "
+                f"**Errored:** {len(statuses) - statuses.count('PASS') - statuses.count('FAIL')}",
+                unsafe_allow_html=True
+            )
+            if live_results:
+                st.dataframe(live_results, use_container_width=True)
+        elif execution_job['status'] == "succeeded":
+            show_job_notes(execution_job)
+            if execution_job['id'] not in st.session_state.applied_jobs:
+                st.session_state.applied_jobs.add(execution_job['id'])
+                result = execution_job['result']
+                run = {
+                    'stdout': result['stdout'], 'stderr': result['stderr'], 'exit_code': result['exit_code'],
+                    'parsed': parse_execution_output(result['stdout'], result['records']),
+                }
+                if result.get('test_ids') is not None and st.session_state.execution_parsed is not None:
+                    run = merge_rerun({
+                        'stdout': st.session_state.execution_stdout, 'stderr': st.session_state.execution_stderr,
+                        'exit_code': st.session_state.execution_exit_code, 'parsed': st.session_state.execution_parsed,
+                    }, run)
+                st.session_state.execution_stdout = run['stdout']
+                st.session_state.execution_stderr = run['stderr']
+                st.session_state.execution_exit_code = run['exit_code']
+                st.session_state.execution_parsed = run['parsed']
+                # Built once per run: reruns of the page only render it
+                st.session_state.execution_report = build_report(run['stdout'], run['stderr'], run['exit_code'], run['parsed'])
+        else:
+            show_job_failure(execution_job)
+
+if st.session_state.execution_report is not None:
     st.subheader("Execution Report")
     st.markdown("---")
-    report_md = format_report(
-        st.session_state.execution_stdout, st.session_state.execution_stderr, st.session_state.execution_exit_code
-    )
-    st.markdown(report_md, unsafe_allow_html=True)
\ No newline at end of file
+    show_execution_report(st.session_state.execution_report)
+
+# Poll instead of blocking: re-render while any of this session's jobs is still in flight
+if any(job and job['status'] in ACTIVE_STATUSES for job in current_jobs.values()):
+    time.sleep(JOB_POLL_INTERVAL_SECONDS)
+    st.rerun()
@@ -0,0 +1,241 @@
+"""Runs the generate -> scrape -> script -> execute pipeline for many requirements without the UI.
+
+Usage:
+    python batch.py items.jsonl [--output batch_runs/nightly] [--llm-concurrency 4]
+                    [--browser-concurrency 4] [--execution-concurrency 2] [--execution-workers 1]
+
+Each input line is a JSON object with ``requirement`` and ``url`` (and an optional ``id``).
+Every item gets a directory with test_cases.json, script.py, stdout.log, stderr.log,
+results.json and report.md; summary.json aggregates the whole batch and metrics.json /
+metrics.prom hold the per-stage latency and token metrics.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from config import (
+    GEMINI_API_KEY, BATCH_LLM_CONCURRENCY, BATCH_BROWSER_CONCURRENCY, BATCH_EXECUTION_CONCURRENCY,
+    SELECTOR_SKIP_DEAD_TESTS,
+)
+from metrics_utils import get_metrics_registry
+from pipeline_utils import run_test_case_generation, run_script_generation, run_execution
+from reporting_utils import format_report, parse_execution_output
+
+# Which concurrency limit each pipeline stage draws from
+STAGE_LIMITS = {
+    'generate_test_cases': 'llm',
+    'generate_script': 'llm',
+    'scrape': 'browser',
+    'execute': 'execution',
+}
+
+
+class BatchItemContext:
+    """Job context for one batch item: stages wait for their resource's semaphore and are timed."""
+
+    def __init__(self, item_id, semaphores, log):
+        self.item_id = item_id
+        self.semaphores = semaphores
+        self.log = log
+        self.stages = {}
+        self.notes = []
+
+    @contextmanager
+    def stage(self, name):
+        semaphore = self.semaphores.get(STAGE_LIMITS.get(name))
+        waited_from = time.monotonic()
+        if semaphore is not None:
+            semaphore.acquire()
+        started = time.monotonic()
+        self.stages[name] = {'status': "running", 'wait_seconds': round(started - waited_from, 3)}
+        self.log(f"[{self.item_id}] {name} started")
+        try:
+            yield
+        except Exception:
+            self.stages[name]['status'] = "failed"
+            raise
+        else:
+            self.stages[name]['status'] = "succeeded"
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+            self.stages[name]['seconds'] = round(time.monotonic() - started, 3)
+            self.log(f"[{self.item_id}] {name} {self.stages[name]['status']} in {self.stages[name]['seconds']}s")
+
+    def add_result(self, result):
+        pass # Results are written once the stage finishes
+
+    def note(self, message):
+        self.notes.append(message)
+
+
+def _item_id(item, index):
+    raw_id = str(item.get('id') or f"item-{index + 1:04d}") if isinstance(item, dict) else f"item-{index + 1:04d}"
+    return re.sub(r"[^\w.-]", "_", raw_id)
+
+
+def _write(directory, name, content):
+    with open(os.path.join(directory, name), 'w', encoding='utf-8') as artifact:
+        artifact.write(content)
+
+
+def load_items(path):
+    """Reads the JSONL input; malformed lines become items carrying an ``error``."""
+    items = []
+    with open(path, 'r', encoding='utf-8') as items_file:
+        for line_number, line in enumerate(items_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                items.append({'error': f"Line {line_number} is not valid JSON: {e}"})
+                continue
+            if not isinstance(item, dict) or not item.get('requirement') or not item.get('url'):
+                items.append({'error': f"Line {line_number} needs both 'requirement' and 'url'."})
+                continue
+            items.append(item)
+    return items
+
+
+def run_item(item, item_id, output_dir, semaphores, args, log):
+    """Runs one item through the whole pipeline and writes its artifacts. Returns its summary row."""
+    item_dir = os.path.join(output_dir, item_id)
+    os.makedirs(item_dir, exist_ok=True)
+    context = BatchItemContext(item_id, semaphores, log)
+    summary = {'id': item_id, 'url': item.get('url'), 'status': "failed", 'error': item.get('error')}
+    started = time.monotonic()
+    try:
+        if summary['error']:
+            raise ValueError(summary['error'])
+
+        test_cases = run_test_case_generation(context, item['requirement'], GEMINI_API_KEY)
+        _write(item_dir, "test_cases.json", json.dumps(test_cases, indent=4))
+
+        script_result = run_script_generation(
+            context, test_cases, item['url'], GEMINI_API_KEY, {}, force_refresh=args.force_refresh
+        )
+        _write(item_dir, "script.py", script_result['script'])
+
+        execution = run_execution(
+            context, script_result['script'], not args.headed,
+            parallel=args.execution_workers > 1, workers=args.execution_workers, test_cases=test_cases,
+            url=item['url'], skip_dead_selectors=args.skip_dead_selectors,
+        )
+        parsed = parse_execution_output(execution['stdout'], execution['records'])
+        _write(item_dir, "stdout.log", execution['stdout'])
+        _write(item_dir, "stderr.log", execution['stderr'])
+        _write(item_dir, "results.json", json.dumps({
+            'exit_code': execution['exit_code'],
+            'summary': parsed.summary,
+            'results': parsed.results,
+            'problems': parsed.problems,
+            'selectors': execution['selectors'],
+        }, indent=4))
+        _write(item_dir, "report.md", format_report(
+            execution['stdout'], execution['stderr'], execution['exit_code'], parsed=parsed
+        ))
+
+        statuses = [result['status'] for result in parsed.results]
+        summary.update({
+            'status': "completed",
+            'exit_code': execution['exit_code'],
+            'tests': len(statuses),
+            'passed': statuses.count("PASS"),
+            'failed': statuses.count("FAIL"),
+            'errored': len(statuses) - statuses.count("PASS") - statuses.count("FAIL"),
+        })
+    except Exception as e:
+        summary['error'] = str(e) or type(e).__name__
+        _write(item_dir, "error.log", traceback.format_exc())
+        log(f"[{item_id}] failed: {summary['error']}")
+    summary['failed_stage'] = next((name for name, info in context.stages.items() if info['status'] == "failed"), None)
+    summary['stages'] = context.stages
+    summary['notes'] = context.notes
+    summary['seconds'] = round(time.monotonic() - started, 3)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("items", help="JSONL file with one {requirement, url} object per line")
+    parser.add_argument("--output", default=os.path.join("batch_runs", time.strftime("%Y%m%d-%H%M%S")))
+    parser.add_argument("--llm-concurrency", type=int, default=BATCH_LLM_CONCURRENCY)
+    parser.add_argument("--browser-concurrency", type=int, default=BATCH_BROWSER_CONCURRENCY)
+    parser.add_argument("--execution-concurrency", type=int, default=BATCH_EXECUTION_CONCURRENCY)
+    parser.add_argument("--execution-workers", type=int, default=1,
+                        help="worker processes per execution (1 runs the script serially)")
+    parser.add_argument("--force-refresh", action="store_true", help="ignore cached page snapshots")
+    parser.add_argument("--headed", action="store_true", help="show the test browsers")
+    parser.add_argument("--skip-dead-selectors", action="store_true", default=SELECTOR_SKIP_DEAD_TESTS,
+                        help="report tests whose selectors are not on the scraped page as ERROR without running them")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s", datefmt="%H:%M:%S")
+
+    if not GEMINI_API_KEY:
+        print("GEMINI_API_KEY is not set.", file=sys.stderr)
+        return 2
+
+    items = load_items(args.items)
+    os.makedirs(args.output, exist_ok=True)
+    semaphores = {
+        'llm': threading.BoundedSemaphore(max(1, args.llm_concurrency)),
+        'browser': threading.BoundedSemaphore(max(1, args.browser_concurrency)),
+        'execution': threading.BoundedSemaphore(max(1, args.execution_concurrency)),
+    }
+    log_lock = threading.Lock()
+
+    def log(message):
+        with log_lock:
+            print(f"{time.strftime('%H:%M:%S')} {message}", flush=True)
+
+    # Enough item threads to keep every stage's limit saturated; the semaphores do the throttling
+    item_threads = max(1, args.llm_concurrency + args.browser_concurrency + args.execution_concurrency)
+    started = time.monotonic()
+    item_ids = []
+    for index, item in enumerate(items):
+        item_id = _item_id(item, index)
+        if item_id in item_ids:
+            item_id = f"{item_id}-{index + 1}" # Keep artifact directories apart
+        item_ids.append(item_id)
+    with ThreadPoolExecutor(max_workers=item_threads) as pool:
+        summaries = list(pool.map(
+            lambda pair: run_item(pair[0], pair[1], args.output, semaphores, args, log), zip(items, item_ids)
+        ))
+
+    totals = {
+        'items': len(summaries),
+        'completed': sum(1 for s in summaries if s['status'] == "completed"),
+        'failed': sum(1 for s in summaries if s['status'] != "completed"),
+        'tests': sum(s.get('tests', 0) for s in summaries),
+        'passed': sum(s.get('passed', 0) for s in summaries),
+        'failed_tests': sum(s.get('failed', 0) for s in summaries),
+        'errored_tests': sum(s.get('errored', 0) for s in summaries),
+        'seconds': round(time.monotonic() - started, 3),
+    }
+    with open(os.path.join(args.output, "summary.json"), 'w', encoding='utf-8') as summary_file:
+        json.dump({'totals': totals, 'items': summaries}, summary_file, indent=4)
+    metrics_registry = get_metrics_registry()
+    _write(args.output, "metrics.json", metrics_registry.to_json())
+    _write(args.output, "metrics.prom", metrics_registry.to_prometheus())
+
+    print(f"\n{'item':<24} {'status':<10} {'tests':>5} {'pass':>5} {'fail':>5} {'error':>5} {'secs':>8}  note")
+    for s in summaries:
+        note = f"{s['failed_stage'] or 'input'}: {s['error']}" if s['status'] != "completed" else ""
+        print(f"{s['id']:<24} {s['status']:<10} {s.get('tests', 0):>5} {s.get('passed', 0):>5} "
+              f"{s.get('failed', 0):>5} {s.get('errored', 0):>5} {s['seconds']:>8.1f}  {note}")
+    print(f"\n{totals['completed']}/{totals['items']} items completed, {totals['passed']}/{totals['tests']} tests passed "
+          f"in {totals['seconds']:.1f}s. Artifacts: {os.path.abspath(args.output)}")
+    return 0 if totals['failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Benchmarks the lenient JSON extractor against the previous regex cleanup pipeline.
+
+Run from the repository root:
+    python benchmarks/bench_json_extraction.py [--sizes 1000 5000 10000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_utils import extract_json_objects
+
+
+def legacy_clean_and_parse(raw_response):
+    """The fence-strip / find / re.sub / json.loads chain previously used by generate_test_cases."""
+    cleaned_response = raw_response.strip()
+    if cleaned_response.startswith("```json"):
+        cleaned_response = cleaned_response[7:]
+        if cleaned_response.endswith("```"):
+            cleaned_response = cleaned_response[:-3]
+    elif cleaned_response.startswith("```"):
+        cleaned_response = cleaned_response[3:]
+        if cleaned_response.endswith("```"):
+            cleaned_response = cleaned_response[:-3]
+    cleaned_response = cleaned_response.strip()
+
+    json_start_index = cleaned_response.find('[')
+    json_end_index = cleaned_response.rfind(']')
+    if json_start_index != -1 and json_end_index != -1 and json_start_index < json_end_index:
+        cleaned_response = cleaned_response[json_start_index : json_end_index + 1]
+    else:
+        first_brace = cleaned_response.find('{')
+        last_brace = cleaned_response.rfind('}')
+        if first_brace != -1 and last_brace != -1 and first_brace < last_brace:
+            cleaned_response = cleaned_response[first_brace : last_brace + 1]
+            if not cleaned_response.startswith('['):
+                cleaned_response = f"[{cleaned_response}]"
+        else:
+            return None
+
+    cleaned_response = re.sub(r",\s*(}|])", r"\1", cleaned_response)
+    cleaned_response = re.sub(r'\[\s*\d+\s*:\s*', '[', cleaned_response)
+    cleaned_response = re.sub(r',\s*\d+\s*:\s*', ',', cleaned_response)
+    try:
+        return json.loads(cleaned_response)
+    except json.JSONDecodeError:
+        return None
+
+
+DEFECT_MODES = ("none", "trailing-commas", "inner-quotes")
+
+
+def synthetic_response(test_case_count, defects="none"):
+    """Builds a fenced Gemini-style response.
+
+    ``trailing-commas`` adds a trailing comma to every steps array (the legacy pipeline
+    repairs these); ``inner-quotes`` puts unescaped quotes in every 50th object (the legacy
+    pipeline loses the whole response).
+    """
+    objects = []
+    for i in range(test_case_count):
+        test_case = {
+            "id": f"TC{i:05d}",
+            "description": f"Verify login behaviour for scenario {i} with a reasonably long description",
+            "preconditions": ["User is on the login page", "Browser cache is cleared"],
+            "test_type": "Negative" if i % 3 else "Functional",
+            "steps": [
+                "Enter 'student' into the username field",
+                f"Enter 'Password{i}' into the password field",
+                "Click the Submit button",
+            ],
+            "expected_outcome": "An error message containing 'invalid' should appear.",
+        }
+        text = json.dumps(test_case, indent=2)
+        if defects == "trailing-commas":
+            text = text.replace('"Click the Submit button"', '"Click the Submit button",')
+        elif defects == "inner-quotes" and i % 50 == 0:
+            text = text.replace('"Click the Submit button"', '"Click the "Submit" button"')
+        objects.append(text)
+    return "```json\n[\n" + ",\n".join(objects) + "\n]\n```"
+
+
+def time_call(func, payload, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(payload)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'cases':>7} {'defects':>16} {'size':>9} {'legacy ms':>10} {'legacy ok':>10} {'new ms':>8} {'new ok':>7} {'speedup':>8}")
+    for size in args.sizes:
+        for defects in DEFECT_MODES:
+            payload = synthetic_response(size, defects=defects)
+            legacy_time, legacy_result = time_call(legacy_clean_and_parse, payload, args.repeat)
+            new_time, (new_result, _) = time_call(extract_json_objects, payload, args.repeat)
+            legacy_ok = len(legacy_result) if legacy_result else 0
+            print(
+                f"{size:>7} {defects:>16} {len(payload) / 1_000_000:>7.2f}MB "
+                f"{legacy_time * 1000:>10.1f} {legacy_ok:>10} {new_time * 1000:>8.1f} {len(new_result):>7} "
+                f"{legacy_time / new_time:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""End-to-end pipeline benchmark that runs without network access.
+
+Gemini is replaced by benchmarks/fake_genai.py (canned responses with configurable latency)
+and the target is benchmarks/fixture_site.py served on localhost, so the real scraper, HTML
+distiller, script assembly and subprocess execution are measured. Chrome must be installed
+for the scrape and execution stages, as for the app itself.
+
+Run from the repository root:
+    python benchmarks/bench_pipeline.py [--sizes 5 20 50] [--repeat 3] [--workers 1]
+        [--llm-latency 0.5] [--llm-tokens-per-second 200] [--output bench_results.json]
+        [--baseline benchmarks/pipeline_baseline.json] [--tolerance 0.2] [--save-baseline PATH]
+
+Results are written as JSON (medians over the repeats). With --baseline, every size's
+end-to-end latency, stage latencies, peak memory and throughput are compared to the stored
+run and the command exits with status 1 on a regression beyond the tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import fake_genai
+from fixture_site import start_fixture_site
+
+API_KEY = "offline-benchmark"
+
+# Metric -> (direction, absolute change ignored as noise)
+COMPARED_METRICS = {
+    'end_to_end_seconds': ("lower", 0.05),
+    'peak_python_mb': ("lower", 1.0),
+    'tests_per_second': ("higher", 0.0),
+}
+STAGE_NOISE_SECONDS = 0.05
+
+
+def _requirement(size):
+    return (
+        "Users log in with student / Password123 and reach the dashboard; wrong credentials show an "
+        "error. Visitors can send the contact form, which requires an email address. "
+        f"(benchmark suite size: {size})"
+    )
+
+
+def run_once(size, base_url, args, pipeline):
+    """Runs the whole pipeline once for a suite of ``size`` test cases and returns its measurements."""
+    registry = pipeline['metrics'].get_metrics_registry()
+    registry.reset()
+    calls_before = fake_genai.call_count()
+    context = pipeline['context']("bench-" + str(size), {}, lambda message: None)
+    started = time.perf_counter()
+    test_cases = pipeline['generate'](context, _requirement(size), API_KEY)
+    script_result = pipeline['script'](context, test_cases, base_url + "/login", API_KEY, {}, force_refresh=True)
+    execution = pipeline['execute'](
+        context, script_result['script'], True,
+        parallel=args.workers > 1, workers=args.workers, test_cases=test_cases,
+    )
+    end_to_end = time.perf_counter() - started
+    parsed = pipeline['parse'](execution['stdout'], execution['records'])
+
+    spans = {}
+    for row in registry.snapshot()['stages']:
+        spans[row['stage']] = spans.get(row['stage'], 0.0) + row['sum_seconds']
+    statuses = [result['status'] for result in parsed.results]
+    return {
+        'end_to_end_seconds': end_to_end,
+        'stages': {name: info['seconds'] for name, info in context.stages.items()},
+        'spans': spans,
+        'tests': len(statuses),
+        'passed': statuses.count("PASS"),
+        'failed': statuses.count("FAIL"),
+        'errored': len(statuses) - statuses.count("PASS") - statuses.count("FAIL"),
+        'exit_code': execution['exit_code'],
+        'llm_calls': fake_genai.call_count() - calls_before,
+    }
+
+
+def _median_dict(dicts):
+    keys = sorted({key for d in dicts for key in d})
+    return {key: statistics.median(d[key] for d in dicts if key in d) for key in keys}
+
+
+def benchmark_size(size, base_url, args, pipeline):
+    runs = [run_once(size, base_url, args, pipeline) for _ in range(args.repeat)]
+    result = {
+        'end_to_end_seconds': statistics.median(run['end_to_end_seconds'] for run in runs),
+        'stages': _median_dict([run['stages'] for run in runs]),
+        'spans': _median_dict([run['spans'] for run in runs]),
+        'tests': runs[-1]['tests'],
+        'passed': min(run['passed'] for run in runs),
+        'failed': max(run['failed'] for run in runs),
+        'errored': max(run['errored'] for run in runs),
+        'llm_calls': runs[-1]['llm_calls'],
+    }
+    result['tests_per_second'] = result['tests'] / result['end_to_end_seconds'] if result['end_to_end_seconds'] else 0.0
+    execute_seconds = result['stages'].get('execute')
+    result['execution_tests_per_second'] = result['tests'] / execute_seconds if execute_seconds else 0.0
+
+    if args.memory:
+        # A separate run: tracemalloc slows allocation-heavy stages and would skew the latencies
+        tracemalloc.start()
+        run_once(size, base_url, args, pipeline)
+        result['peak_python_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    result['runs'] = runs
+    return result
+
+
+def _child_peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None # Not available on Windows
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _regressed(direction, current, baseline, tolerance, noise):
+    if abs(current - baseline) <= noise:
+        return False
+    if direction == "lower":
+        return current > baseline * (1 + tolerance)
+    return current < baseline / (1 + tolerance)
+
+
+def compare(current, baseline, tolerance):
+    """Returns ``(rows, regressions)`` comparing each size's metrics with the baseline run."""
+    rows = []
+    regressions = []
+    for size, result in current['sizes'].items():
+        base = baseline.get('sizes', {}).get(size)
+        if base is None:
+            continue
+        checks = [(metric, direction, noise, result.get(metric), base.get(metric))
+                  for metric, (direction, noise) in COMPARED_METRICS.items()]
+        checks += [(f"stage {name}", "lower", STAGE_NOISE_SECONDS, seconds, base.get('stages', {}).get(name))
+                   for name, seconds in result['stages'].items()]
+        checks.append(("passed tests", "higher", 0, result['passed'], base.get('passed')))
+        for metric, direction, noise, value, base_value in checks:
+            if value is None or base_value is None:
+                continue
+            regressed = _regressed(direction, value, base_value, tolerance, noise)
+            rows.append((size, metric, base_value, value, regressed))
+            if regressed:
+                regressions.append(f"size {size}: {metric} {base_value:.3f} -> {value:.3f}")
+    return rows, regressions
+
+
+def _load_pipeline():
+    """Imports the app modules once the fake Gemini client and benchmark environment are in place."""
+    fake_genai.install()
+    from batch import BatchItemContext
+    import metrics_utils
+    from pipeline_utils import run_test_case_generation, run_script_generation, run_execution
+    from reporting_utils import parse_execution_output
+    return {
+        'context': BatchItemContext,
+        'metrics': metrics_utils,
+        'generate': run_test_case_generation,
+        'script': run_script_generation,
+        'execute': run_execution,
+        'parse': parse_execution_output,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="execution worker processes (1 runs serially)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="simulated seconds before each response")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200.0,
+                        help="simulated output rate (0 returns the whole response at once)")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc run")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", help="also write these results to this path as the new baseline")
+    args = parser.parse_args()
+
+    output_path = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    save_baseline_path = os.path.abspath(args.save_baseline) if args.save_baseline else None
+
+    # Generated scripts, logs and caches go to a scratch directory; both caches are bypassed
+    work_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    os.chdir(work_dir)
+    os.environ['GEMINI_CACHE_ENABLED'] = "false"
+    os.environ.setdefault('GEMINI_API_KEY', API_KEY)
+    fake_genai.set_latency(args.llm_latency, args.llm_tokens_per_second)
+    pipeline = _load_pipeline()
+    server, base_url = start_fixture_site()
+
+    results = {
+        'benchmark': "pipeline",
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'repeat': args.repeat, 'workers': args.workers,
+            'llm_latency': args.llm_latency, 'llm_tokens_per_second': args.llm_tokens_per_second,
+        },
+        'sizes': {},
+    }
+    print(f"Fixture site at {base_url}; scratch directory {work_dir}")
+    print(f"{'tests':>6} {'e2e s':>8} {'tests/s':>8} {'gen tc':>8} {'scrape':>8} {'distill':>8} "
+          f"{'gen script':>10} {'execute':>8} {'peak MB':>8} {'pass':>5}")
+    try:
+        for size in args.sizes:
+            result = benchmark_size(size, base_url, args, pipeline)
+            results['sizes'][str(size)] = result
+            stages = result['stages']
+            print(
+                f"{size:>6} {result['end_to_end_seconds']:>8.2f} {result['tests_per_second']:>8.2f} "
+                f"{stages.get('generate_test_cases', 0):>8.2f} {stages.get('scrape', 0):>8.2f} "
+                f"{stages.get('distill', 0):>8.2f} {stages.get('generate_script', 0):>10.2f} "
+                f"{stages.get('execute', 0):>8.2f} {result.get('peak_python_mb', 0):>8.1f} "
+                f"{result['passed']:>2}/{result['tests']:<2}"
+            )
+    finally:
+        server.shutdown()
+    results['max_child_rss_mb'] = _child_peak_rss_mb()
+
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"\nResults written to {output_path}")
+    if save_baseline_path:
+        with open(save_baseline_path, 'w', encoding='utf-8') as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f"Baseline saved to {save_baseline_path}")
+
+    if not baseline_path:
+        return 0
+    with open(baseline_path, 'r', encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get('settings') != results['settings']:
+        print(f"Warning: baseline settings {baseline.get('settings')} differ from this run's {results['settings']}.")
+    rows, regressions = compare(results, baseline, args.tolerance)
+    print(f"\n{'size':>6} {'metric':<28} {'baseline':>10} {'current':>10}")
+    for size, metric, base_value, value, regressed in rows:
+        print(f"{size:>6} {metric:<28} {base_value:>10.3f} {value:>10.3f}{'  REGRESSION' if regressed else ''}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\nNo regressions beyond {args.tolerance:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
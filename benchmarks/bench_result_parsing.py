@@ -0,0 +1,111 @@
+"""Benchmarks the line-oriented result parser against the previous DOTALL regex.
+
+Run from the repository root:
+    python benchmarks/bench_result_parsing.py [--sizes 10 2000 10000 40000] [--repeat 3]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reporting_utils import ResultStreamParser, parse_execution_output
+
+LEGACY_PATTERN = re.compile(
+    r"TEST_RESULT_START\s*"
+    r"ID:\s*(.*?)\s*"
+    r"DESCRIPTION:\s*(.*?)\s*"
+    r"STATUS:\s*(.*?)\s*"
+    r"MESSAGE:\s*(.*?)\s*"
+    r"TEST_RESULT_END",
+    re.DOTALL
+)
+
+
+def legacy_parse(stdout):
+    """The regex the removed parse_structured_results used before the streaming parser."""
+    return [
+        {"id": m.group(1).strip(), "description": m.group(2).strip(),
+         "status": m.group(3).strip().upper(), "message": m.group(4).strip()}
+        for m in LEGACY_PATTERN.finditer(stdout)
+    ]
+
+
+DEFECT_MODES = ("none", "missing-end", "missing-message", "no-end")
+
+
+def synthetic_log(test_count, defects="none"):
+    """Builds stdout with chatty per-test logging around every result block.
+
+    ``missing-end`` drops TEST_RESULT_END from every 100th block and ``missing-message``
+    drops its MESSAGE line; ``no-end`` drops every TEST_RESULT_END (a script that ignores the
+    output contract), where the five lazy groups retry every later keyword combination and
+    the legacy regex degrades to roughly O(n^4).
+    """
+    lines = []
+    for i in range(test_count):
+        for step in range(8):
+            lines.append(f"[TC{i:05d}] step {step}: located element //div[@id='row-{step}'] and clicked it")
+        lines.append("TEST_RESULT_START")
+        lines.append(f"ID: TC{i:05d}")
+        lines.append(f"DESCRIPTION: Verify scenario {i} behaves as documented")
+        lines.append("STATUS: " + ("FAIL" if i % 7 == 0 else "PASS"))
+        if not (defects == "missing-message" and i % 100 == 0):
+            lines.append("MESSAGE: Expected banner text was " + ("missing" if i % 7 == 0 else "present"))
+        if defects != "no-end" and not (defects == "missing-end" and i % 100 == 0):
+            lines.append("TEST_RESULT_END")
+    lines.append(f"EXECUTION SUMMARY: Passed: {test_count}, Failed: 0, Errored: 0")
+    return "\n".join(lines) + "\n"
+
+
+def chunked_parse(stdout, chunk_size=4096):
+    parser = ResultStreamParser()
+    for start in range(0, len(stdout), chunk_size):
+        parser.feed(stdout[start:start + chunk_size])
+    parser.close()
+    return parser.results
+
+
+def time_call(func, payload, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(payload)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 2000, 10000, 40000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-max-bytes", type=int, default=8 * 1024,
+                        help="skip the legacy regex on no-end logs larger than this (20 blocks already take minutes)")
+    args = parser.parse_args()
+
+    print(f"{'tests':>7} {'defects':>16} {'size':>9} {'legacy ms':>10} {'legacy n':>9} "
+          f"{'new ms':>8} {'new n':>7} {'chunked ms':>11} {'problems':>9} {'speedup':>8}")
+    for size in args.sizes:
+        for defects in DEFECT_MODES:
+            payload = synthetic_log(size, defects=defects)
+            new_time, parsed = time_call(parse_execution_output, payload, args.repeat)
+            chunked_time, _ = time_call(chunked_parse, payload, args.repeat)
+            if defects == "no-end" and len(payload) > args.legacy_max_bytes:
+                legacy = f"{'skipped':>10} {'-':>9}"
+                speedup = "-"
+            else:
+                legacy_time, legacy_results = time_call(legacy_parse, payload, 1 if defects == "no-end" else args.repeat)
+                legacy = f"{legacy_time * 1000:>10.1f} {len(legacy_results):>9}"
+                speedup = f"{legacy_time / new_time:.2f}x"
+            print(
+                f"{size:>7} {defects:>16} {len(payload) / 1_000_000:>7.2f}MB {legacy} "
+                f"{new_time * 1000:>8.1f} {len(parsed.results):>7} {chunked_time * 1000:>11.1f} "
+                f"{len(parsed.problems):>9} {speedup:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Offline stand-in for the parts of ``google.generativeai`` that gemini_utils uses.
+
+``install()`` registers it as ``google.generativeai`` before gemini_utils is imported.
+Responses are canned but shaped like Gemini's:
+
+- test case prompts get a JSON array of ``suite size: N`` test cases (from the requirement
+  text) that cycle through the fixture site's scenarios;
+- script prompts get one Selenium function per requested test case, targeting the fixture
+  site pages (see fixture_site.py).
+
+Latency is simulated as ``base_seconds`` plus output tokens at ``tokens_per_second``; streamed
+responses are split into chunks paced at the same rate.
+"""
+import json
+import re
+import sys
+import threading
+import time
+import types as _types
+
+SCENARIOS = ("valid_login", "invalid_username", "invalid_password", "contact_form", "contact_form_missing_email")
+
+_settings = {'base_seconds': 0.0, 'tokens_per_second': 0.0, 'chunk_chars': 400}
+_calls = {'count': 0}
+_lock = threading.Lock()
+
+
+def set_latency(base_seconds=0.0, tokens_per_second=0.0, chunk_chars=400):
+    """Configures the simulated latency; ``tokens_per_second=0`` disables the per-token delay."""
+    _settings.update(base_seconds=base_seconds, tokens_per_second=tokens_per_second, chunk_chars=chunk_chars)
+
+
+def call_count():
+    return _calls['count']
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _scenario_for(test_case):
+    match = re.search(r"\[scenario: (\w+)\]", test_case.get('description', ''))
+    return match.group(1) if match else SCENARIOS[0]
+
+
+def _test_cases_response(prompt):
+    match = re.search(r"suite size:\s*(\d+)", prompt)
+    suite_size = int(match.group(1)) if match else len(SCENARIOS)
+    descriptions = {
+        'valid_login': ("Log in with valid credentials", "Functional", "The dashboard is shown."),
+        'invalid_username': ("Reject an unknown username", "Negative", "An error message containing 'invalid' should appear."),
+        'invalid_password': ("Reject a wrong password", "Negative", "An error message containing 'invalid' should appear."),
+        'contact_form': ("Submit the contact form", "Functional", "A confirmation naming the sender is shown."),
+        'contact_form_missing_email': ("Require an email on the contact form", "Negative", "An error about the email should appear."),
+    }
+    test_cases = []
+    for index in range(suite_size):
+        scenario = SCENARIOS[index % len(SCENARIOS)]
+        description, test_type, expected = descriptions[scenario]
+        test_cases.append({
+            'id': f"TC{index + 1:03d}",
+            'description': f"{description} (variant {index // len(SCENARIOS) + 1}) [scenario: {scenario}]",
+            'preconditions': ["The fixture site is running"],
+            'test_type': test_type,
+            'steps': [f"Open the {'contact' if scenario.startswith('contact') else 'login'} page", "Fill in the form", "Submit it"],
+            'expected_outcome': expected,
+        })
+    return json.dumps(test_cases, indent=2)
+
+
+_SCRIPT_IMPORTS = """\
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+"""
+
+_SCRIPT_HELPERS = '''\
+def report(test_case_data, status, message):
+    print("TEST_RESULT_START")
+    print(f"ID: {test_case_data['id']}")
+    print(f"DESCRIPTION: {test_case_data['description']}")
+    print(f"STATUS: {status}")
+    print(f"MESSAGE: {message}")
+    print("TEST_RESULT_END")
+
+
+def submit_login(driver, base_url, username, password):
+    driver.get(base_url + "/login")
+    driver.find_element(By.ID, "username").send_keys(username)
+    driver.find_element(By.ID, "password").send_keys(password)
+    driver.find_element(By.ID, "submit").click()
+
+
+def submit_contact(driver, base_url, name, email):
+    driver.get(base_url + "/contact")
+    driver.find_element(By.ID, "name").send_keys(name)
+    if email:
+        driver.find_element(By.ID, "email").send_keys(email)
+    driver.find_element(By.ID, "message").send_keys("Benchmark message")
+    driver.find_element(By.CSS_SELECTOR, "button[type='submit']").click()
+'''
+
+_SCENARIO_BODIES = {
+    'valid_login': '''\
+    submit_login(driver, BASE_URL, "student", "Password123")
+    heading = WebDriverWait(driver, 10).until(EC.visibility_of_element_located((By.TAG_NAME, "h1")))
+    try:
+        assert "Logged In Successfully" in heading.text, f"Unexpected heading {heading.text!r}"
+        report(test_case_data, "PASS", "Dashboard shown after login.")
+    except AssertionError as e:
+        report(test_case_data, "FAIL", str(e))
+''',
+    'invalid_username': '''\
+    submit_login(driver, BASE_URL, "nobody", "Password123")
+    error = WebDriverWait(driver, 10).until(EC.visibility_of_element_located((By.ID, "error")))
+    try:
+        assert "invalid" in error.text.lower(), f"Unexpected error {error.text!r}"
+        report(test_case_data, "PASS", "Invalid username rejected.")
+    except AssertionError as e:
+        report(test_case_data, "FAIL", str(e))
+''',
+    'invalid_password': '''\
+    submit_login(driver, BASE_URL, "student", "wrong")
+    error = WebDriverWait(driver, 10).until(EC.visibility_of_element_located((By.ID, "error")))
+    try:
+        assert "invalid" in error.text.lower(), f"Unexpected error {error.text!r}"
+        report(test_case_data, "PASS", "Invalid password rejected.")
+    except AssertionError as e:
+        report(test_case_data, "FAIL", str(e))
+''',
+    'contact_form': '''\
+    submit_contact(driver, BASE_URL, "Ada", "ada@example.com")
+    confirmation = WebDriverWait(driver, 10).until(EC.visibility_of_element_located((By.ID, "confirmation")))
+    try:
+        assert "Ada" in confirmation.text, f"Unexpected confirmation {confirmation.text!r}"
+        report(test_case_data, "PASS", "Confirmation names the sender.")
+    except AssertionError as e:
+        report(test_case_data, "FAIL", str(e))
+''',
+    'contact_form_missing_email': '''\
+    submit_contact(driver, BASE_URL, "Ada", "")
+    error = WebDriverWait(driver, 10).until(EC.visibility_of_element_located((By.ID, "error")))
+    try:
+        assert "email" in error.text.lower(), f"Unexpected error {error.text!r}"
+        report(test_case_data, "PASS", "Missing email rejected.")
+    except AssertionError as e:
+        report(test_case_data, "FAIL", str(e))
+''',
+}
+
+
+def _script_response(prompt):
+    url_match = re.search(r"Target URL:\s*(\S+)", prompt)
+    base_url = re.match(r"https?://[^/]+", url_match.group(1)).group(0) if url_match else "http://127.0.0.1:8000"
+    cases_match = re.search(r"Test Cases \(JSON\):\s*```json\s*(.*?)```", prompt, re.DOTALL)
+    test_cases = json.loads(cases_match.group(1)) if cases_match else []
+    functions = []
+    for test_case in test_cases:
+        name = "test_" + re.sub(r"\W", "_", str(test_case.get('id', '')))
+        functions.append(f"def {name}(driver, test_case_data):\n{_SCENARIO_BODIES[_scenario_for(test_case)]}")
+    code = (
+        _SCRIPT_IMPORTS + f"\nBASE_URL = {base_url!r}\n\n\n" + _SCRIPT_HELPERS + "\n\n" + "\n\n".join(functions)
+    )
+    return f"Here is the code:\n```python\n{code}\n```\n"
+
+
+def _respond(prompt):
+    prompt = str(prompt)
+    if "Software Requirement:" in prompt:
+        return _test_cases_response(prompt)
+    return _script_response(prompt)
+
+
+def _delay_for(tokens):
+    rate = _settings['tokens_per_second']
+    return tokens / rate if rate > 0 else 0.0
+
+
+class _UsageMetadata:
+    def __init__(self, prompt, text):
+        self.prompt_token_count = _estimate_tokens(prompt)
+        self.candidates_token_count = _estimate_tokens(text)
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+        self.parts = [text]
+
+
+class _Response:
+    def __init__(self, prompt, text):
+        self.text = text
+        self.parts = [text]
+        self.prompt_feedback = None
+        self.usage_metadata = _UsageMetadata(prompt, text)
+
+
+class _StreamingResponse:
+    def __init__(self, prompt, text):
+        self._text = text
+        self.prompt_feedback = None
+        self.usage_metadata = _UsageMetadata(prompt, text)
+
+    def __iter__(self):
+        size = max(1, _settings['chunk_chars'])
+        for start in range(0, len(self._text), size):
+            chunk = self._text[start:start + size]
+            time.sleep(_delay_for(_estimate_tokens(chunk)))
+            yield _Chunk(chunk)
+
+
+class GenerativeModel:
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream=False, request_options=None, generation_config=None):
+        with _lock:
+            _calls['count'] += 1
+        text = _respond(prompt)
+        time.sleep(_settings['base_seconds'])
+        if stream:
+            return _StreamingResponse(prompt, text)
+        time.sleep(_delay_for(_estimate_tokens(text)))
+        return _Response(prompt, text)
+
+
+class GenerationConfig(dict):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+
+types = _types.SimpleNamespace(GenerationConfig=GenerationConfig)
+
+
+def configure(api_key=None, **kwargs):
+    pass
+
+
+def install():
+    """Makes ``import google.generativeai`` resolve to this module."""
+    try:
+        import google # Keep the real namespace package so google.protobuf etc. still import
+    except ImportError:
+        google = _types.ModuleType('google')
+        google.__path__ = []
+        sys.modules['google'] = google
+    google.generativeai = sys.modules[__name__]
+    sys.modules['google.generativeai'] = sys.modules[__name__]
@@ -0,0 +1,122 @@
+"""Local fixture website for offline benchmarks: a login flow and a contact form.
+
+Run it on its own to point the app at it:
+    python benchmarks/fixture_site.py [--port 8765]
+
+Pages: /login (student / Password123 opens /dashboard, anything else shows #error) and
+/contact (#confirmation on success, #error when the email is missing).
+"""
+import argparse
+import html
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+VALID_USERNAME = "student"
+VALID_PASSWORD = "Password123"
+
+_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>{title}</title>
+<style>body {{ font-family: sans-serif; margin: 2rem; }} #error {{ color: #b00; }}</style></head>
+<body>
+<nav><a href="/login">Login</a> | <a href="/contact">Contact</a></nav>
+<main>
+{body}
+</main>
+<footer><p>Benchmark fixture site</p></footer>
+</body>
+</html>
+"""
+
+_LOGIN_FORM = """<h2>Test login</h2>
+<p>Use <b>student</b> / <b>Password123</b> to log in.</p>
+{error}
+<form id="login" method="post" action="/login">
+  <label for="username">Username</label> <input type="text" id="username" name="username">
+  <label for="password">Password</label> <input type="password" id="password" name="password">
+  <button type="submit" id="submit" class="btn">Submit</button>
+</form>"""
+
+_CONTACT_FORM = """<h2>Contact us</h2>
+{error}
+<form id="contact" method="post" action="/contact">
+  <label for="name">Name</label> <input type="text" id="name" name="name">
+  <label for="email">Email</label> <input type="email" id="email" name="email">
+  <label for="message">Message</label> <textarea id="message" name="message"></textarea>
+  <button type="submit" class="btn">Send</button>
+</form>"""
+
+
+def _error(message):
+    return f'<div id="error" class="show">{html.escape(message)}</div>' if message else ""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def _send(self, status, title, body, location=None):
+        payload = _PAGE.format(title=title, body=body).encode('utf-8')
+        self.send_response(status)
+        if location:
+            self.send_header("Location", location)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        fields = parse_qs(self.rfile.read(length).decode('utf-8'))
+        return {name: values[0] for name, values in fields.items()}
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path in ("/", "/login"):
+            self._send(200, "Login", _LOGIN_FORM.format(error=""))
+        elif path == "/contact":
+            self._send(200, "Contact", _CONTACT_FORM.format(error=""))
+        elif path == "/dashboard":
+            self._send(200, "Dashboard", '<h1>Logged In Successfully</h1>\n<a id="logout" href="/login">Log out</a>')
+        else:
+            self._send(404, "Not found", "<h1>Not found</h1>")
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        form = self._form()
+        if path == "/login":
+            if form.get('username') != VALID_USERNAME:
+                self._send(200, "Login", _LOGIN_FORM.format(error=_error("Your username is invalid!")))
+            elif form.get('password') != VALID_PASSWORD:
+                self._send(200, "Login", _LOGIN_FORM.format(error=_error("Your password is invalid!")))
+            else:
+                self._send(303, "Redirect", "", location="/dashboard")
+        elif path == "/contact":
+            if not form.get('email'):
+                self._send(200, "Contact", _CONTACT_FORM.format(error=_error("Please enter your email address.")))
+            else:
+                name = html.escape(form.get('name', ''))
+                self._send(200, "Contact", f'<p id="confirmation">Thanks {name}, we will be in touch.</p>')
+        else:
+            self._send(404, "Not found", "<h1>Not found</h1>")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_site(host="127.0.0.1", port=0):
+    """Serves the fixture site on a background thread; returns ``(server, base_url)``."""
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    threading.Thread(target=server.serve_forever, name="fixture-site", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server, base_url = start_fixture_site(args.host, args.port)
+    print(f"Fixture site running at {base_url}/login (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
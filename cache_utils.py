@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# put() writes 'created' first, so an entry's age is read without loading its value
+_CREATED_RE = re.compile(rb'^\{"created": ([0-9.eE+-]+)')
+
+
+class DiskCache:
+    """JSON-file cache with age-based expiry and least-recently-used count/size eviction.
+
+    Entry ages, last uses and sizes are kept in an in-memory index, read from the directory
+    on the first write, so a write only touches its own file unless a limit is exceeded.
+    """
+
+    def __init__(self, directory, max_entries, max_bytes, max_age_seconds):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self._index = None # path -> [created, last_used, size]; loaded lazily (see _load_index)
+        self._total_bytes = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key, max_age_seconds=None):
+        """Returns the cached value for a key, or None on a miss or expired entry."""
+        max_age = self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, 'r', encoding='utf-8') as cache_file:
+                    entry = json.load(cache_file)
+            except (OSError, ValueError):
+                self._stats['misses'] += 1
+                return None
+
+            if time.time() - entry.get('created', 0) > max_age:
+                if max_age >= self.max_age_seconds:
+                    self._remove(path)
+                self._stats['misses'] += 1
+                return None
+
+            try:
+                os.utime(path, None) # Bump mtime so the LRU order survives a restart (see _load_index)
+            except OSError:
+                pass
+            if self._index is not None and path in self._index:
+                self._index[path][1] = time.time()
+            self._stats['hits'] += 1
+            return entry.get('value')
+
+    def put(self, key, value):
+        """Stores a JSON-serializable value and evicts old entries beyond the configured limits."""
+        with self._lock:
+            index = self._load_index()
+            path = self._path(key)
+            now = time.time()
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_path = path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+                    json.dump({'created': now, 'value': value}, cache_file)
+                size = os.path.getsize(tmp_path)
+                os.replace(tmp_path, path)
+                self._stats['writes'] += 1
+            except OSError as e:
+                logger.warning("Could not write cache entry to %s: %s", self.directory, e)
+                return
+            previous = index.get(path)
+            if previous:
+                self._total_bytes -= previous[2]
+            index[path] = [now, now, size]
+            self._total_bytes += size
+            if len(index) > self.max_entries or self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            self._stats['evictions'] += 1
+        except OSError:
+            pass
+        if self._index is not None and path in self._index:
+            self._total_bytes -= self._index.pop(path)[2]
+
+    def _created_at(self, path):
+        """The ``created`` time stored in an entry, or None if it cannot be read."""
+        try:
+            with open(path, 'rb') as cache_file:
+                match = _CREATED_RE.match(cache_file.read(64))
+                if match:
+                    return float(match.group(1))
+                cache_file.seek(0)
+                return float(json.load(cache_file).get('created', 0))
+        except (OSError, ValueError, TypeError, AttributeError):
+            return None
+
+    def _load_index(self):
+        """Builds the index from the directory once: ``created`` from each entry's head, last use from its mtime."""
+        if self._index is not None:
+            return self._index
+        self._index = {}
+        self._total_bytes = 0
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        except OSError:
+            return self._index
+        for name in names:
+            path = os.path.join(self.directory, name)
+            created = self._created_at(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if created is None:
+                self._remove(path)
+                continue
+            self._index[path] = [created, stat.st_mtime, stat.st_size]
+            self._total_bytes += stat.st_size
+        return self._index
+
+    def _evict(self):
+        """Drops expired entries, then least-recently-used ones until count and size limits hold.
+
+        Expiry uses each entry's stored ``created`` time, as ``get`` does; the last use only
+        orders the least-recently-used eviction. Works on the index without reading any file.
+        """
+        now = time.time()
+        for path in [path for path, (created, _, _) in self._index.items() if now - created > self.max_age_seconds]:
+            self._remove(path)
+        if len(self._index) <= self.max_entries and self._total_bytes <= self.max_bytes:
+            return
+        for path in sorted(self._index, key=lambda path: self._index[path][1]):
+            if len(self._index) <= self.max_entries and self._total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+
+    def clear(self):
+        """Removes every cached entry from disk."""
+        with self._lock:
+            self._index = {}
+            self._total_bytes = 0
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return
+            for name in names:
+                if name.endswith('.json'):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    def stats(self):
+        """Returns a snapshot of the hit/miss/write/eviction counters."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] / lookups) if lookups else 0.0
+        return stats
+
+
+class MemoryCache:
+    """Small thread-safe in-process LRU cache with a per-lookup maximum age."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, max_age_seconds):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if time.time() - created > max_age_seconds:
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, created=None):
+        with self._lock:
+            self._entries[key] = (created if created is not None else time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -8,5 +8,106 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL_TEST_CASE = 'models/gemini-2.5-flash-preview-04-17'
 # GEMINI_MODEL_SCRIPT = 'models/gemini-2.5-flash-preview-04-17'
 GEMINI_MODEL_SCRIPT = 'models/gemini-2.5-pro-exp-03-25'
-REQUEST_TIMEOUT_SECONDS = 180
+REQUEST_TIMEOUT_SECONDS = 180 # Overall deadline for one Gemini request, retries included
+
+# Resilient Gemini client: per-attempt timeout, jittered retries on transient errors, a hedged
+# duplicate once a call outlives the observed p95 latency, and a circuit breaker
+GEMINI_ATTEMPT_TIMEOUT_SECONDS = 90
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_RETRY_BASE_SECONDS = 1.0
+GEMINI_RETRY_MAX_SECONDS = 20.0
+GEMINI_HEDGE_ENABLED = os.getenv("GEMINI_HEDGE_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+GEMINI_HEDGE_PERCENTILE = 0.95
+GEMINI_HEDGE_MIN_SAMPLES = 20 # Latencies per model before the percentile is trusted
+GEMINI_HEDGE_MAX_RATIO = 0.1 # At most this share of requests may send a duplicate
+GEMINI_LATENCY_WINDOW = 200
+GEMINI_CIRCUIT_FAILURE_THRESHOLD = 5
+GEMINI_CIRCUIT_RESET_SECONDS = 30
+
+# Adaptive model routing: small or simple jobs go to the fast tier first and are escalated to
+# the strong tier only when the output fails validation (MODEL_ROUTING_ENABLED=false uses the
+# fixed per-stage models above)
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+GEMINI_MODEL_FAST = os.getenv("GEMINI_MODEL_FAST", 'models/gemini-2.5-flash-preview-04-17')
+GEMINI_MODEL_STRONG = os.getenv("GEMINI_MODEL_STRONG", 'models/gemini-2.5-pro-exp-03-25')
+ROUTING_FAST_MAX_PROMPT_TOKENS = int(os.getenv("ROUTING_FAST_MAX_PROMPT_TOKENS", "12000"))
+ROUTING_FAST_MAX_TEST_CASES = int(os.getenv("ROUTING_FAST_MAX_TEST_CASES", "10")) # Per script (or shard) request
+ROUTING_FAST_MAX_STEPS = int(os.getenv("ROUTING_FAST_MAX_STEPS", "60"))
+ROUTING_STRONG_LATENCY_RATIO = 3.0 # Assumed strong/fast latency ratio until the strong tier has been observed
+ROUTING_LOG_SIZE = 200
 EXECUTION_TIMEOUT_SECONDS = 3000
+
+# Gemini response cache (set GEMINI_CACHE_ENABLED=false to bypass it)
+GEMINI_CACHE_ENABLED = os.getenv("GEMINI_CACHE_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+GEMINI_CACHE_DIR = os.getenv("GEMINI_CACHE_DIR", ".gemini_cache")
+GEMINI_CACHE_MAX_ENTRIES = 500
+GEMINI_CACHE_MAX_BYTES = 50 * 1024 * 1024
+GEMINI_CACHE_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+# Script generation: test cases are split into shards generated concurrently and merged
+# into one script
+SCRIPT_SHARD_SIZE = 10
+SCRIPT_SHARD_MAX_WORKERS = 4
+
+# Approximate token budget for the distilled HTML sent with script generation prompts
+HTML_DISTILL_TOKEN_BUDGET = 8000
+
+# Scrape cache: pages are reused for SCRAPE_CACHE_TTL_SECONDS unless a refresh is forced
+SCRAPE_CACHE_TTL_SECONDS = int(os.getenv("SCRAPE_CACHE_TTL_SECONDS", "600"))
+SCRAPE_CACHE_DIR = os.getenv("SCRAPE_CACHE_DIR", ".scrape_cache")
+SCRAPE_CACHE_MEMORY_ENTRIES = 32
+SCRAPE_CACHE_MAX_ENTRIES = 200
+SCRAPE_CACHE_MAX_BYTES = 100 * 1024 * 1024
+
+# Warm pool of headless WebDrivers shared by every session in the process
+DRIVER_POOL_MAX_SIZE = int(os.getenv("DRIVER_POOL_MAX_SIZE", "4"))
+DRIVER_POOL_WARM_SIZE = 1
+DRIVER_POOL_MAX_USES = 25
+DRIVER_POOL_ACQUIRE_TIMEOUT_SECONDS = 120
+
+# Page readiness: wait for readyState, network idle and DOM quiescence instead of a fixed sleep
+PAGE_READY_TIMEOUT_SECONDS = 15
+PAGE_READY_QUIET_MS = 500
+PAGE_READY_MAX_INFLIGHT_REQUESTS = 2 # Tolerates long-polling/analytics connections
+
+# Parallel test execution (0 = one worker process per CPU core)
+EXECUTION_WORKERS = int(os.getenv("EXECUTION_WORKERS", "0"))
+EXECUTION_STDERR_BUFFER_BYTES = 256 * 1024 # In-memory stderr tail (UTF-8 bytes); the full stream is spilled to tests/*.stderr.log
+EXECUTION_STDOUT_BUFFER_BYTES = 256 * 1024 # In-memory stdout tail besides the result blocks; the full stream is spilled to tests/*.stdout.log
+
+# Offline selector check: resolve the script's By.* locators against the scraped page before running it
+SELECTOR_CHECK_ENABLED = os.getenv("SELECTOR_CHECK_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+SELECTOR_SKIP_DEAD_TESTS = os.getenv("SELECTOR_SKIP_DEAD_TESTS", "false").strip().lower() not in ("0", "false", "no", "off")
+
+# Run history (SQLite): per-test results and durations drive test ordering, shard balancing and flaky-test detection
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join(".history", "runs.sqlite3"))
+HISTORY_MAX_RUNS = 2000
+HISTORY_DURATION_SAMPLES = 5 # Recent durations whose median is a test's expected duration
+HISTORY_FAILURE_LOOKBACK = 3 # Recent results in which a failure moves a test to the front
+HISTORY_FLAKY_WINDOW = 10 # Recent results per test and script version checked for status flips
+
+# Execution report: built once per run; logs are previewed (head/tail) and paged from disk on demand
+REPORTS_DIR = os.getenv("REPORTS_DIR", ".reports")
+REPORTS_MAX_KEPT = 20 # Report directories (full stdout/stderr logs) kept on disk, newest first
+REPORT_PAGE_SIZE = 50 # Result rows per table page
+REPORT_LOG_PREVIEW_LINES = 40 # Lines shown from each end of a log
+REPORT_LOG_PREVIEW_CHARS = 8000 # Cap per preview end, for logs with very long lines
+REPORT_LOG_PAGE_BYTES = 64 * 1024 # Window of the full log read from disk per page
+
+# Background jobs: generation, scraping and execution run off the Streamlit script thread
+JOBS_DIR = os.getenv("JOBS_DIR", ".jobs")
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "8"))
+JOB_RETENTION_SECONDS = 7 * 24 * 60 * 60
+JOB_POLL_INTERVAL_SECONDS = 1.0
+
+# Batch CLI (batch.py): per-resource concurrency limits
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+BATCH_BROWSER_CONCURRENCY = int(os.getenv("BATCH_BROWSER_CONCURRENCY", str(DRIVER_POOL_MAX_SIZE)))
+BATCH_EXECUTION_CONCURRENCY = int(os.getenv("BATCH_EXECUTION_CONCURRENCY", "2"))
+
+# Stage timing metrics (METRICS_PORT > 0 serves /metrics and /metrics.json for scraping)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_MAX_SAMPLES = 1000 # Recent durations kept per stage for the in-app p50/p95
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
@@ -1,97 +1,565 @@
-import streamlit as st
+import json
 import subprocess
 import os
 import traceback
 import uuid # For generating unique filenames
-from config import EXECUTION_TIMEOUT_SECONDS
+import re
+import queue
+import threading
+import time
+from collections import deque
+from config import (
+    EXECUTION_TIMEOUT_SECONDS, EXECUTION_WORKERS, EXECUTION_STDERR_BUFFER_BYTES, EXECUTION_STDOUT_BUFFER_BYTES,
+)
+from metrics_utils import span
+from notes_utils import notify
+from reporting_utils import ResultStreamParser, parse_execution_output, record_to_result
+from script_utils import RESULTS_FILE_OPTION, build_worker_script, plan_test_cases, supports_results_file
 
 TESTS_DIR = "tests"
 
-def execute_script_subprocess(script_string, headless_mode):
-    """Executes the generated script in a subprocess, saving it to a 'tests' folder."""
-    stdout_data = ""
-    stderr_data = ""
-    exit_code = -1
-    script_path = None
-    process = None
+_TIMEOUT_EXIT_CODE = 143
+_SUMMARY_LINE_RE = re.compile(r"^EXECUTION SUMMARY:.*(?:\n|$)", re.MULTILINE)
 
-    try:
-        if not os.path.exists(TESTS_DIR):
+
+def _write_test_file(filename, contents):
+    """Writes a file into the tests folder, creating it if needed. Returns the path or None."""
+    if not os.path.exists(TESTS_DIR):
+        try:
+            os.makedirs(TESTS_DIR)
+            notify(f"Created directory: {os.path.abspath(TESTS_DIR)}")
+        except OSError as e:
+            notify(f"Failed to create directory {TESTS_DIR}: {e}", "error")
+            return None
+    path = os.path.join(TESTS_DIR, filename)
+    with open(path, mode='w', encoding='utf-8') as test_file:
+        test_file.write(contents)
+    return path
+
+
+def default_worker_count():
+    """Configured worker count for parallel execution; EXECUTION_WORKERS=0 means one per CPU core."""
+    return max(1, EXECUTION_WORKERS or os.cpu_count() or 1)
+
+
+class _BoundedLog:
+    """Keeps only the last ``max_bytes`` (UTF-8 encoded) of a stream in memory and spills the full stream to a file."""
+
+    def __init__(self, max_bytes, spill_path=None):
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+        self._lines = deque() # (line number, line, encoded size)
+        self._size = 0
+        self._line_count = 0
+        self._spill_file = None
+        if spill_path:
             try:
-                os.makedirs(TESTS_DIR)
-                st.write(f"Created directory: {os.path.abspath(TESTS_DIR)}")
-            except OSError as e:
-                st.error(f"Failed to create directory {TESTS_DIR}: {e}")
-                stderr_data = f"Failed to create directory {TESTS_DIR}: {e}"
-                return stdout_data, stderr_data, 1 # Return error code
-
-        script_filename = f"test_script_{uuid.uuid4()}.py"
-        script_path = os.path.join(TESTS_DIR, script_filename)
-
-        with open(script_path, mode='w', encoding='utf-8') as script_file:
-            script_file.write(script_string)
-            script_file.flush()
-        st.write(f"Generated script saved to: {os.path.abspath(script_path)}")
-
-        command = ["python", script_path]
-        if headless_mode:
-            command.append("--headless")
-
-        st.write(f"Executing command: {' '.join(command)}")
-        st.info(f"Test execution started... Max timeout: {EXECUTION_TIMEOUT_SECONDS} seconds.")
-
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,            # Decode stdout/stderr as text
-            encoding='utf-8',     # Specify encoding for decoding
-            errors='replace'      # Handle potential decoding errors gracefully
-        )
+                self._spill_file = open(spill_path, 'w', encoding='utf-8')
+            except OSError:
+                self.spill_path = None
 
-        stdout_data, stderr_data = process.communicate(timeout=EXECUTION_TIMEOUT_SECONDS)
-        exit_code = process.returncode # Get the final exit code
+    def append(self, line):
+        if self._spill_file:
+            self._spill_file.write(line)
+        self._line_count += 1
+        size = len(line.encode('utf-8', errors='replace'))
+        self._lines.append((self._line_count, line, size))
+        self._size += size
+        while self._size > self.max_bytes and len(self._lines) > 1:
+            self._size -= self._lines.popleft()[2]
 
-        if exit_code == 0:
-            st.success(f"Script execution finished successfully (Exit Code: {exit_code}).")
-        else:
-            st.warning(f"Script execution finished with errors (Exit Code: {exit_code}). Check stderr.")
+    def close(self):
+        if self._spill_file:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def _retained(self):
+        """The ``(line number, line)`` pairs still in memory, in order."""
+        return [(number, line) for number, line, _ in self._lines]
+
+    def getvalue(self):
+        location = f"; full log: {os.path.abspath(self.spill_path)}" if self.spill_path else ""
+        parts = []
+        previous = 0
+        for number, line in self._retained():
+            if number > previous + 1:
+                parts.append(f"--- {number - previous - 1} {'earlier ' if not previous else ''}lines omitted{location} ---\n")
+            parts.append(line)
+            previous = number
+        return "".join(parts)
+
+
+class _StdoutLog(_BoundedLog):
+    """A ``_BoundedLog`` for a test script's stdout that also keeps every result block and summary line.
+
+    Only those lines and the tail stay in memory, so the returned text still parses to the same
+    results however long the run's output was. A block that grows past ``max_bytes`` (e.g.
+    one never terminated) stops being kept and is left to the tail.
+    """
+
+    def __init__(self, max_bytes, spill_path=None):
+        super().__init__(max_bytes, spill_path)
+        self._kept = []
+        self._in_block = False
+        self._block_size = 0
+
+    def append(self, line):
+        super().append(line)
+        stripped = line.strip()
+        if stripped == "TEST_RESULT_START":
+            self._in_block = True
+            self._block_size = 0
+        keep = self._in_block or stripped.startswith("EXECUTION SUMMARY:")
+        if self._in_block:
+            self._block_size += self._lines[-1][2]
+            if self._block_size > self.max_bytes:
+                self._in_block = keep = False
+        if stripped == "TEST_RESULT_END":
+            self._in_block = False
+        if keep:
+            self._kept.append((self._line_count, line))
+
+    def _retained(self):
+        tail = super()._retained()
+        first_tail_line = tail[0][0] if tail else self._line_count + 1
+        return [entry for entry in self._kept if entry[0] < first_tail_line] + tail
+
+
+class _LiveResults:
+    """Parses each output source's stdout as it arrives and reports every result as soon as it closes."""
+
+    def __init__(self, on_result=None):
+        self.on_result = on_result
+        self._parsers = {}
+
+    def feed(self, source, line):
+        parser = self._parsers.get(source)
+        if parser is None:
+            parser = self._parsers[source] = ResultStreamParser()
+        for result in parser.feed(line):
+            if self.on_result:
+                self.on_result(result)
 
+
+class _ResultsFileTail:
+    """Incrementally reads the JSON-lines records a running script appends to its results file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+        self.problems = []
+        self._file = None
+        self._partial = b""
+
+    def poll(self):
+        """Reads whatever was appended since the last poll and returns the new complete records."""
+        if self._file is None:
+            try:
+                self._file = open(self.path, 'rb')
+            except OSError:
+                return [] # The script has not created it yet
+        data = self._file.read()
+        if not data:
+            return []
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        new_records = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                self.problems.append(f"Unreadable line in results file: {line[:200]!r}")
+                continue
+            if isinstance(record, dict) and 'id' in record:
+                new_records.append(record)
+        self.records.extend(new_records)
+        return new_records
+
+    def close(self):
+        self.poll()
+        if self._partial.strip():
+            self.problems.append("Results file ends with an incomplete record; it was ignored.")
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _pump_lines(stream, key, line_queue):
+    """Reader thread: forwards each line of a pipe to the queue, then a None end marker."""
+    try:
+        for line in iter(stream.readline, ''):
+            line_queue.put((key, line))
+    finally:
+        stream.close()
+        line_queue.put((key, None))
+
+
+def _stop_process(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
     except subprocess.TimeoutExpired:
-        st.error(f"Script execution timed out after {EXECUTION_TIMEOUT_SECONDS} seconds.")
-        stderr_data += "\n--- Execution Timed Out ---"
-        exit_code = 143 # SIGTERM typically results in 143 or similar
-        if process and process.poll() is None: # Check if process is still running
+        process.kill()
+        process.wait()
+
+
+def _stream_processes(processes, deadline, on_line, on_poll=None, poll_interval=0.25):
+    """Reads every process's stdout and stderr line by line until they exit or the deadline passes.
+
+    ``on_line(process_index, stream_name, line)`` and ``on_poll()`` (called at most every
+    ``poll_interval`` seconds) run on the calling thread, so they may update Streamlit elements.
+    Returns the exit codes, with timed-out processes terminated and reported as 143.
+    """
+    line_queue = queue.Queue()
+    open_streams = set()
+    for index, process in enumerate(processes):
+        for stream_name in ('stdout', 'stderr'):
+            key = (index, stream_name)
+            open_streams.add(key)
+            threading.Thread(
+                target=_pump_lines, args=(getattr(process, stream_name), key, line_queue), daemon=True
+            ).start()
+
+    timed_out = set()
+    deadline_passed = False
+    next_poll = 0
+    while open_streams:
+        now = time.monotonic()
+        if on_poll is not None and now >= next_poll:
+            on_poll()
+            next_poll = now + poll_interval
+        remaining = deadline - now
+        if remaining <= 0:
+            if deadline_passed:
+                break
+            deadline_passed = True
+            for index, process in enumerate(processes):
+                if process.poll() is None:
+                    timed_out.add(index)
+                    _stop_process(process)
+            deadline = time.monotonic() + 5 # Let the readers drain what the stopped processes left behind
+            continue
+        try:
+            key, line = line_queue.get(timeout=min(remaining, poll_interval))
+        except queue.Empty:
+            continue
+        if line is None:
+            open_streams.discard(key)
+        else:
+            on_line(key[0], key[1], line)
+
+    exit_codes = []
+    for index, process in enumerate(processes):
+        if index not in timed_out:
             try:
-                st.write("Attempting to terminate timed-out process...")
-                process.terminate() # Try graceful termination first
-                try:
-                    # Wait a short period for termination
-                    process.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    st.write("Termination timed out, killing process forcefully...")
-                    process.kill()
-                stdout_after, stderr_after = process.communicate()
-                stdout_data += stdout_after
-                stderr_data += stderr_after
-            except Exception as kill_err:
-                 st.warning(f"Error during process termination/kill: {kill_err}")
-        if exit_code == -1 or exit_code == 0: exit_code = 143
+                process.wait(timeout=max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                # Closed its pipes but kept running past the deadline
+                timed_out.add(index)
+                _stop_process(process)
+        exit_codes.append(_TIMEOUT_EXIT_CODE if index in timed_out else process.returncode)
+    return exit_codes
+
 
+def _launch(script_path, headless_mode, results_path=None):
+    command = ["python", "-u", script_path] # Unbuffered, so results arrive as they are printed
+    if headless_mode:
+        command.append("--headless")
+    if results_path:
+        command += [RESULTS_FILE_OPTION, results_path]
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='replace'
+    )
+    return command, process
+
+
+def merge_worker_outputs(worker_outputs, worker_test_cases):
+    """Merges per-worker ``(stdout, stderr, exit_code, records)`` into one serial-looking result.
+
+    Result blocks and records are concatenated in worker order, test cases a crashed worker
+    never reported (e.g. its browser failed to start) become ERROR blocks and records, and a
+    single EXECUTION SUMMARY is recomputed from the merged blocks.
+    """
+    stdout_parts = []
+    stderr_parts = []
+    merged_records = []
+    counts = {"PASS": 0, "FAIL": 0, "ERROR": 0}
+    exit_code = 0
+
+    for index, ((stdout_data, stderr_data, worker_exit_code, records), test_cases) in enumerate(
+        zip(worker_outputs, worker_test_cases), start=1
+    ):
+        merged_records.extend(records)
+        parsed = parse_execution_output(stdout_data)
+        reported_ids = {result['id'] for result in parsed.results}
+        for result in parsed.results:
+            counts[result['status'] if result['status'] in counts else "ERROR"] += 1
+
+        finished = parsed.summary is not None
+        stdout_parts.append(_SUMMARY_LINE_RE.sub("", stdout_data).rstrip("\n"))
+        for test_case in test_cases:
+            if not finished and str(test_case['id']) not in reported_ids:
+                counts["ERROR"] += 1
+                message = f"Worker {index} exited with code {worker_exit_code} before reporting this test."
+                stdout_parts.append(
+                    "TEST_RESULT_START\n"
+                    f"ID: {test_case['id']}\n"
+                    f"DESCRIPTION: {test_case.get('description', '')}\n"
+                    "STATUS: ERROR\n"
+                    f"MESSAGE: {message}\n"
+                    "TEST_RESULT_END"
+                )
+                if not any(str(record.get('id')) == str(test_case['id']) for record in records):
+                    merged_records.append({
+                        'id': str(test_case['id']), 'description': test_case.get('description', ''),
+                        'status': "ERROR", 'message': message,
+                    })
+
+        if stderr_data.strip():
+            stderr_parts.append(f"--- Worker {index} (exit code {worker_exit_code}) ---\n{stderr_data.rstrip()}")
+        if worker_exit_code == _TIMEOUT_EXIT_CODE:
+            exit_code = _TIMEOUT_EXIT_CODE
+        elif worker_exit_code != 0 and exit_code == 0:
+            exit_code = worker_exit_code
+
+    if exit_code == 0 and (counts["FAIL"] or counts["ERROR"]):
+        exit_code = 1
+    stdout_parts.append(
+        f"EXECUTION SUMMARY: Passed: {counts['PASS']}, Failed: {counts['FAIL']}, Errored: {counts['ERROR']}"
+    )
+    merged_stdout = "\n".join(part for part in stdout_parts if part) + "\n"
+    return merged_stdout, "\n".join(stderr_parts), exit_code, merged_records
+
+
+def _report_records(tail, on_result):
+    for record in tail.poll():
+        if on_result:
+            on_result(record_to_result(record))
+
+
+def _execution_outcome(exit_code):
+    if exit_code == 0:
+        return "ok"
+    return "timed_out" if exit_code == _TIMEOUT_EXIT_CODE else "failed"
+
+
+def execute_script_parallel(script_string, headless_mode, workers=None, test_cases=None, on_result=None,
+                            skip_reasons=None, test_ids=None, test_order=None, expected_seconds=None):
+    """Runs the script's test functions across worker processes, each with its own browser.
+
+    Test functions are found with ``ast`` and dealt to ``workers`` runner processes (default:
+    ``default_worker_count()``) that import the saved script and run their share through the
+    same orchestrator: round-robin, or with ``expected_seconds`` (test ID -> seconds) each test
+    goes to the worker with the least expected work so the shards finish together.
+    ``test_order`` lists test IDs in the order to run them (e.g. recent failures first, see
+    history_utils.RunHistory.execution_plan); unlisted tests keep their place after them.
+    Returns the merged
+    ``(stdout, stderr, exit_code, records)`` in the same shape as ``execute_script_streaming``.
+    ``test_ids`` restricts the run to those test cases (e.g. rerunning only the failures) and
+    ``skip_reasons`` maps test case IDs to a reason; those tests are reported as ERROR
+    without running. Falls back to serial execution of the whole script when none of these
+    change the run and the script has fewer than two test functions or only one worker is
+    requested.
+    ``on_result`` is forwarded as in ``execute_script_streaming``.
+    """
+    planned_cases = plan_test_cases(script_string, test_cases)
+    reordered = False
+    if test_order:
+        rank = {str(test_id): index for index, test_id in enumerate(test_order)}
+        ordered_cases = sorted(planned_cases, key=lambda tc: rank.get(str(tc['id']), len(rank)))
+        reordered = ordered_cases != planned_cases
+        planned_cases = ordered_cases
+    if test_ids is not None:
+        wanted = {str(test_id) for test_id in test_ids}
+        planned_cases = [tc for tc in planned_cases if str(tc['id']) in wanted]
+    skip_reasons = skip_reasons or {}
+    planned_cases = [
+        dict(tc, skip_reason=skip_reasons[str(tc['id'])]) if str(tc['id']) in skip_reasons else tc
+        for tc in planned_cases
+    ]
+    runnable = sum(1 for tc in planned_cases if not tc.get('skip_reason'))
+    worker_count = max(1, min(workers or default_worker_count(), runnable))
+    if worker_count < 2 and runnable == len(planned_cases) and test_ids is None and not reordered:
+        return execute_script_streaming(script_string, headless_mode, on_result)
+    with span("script_execution", mode="parallel") as labels:
+        output = _run_parallel(script_string, headless_mode, planned_cases, worker_count, on_result, expected_seconds)
+        labels['outcome'] = _execution_outcome(output[2])
+    return output
+
+
+def _deal(planned_cases, worker_count, expected_seconds=None):
+    """Splits the test cases into ``worker_count`` shards, keeping their order within each shard.
+
+    Without durations the cases are dealt round-robin. With ``expected_seconds`` each case (in
+    order, so longest-first plans pack well) goes to the shard with the least expected work;
+    skipped cases cost nothing.
+    """
+    if not expected_seconds:
+        return [planned_cases[i::worker_count] for i in range(worker_count)]
+    shards = [[] for _ in range(worker_count)]
+    loads = [0.0] * worker_count
+    for tc in planned_cases:
+        index = min(range(worker_count), key=lambda i: (loads[i], len(shards[i]), i))
+        shards[index].append(tc)
+        if not tc.get('skip_reason'):
+            loads[index] += expected_seconds.get(str(tc['id'])) or 0.0
+    return shards
+
+
+def _run_parallel(script_string, headless_mode, planned_cases, worker_count, on_result, expected_seconds=None):
+    run_id = uuid.uuid4()
+    processes = []
+    tails = []
+    try:
+        script_path = _write_test_file(f"test_script_{run_id}.py", script_string)
+        if script_path is None:
+            return "", f"Failed to create directory {TESTS_DIR}", 1, None
+        notify(f"Generated script saved to: {os.path.abspath(script_path)}")
+
+        worker_test_cases = _deal(planned_cases, worker_count, expected_seconds)
+        for index, shard in enumerate(worker_test_cases, start=1):
+            worker_path = _write_test_file(f"worker_{run_id}_{index}.py", build_worker_script(script_path, shard))
+            results_path = os.path.join(TESTS_DIR, f"worker_{run_id}_{index}.results.jsonl")
+            tails.append(_ResultsFileTail(results_path))
+            processes.append(_launch(worker_path, headless_mode, results_path)[1])
+        notify(
+            f"Test execution started on {worker_count} workers ({len(planned_cases)} tests)... "
+            f"Max timeout: {EXECUTION_TIMEOUT_SECONDS} seconds."
+        )
+
+        stdout_logs = [
+            _StdoutLog(EXECUTION_STDOUT_BUFFER_BYTES, os.path.join(TESTS_DIR, f"worker_{run_id}_{index}.stdout.log"))
+            for index in range(1, worker_count + 1)
+        ]
+        stderr_logs = [
+            _BoundedLog(EXECUTION_STDERR_BUFFER_BYTES, os.path.join(TESTS_DIR, f"worker_{run_id}_{index}.stderr.log"))
+            for index in range(1, worker_count + 1)
+        ]
+
+        def on_line(index, stream_name, line):
+            if stream_name == 'stdout':
+                stdout_logs[index].append(line)
+            else:
+                stderr_logs[index].append(line)
+
+        def on_poll():
+            for tail in tails:
+                _report_records(tail, on_result)
+
+        exit_codes = _stream_processes(processes, time.monotonic() + EXECUTION_TIMEOUT_SECONDS, on_line, on_poll)
+        on_poll()
+        worker_outputs = []
+        for stdout_log, stderr_log, tail, worker_exit_code in zip(stdout_logs, stderr_logs, tails, exit_codes):
+            stdout_log.close()
+            stderr_log.close()
+            tail.close()
+            stderr_data = stderr_log.getvalue()
+            if tail.problems:
+                stderr_data += "\n" + "\n".join(tail.problems)
+            if worker_exit_code == _TIMEOUT_EXIT_CODE:
+                stderr_data += "\n--- Execution Timed Out ---"
+            worker_outputs.append((stdout_log.getvalue(), stderr_data, worker_exit_code, tail.records))
     except FileNotFoundError:
-        st.error("Error: 'python' command not found. Is Python installed and in your system's PATH?")
-        stderr_data = "'python' command not found. Please ensure Python is installed and accessible."
-        exit_code = 1 # Use a specific code for this common setup issue
+        notify("Error: 'python' command not found. Is Python installed and in your system's PATH?", "error")
+        for process in processes:
+            process.kill()
+        return "", "'python' command not found. Please ensure Python is installed and accessible.", 1, None
     except Exception as e:
-        st.error(f"An unexpected error occurred during script execution: {e}")
-        st.error(traceback.format_exc())
-        stderr_data += f"\n--- Subprocess Wrapper Error: {e}\n{traceback.format_exc()} ---"
-        exit_code = 1
-    finally:
-        if script_path:
-            st.write(f"Script {os.path.abspath(script_path)} was used for execution.")
+        notify(f"An unexpected error occurred during parallel script execution: {e}", "error")
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+        return "", f"--- Subprocess Wrapper Error: {e}\n{traceback.format_exc()} ---", 1, None
+
+    stdout_data, stderr_data, exit_code, records = merge_worker_outputs(worker_outputs, worker_test_cases)
+    if exit_code == _TIMEOUT_EXIT_CODE:
+        notify(f"Script execution timed out after {EXECUTION_TIMEOUT_SECONDS} seconds.", "error")
+    elif exit_code == 0:
+        notify(f"Script execution finished successfully on {worker_count} workers (Exit Code: {exit_code}).", "success")
+    else:
+        notify(f"Script execution finished with errors (Exit Code: {exit_code}). Check stderr.", "warning")
+    return stdout_data, stderr_data, exit_code, records
+
+
+def execute_script_streaming(script_string, headless_mode, on_result=None):
+    """Runs the script in a subprocess and reads its output as it is produced.
+
+    Scripts that accept ``--results-file`` write one JSON record per test to a side-channel
+    file, which is tailed with incremental reads; for older scripts results are parsed from
+    stdout as it streams. Either way ``on_result(result)`` is called on this thread as soon as
+    each test completes, so the caller can update live elements. stderr is kept in a bounded
+    in-memory tail and spilled in full to a log file next to the script; so is stdout, except
+    that its result blocks and summary are always kept.
+    Returns ``(stdout, stderr, exit_code, records)``; ``records`` is None for scripts without
+    the side channel.
+    """
+    with span("script_execution", mode="serial") as labels:
+        output = _run_streaming(script_string, headless_mode, on_result)
+        labels['outcome'] = _execution_outcome(output[2])
+    return output
 
-    stdout_data = stdout_data or ""
-    stderr_data = stderr_data or ""
 
-    return stdout_data, stderr_data, exit_code
\ No newline at end of file
+def _run_streaming(script_string, headless_mode, on_result):
+    run_id = uuid.uuid4()
+    process = None
+    try:
+        script_path = _write_test_file(f"test_script_{run_id}.py", script_string)
+        if script_path is None:
+            return "", f"Failed to create directory {TESTS_DIR}", 1, None
+        notify(f"Generated script saved to: {os.path.abspath(script_path)}")
+
+        tail = None
+        if supports_results_file(script_string):
+            tail = _ResultsFileTail(os.path.join(TESTS_DIR, f"test_script_{run_id}.results.jsonl"))
+        command, process = _launch(script_path, headless_mode, tail.path if tail else None)
+        notify(f"Executing command: {' '.join(command)}")
+        notify(f"Test execution started... Max timeout: {EXECUTION_TIMEOUT_SECONDS} seconds.")
+
+        stdout_log = _StdoutLog(EXECUTION_STDOUT_BUFFER_BYTES, os.path.join(TESTS_DIR, f"test_script_{run_id}.stdout.log"))
+        stderr_log = _BoundedLog(EXECUTION_STDERR_BUFFER_BYTES, os.path.join(TESTS_DIR, f"test_script_{run_id}.stderr.log"))
+        live_results = _LiveResults(None if tail else on_result)
+
+        def on_line(index, stream_name, line):
+            if stream_name == 'stdout':
+                stdout_log.append(line)
+                live_results.feed(index, line)
+            else:
+                stderr_log.append(line)
+
+        on_poll = (lambda: _report_records(tail, on_result)) if tail else None
+        exit_code = _stream_processes([process], time.monotonic() + EXECUTION_TIMEOUT_SECONDS, on_line, on_poll)[0]
+        stdout_log.close()
+        stderr_log.close()
+        stdout_data = stdout_log.getvalue()
+        stderr_data = stderr_log.getvalue()
+        records = None
+        if tail:
+            _report_records(tail, on_result)
+            tail.close()
+            records = tail.records
+            if tail.problems:
+                stderr_data += "\n" + "\n".join(tail.problems)
+    except FileNotFoundError:
+        notify("Error: 'python' command not found. Is Python installed and in your system's PATH?", "error")
+        return "", "'python' command not found. Please ensure Python is installed and accessible.", 1, None
+    except Exception as e:
+        notify(f"An unexpected error occurred during script execution: {e}", "error")
+        if process and process.poll() is None:
+            process.kill()
+        return "", f"--- Subprocess Wrapper Error: {e}\n{traceback.format_exc()} ---", 1, None
+
+    if exit_code == _TIMEOUT_EXIT_CODE:
+        notify(f"Script execution timed out after {EXECUTION_TIMEOUT_SECONDS} seconds.", "error")
+        stderr_data += "\n--- Execution Timed Out ---"
+    elif exit_code == 0:
+        notify(f"Script execution finished successfully (Exit Code: {exit_code}).", "success")
+    else:
+        notify(f"Script execution finished with errors (Exit Code: {exit_code}). Check stderr.", "warning")
+    return stdout_data, stderr_data, exit_code, records
@@ -1,47 +1,470 @@
-import streamlit as st
 import google.generativeai as genai
+import hashlib
+import itertools
 import json
+import logging
 import re
-import traceback
-from config import GEMINI_MODEL_TEST_CASE, GEMINI_MODEL_SCRIPT, REQUEST_TIMEOUT_SECONDS
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from cache_utils import DiskCache
+from metrics_utils import get_metrics_registry, record_gemini_usage, span
+from notes_utils import current_sink, notes_to, notify
+from resilience_utils import CircuitBreaker, CircuitOpenError, LatencyTracker, call_with_retries, hedged_call
+from json_utils import TestCaseStreamParser, extract_json_objects
+from script_utils import (
+    assemble_script_from_parts, split_generated_code, test_case_hash, test_function_name,
+)
+from config import (
+    GEMINI_MODEL_TEST_CASE, GEMINI_MODEL_SCRIPT, REQUEST_TIMEOUT_SECONDS,
+    GEMINI_CACHE_ENABLED, GEMINI_CACHE_DIR, GEMINI_CACHE_MAX_ENTRIES,
+    GEMINI_CACHE_MAX_BYTES, GEMINI_CACHE_MAX_AGE_SECONDS,
+    SCRIPT_SHARD_SIZE, SCRIPT_SHARD_MAX_WORKERS,
+    MODEL_ROUTING_ENABLED, GEMINI_MODEL_FAST, GEMINI_MODEL_STRONG, ROUTING_FAST_MAX_PROMPT_TOKENS,
+    ROUTING_FAST_MAX_TEST_CASES, ROUTING_FAST_MAX_STEPS, ROUTING_STRONG_LATENCY_RATIO, ROUTING_LOG_SIZE,
+    GEMINI_ATTEMPT_TIMEOUT_SECONDS, GEMINI_MAX_RETRIES, GEMINI_RETRY_BASE_SECONDS, GEMINI_RETRY_MAX_SECONDS,
+    GEMINI_HEDGE_ENABLED, GEMINI_HEDGE_PERCENTILE, GEMINI_HEDGE_MIN_SAMPLES, GEMINI_HEDGE_MAX_RATIO,
+    GEMINI_LATENCY_WINDOW, GEMINI_CIRCUIT_FAILURE_THRESHOLD, GEMINI_CIRCUIT_RESET_SECONDS,
+)
 
-def call_gemini(prompt, model, api_key):
-    """Sends a prompt to the Google Generative AI API and returns the response content."""
-    try:
-        genai.configure(api_key=api_key)
-        llm = genai.GenerativeModel(model_name=model)
-        response = llm.generate_content(
-            prompt,
-            request_options={'timeout': REQUEST_TIMEOUT_SECONDS},
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.2
+logger = logging.getLogger(__name__)
+
+GENERATION_CONFIG = {'temperature': 0.2}
+
+_response_cache = DiskCache(
+    GEMINI_CACHE_DIR, GEMINI_CACHE_MAX_ENTRIES, GEMINI_CACHE_MAX_BYTES, GEMINI_CACHE_MAX_AGE_SECONDS
+)
+
+# Whether the last call_gemini on this thread was served from the cache (routing ignores those latencies)
+_call_state = threading.local()
+
+_routing_log = deque(maxlen=ROUTING_LOG_SIZE)
+_routing_latency = {} # (task, tier) -> [live calls, total seconds]
+_routing_lock = threading.Lock()
+
+
+def _normalize_prompt(prompt):
+    """Normalizes prompt text so indentation and trailing whitespace don't change the cache key."""
+    lines = [line.strip() for line in str(prompt).strip().splitlines()]
+    return "\n".join(lines)
+
+
+def _cache_key(prompt, model, generation_config):
+    """Builds a content-addressed key from the model, normalized prompt and generation config."""
+    key_material = json.dumps(
+        {
+            'model': model,
+            'prompt': _normalize_prompt(prompt),
+            'generation_config': generation_config,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+
+def get_cache_stats():
+    """Returns a snapshot of the Gemini response cache counters."""
+    stats = _response_cache.stats()
+    stats['enabled'] = GEMINI_CACHE_ENABLED
+    return stats
+
+
+def clear_cache():
+    """Removes every cached Gemini response from disk."""
+    _response_cache.clear()
+
+
+class GeminiClient:
+    """Shared Gemini client: configured models are reused per model name and every request is
+    retried on transient errors with jittered backoff, hedged with a duplicate once it outlives
+    the model's observed p95 latency, and refused while the circuit breaker is open.
+    """
+
+    def __init__(self):
+        self._api_key = None
+        self._models = {}
+        self._latency = {}
+        self._counts = {'requests': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0, 'circuit_rejections': 0}
+        self._lock = threading.Lock()
+        self._breaker = CircuitBreaker(GEMINI_CIRCUIT_FAILURE_THRESHOLD, GEMINI_CIRCUIT_RESET_SECONDS)
+        self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="gemini-request")
+
+    def model(self, model_name, api_key):
+        """Returns the configured GenerativeModel for the name, building it on first use."""
+        with self._lock:
+            if api_key != self._api_key:
+                genai.configure(api_key=api_key)
+                self._api_key = api_key
+                self._models.clear()
+            llm = self._models.get(model_name)
+            if llm is None:
+                llm = self._models[model_name] = genai.GenerativeModel(model_name=model_name)
+            return llm
+
+    def _count(self, name, model_name=None):
+        with self._lock:
+            self._counts[name] += 1
+        get_metrics_registry().increment(f"gemini_{name}", **({'model': model_name} if model_name else {}))
+
+    def _tracker(self, model_name):
+        with self._lock:
+            if model_name not in self._latency:
+                self._latency[model_name] = LatencyTracker(GEMINI_LATENCY_WINDOW)
+            return self._latency[model_name]
+
+    def _hedge_after(self, model_name):
+        """The model's p95 latency, or None when hedging is off, unproven or over its budget."""
+        if not GEMINI_HEDGE_ENABLED:
+            return None
+        with self._lock:
+            if self._counts['hedges'] >= GEMINI_HEDGE_MAX_RATIO * self._counts['requests']:
+                return None
+        return self._tracker(model_name).percentile(GEMINI_HEDGE_PERCENTILE, GEMINI_HEDGE_MIN_SAMPLES)
+
+    def _with_retries(self, model_name, func):
+        deadline = time.monotonic() + REQUEST_TIMEOUT_SECONDS
+        self._count('requests')
+
+        def on_retry(attempt, error, delay):
+            self._count('retries', model_name)
+            notify(f"Gemini {model_name} attempt {attempt} failed ({type(error).__name__}: {error}); retrying in {delay:.1f}s.")
+
+        def attempt():
+            timeout = min(GEMINI_ATTEMPT_TIMEOUT_SECONDS, deadline - time.monotonic())
+            if timeout <= 0:
+                raise TimeoutError(f"Gemini request exceeded {REQUEST_TIMEOUT_SECONDS}s")
+            return func(timeout)
+
+        try:
+            return call_with_retries(
+                attempt, GEMINI_MAX_RETRIES, GEMINI_RETRY_BASE_SECONDS, GEMINI_RETRY_MAX_SECONDS,
+                deadline=deadline, breaker=self._breaker, on_retry=on_retry,
             )
-        )
+        except CircuitOpenError:
+            self._count('circuit_rejections')
+            raise
 
-        if not response.parts:
-            st.warning("Gemini response might have been blocked or is empty.")
-            try:
-                st.warning(f"Prompt Feedback: {response.prompt_feedback}")
-                if response.prompt_feedback and response.prompt_feedback.block_reason:
-                    st.error(f"Content blocked due to: {response.prompt_feedback.block_reason_message or response.prompt_feedback.block_reason}")
-            except ValueError:
-                st.warning("Could not retrieve prompt feedback (response might be fully blocked).")
+    def generate(self, prompt, model_name, api_key):
+        """Blocking request; returns the response."""
+        llm = self.model(model_name, api_key)
+        tracker = self._tracker(model_name)
+
+        def request(timeout):
+            return llm.generate_content(
+                prompt,
+                request_options={'timeout': timeout},
+                generation_config=genai.types.GenerationConfig(**GENERATION_CONFIG)
+            )
+
+        def attempt(timeout):
+            hedge_after = self._hedge_after(model_name)
+            started = time.perf_counter()
+            if hedge_after is None:
+                response = request(timeout)
+            else:
+                response, hedged, duplicate_won = hedged_call(lambda: request(timeout), hedge_after, self._executor)
+                if hedged:
+                    self._count('hedges', model_name)
+                if duplicate_won:
+                    self._count('hedge_wins', model_name)
+            tracker.observe(time.perf_counter() - started)
+            return response
+
+        return self._with_retries(model_name, attempt)
+
+    def stream(self, prompt, model_name, api_key):
+        """Streaming request, retried until its first chunk arrives.
+
+        Returns ``(response, chunks)``. Failures after the first chunk are not retried because
+        text has already reached the caller, and streams are not hedged.
+        """
+        llm = self.model(model_name, api_key)
+
+        def attempt(timeout):
+            response = llm.generate_content(
+                prompt,
+                stream=True,
+                request_options={'timeout': timeout},
+                generation_config=genai.types.GenerationConfig(**GENERATION_CONFIG)
+            )
+            chunks = iter(response)
+            first_chunk = next(chunks, None)
+            return response, ([] if first_chunk is None else [first_chunk]), chunks
+
+        response, head, rest = self._with_retries(model_name, attempt)
+        return response, itertools.chain(head, rest)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            trackers = dict(self._latency)
+        counts['circuit'] = self._breaker.state()
+        counts['p95_seconds'] = {name: tracker.percentile(GEMINI_HEDGE_PERCENTILE) for name, tracker in trackers.items()}
+        return counts
+
+
+_client = GeminiClient()
+
+
+def get_client_stats():
+    """Returns the Gemini client's request, retry, hedge and circuit breaker counters."""
+    return _client.stats()
+
+
+def call_gemini(prompt, model, api_key, use_cache=True, stream=False):
+    """Sends a prompt to the Google Generative AI API and returns the response content.
+
+    With ``stream=True`` an iterator of text chunks is returned instead of the full text.
+    """
+    cache_key = None
+    _call_state.cache_hit = False
+    if use_cache and GEMINI_CACHE_ENABLED:
+        cache_key = _cache_key(prompt, model, GENERATION_CONFIG)
+        with span("gemini_cache_lookup", model=model) as labels:
+            cached_text = _response_cache.get(cache_key)
+            labels['outcome'] = "miss" if cached_text is None else "hit"
+        if cached_text is not None:
+            _call_state.cache_hit = True
+            notify(f"Gemini cache hit for {model} ({len(cached_text)} chars).")
+            return iter([cached_text]) if stream else cached_text
+
+    if stream:
+        return _stream_gemini(prompt, model, api_key, cache_key)
+
+    with span("gemini_call", model=model, mode="blocking") as labels:
+        try:
+            response = _client.generate(prompt, model, api_key)
+            record_gemini_usage(model, prompt, response)
+
+            if not response.parts:
+                labels['outcome'] = "empty"
+                _report_empty_response(response)
+                return None
+
+            response_content = response.text
+            if cache_key and response_content:
+                _response_cache.put(cache_key, response_content)
+            return response_content
+
+        except CircuitOpenError as e:
+            labels['outcome'] = "circuit_open"
+            notify(f"Gemini API is failing repeatedly; requests are paused ({e}).", "error")
+        except Exception as e:
+            labels['outcome'] = "error"
+            notify(f"Error communicating with Gemini API: {e}", "error")
+            logger.exception("Gemini %s call failed", model)
             return None
 
-        response_content = response.text
-        return response_content
 
-    except Exception as e:
-        st.error(f"Error communicating with Gemini API: {e}")
-        st.error(traceback.format_exc())
-        return None
+def _report_empty_response(response):
+    notify("Gemini response might have been blocked or is empty.", "warning")
+    try:
+        notify(f"Prompt Feedback: {response.prompt_feedback}", "warning")
+        if response.prompt_feedback and response.prompt_feedback.block_reason:
+            notify(f"Content blocked due to: {response.prompt_feedback.block_reason_message or response.prompt_feedback.block_reason}", "error")
+    except ValueError:
+        notify("Could not retrieve prompt feedback (response might be fully blocked).", "warning")
+
+
+def _stream_gemini(prompt, model, api_key, cache_key):
+    """Yields response text chunks as Gemini produces them, caching the full text at the end."""
+    received_chunks = []
+    with span("gemini_call", model=model, mode="stream") as labels:
+        try:
+            started = time.perf_counter()
+            response, chunks = _client.stream(prompt, model, api_key)
+
+            for chunk in chunks:
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    continue # Chunk without text parts (e.g. safety metadata only)
+                if chunk_text:
+                    if not received_chunks:
+                        get_metrics_registry().observe("gemini_first_chunk", time.perf_counter() - started, model=model)
+                    received_chunks.append(chunk_text)
+                    yield chunk_text
+
+            record_gemini_usage(model, prompt, response)
+            if not received_chunks:
+                labels['outcome'] = "empty"
+                _report_empty_response(response)
+                return
+
+            if cache_key:
+                _response_cache.put(cache_key, "".join(received_chunks))
+
+        except CircuitOpenError as e:
+            labels['outcome'] = "circuit_open"
+            notify(f"Gemini API is failing repeatedly; requests are paused ({e}).", "error")
+        except Exception as e:
+            labels['outcome'] = "error"
+            notify(f"Error communicating with Gemini API: {e}", "error")
+            logger.exception("Gemini %s call failed", model)
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) used for routing decisions."""
+    return len(str(text or "")) // 4
+
+
+def _test_case_complexity(test_cases):
+    """How much a script request asks for: test case and step counts."""
+    cases = [tc for tc in test_cases if isinstance(tc, dict)]
+    steps = sum(len(tc.get('steps') or []) for tc in cases if isinstance(tc.get('steps'), list))
+    return {'test_cases': len(cases), 'steps': steps}
+
+
+def route_model(task, prompt, complexity=None):
+    """Picks the model tier for a request.
+
+    Returns ``{'task', 'tier', 'model', 'prompt_tokens', 'complexity', 'reason'}``; the fast
+    tier is chosen unless the prompt or the requested work exceeds the ROUTING_FAST_* limits.
+    """
+    complexity = complexity or {}
+    decision = {'task': task, 'prompt_tokens': estimate_tokens(prompt), 'complexity': complexity}
+    if decision['prompt_tokens'] > ROUTING_FAST_MAX_PROMPT_TOKENS:
+        reason = f"prompt ~{decision['prompt_tokens']} tokens > {ROUTING_FAST_MAX_PROMPT_TOKENS}"
+    elif complexity.get('test_cases', 0) > ROUTING_FAST_MAX_TEST_CASES:
+        reason = f"{complexity['test_cases']} test cases > {ROUTING_FAST_MAX_TEST_CASES}"
+    elif complexity.get('steps', 0) > ROUTING_FAST_MAX_STEPS:
+        reason = f"{complexity['steps']} steps > {ROUTING_FAST_MAX_STEPS}"
+    else:
+        return dict(decision, tier="fast", model=GEMINI_MODEL_FAST, reason="within fast-tier limits")
+    return dict(decision, tier="strong", model=GEMINI_MODEL_STRONG, reason=reason)
+
+
+def _strong_latency_estimate(task, fast_seconds):
+    """Average observed strong-tier latency for the task, or the configured ratio until there is one."""
+    calls, total = _routing_latency.get((task, "strong"), (0, 0.0))
+    if calls:
+        return total / calls, "observed"
+    return fast_seconds * ROUTING_STRONG_LATENCY_RATIO, "prior"
+
+
+def _record_routing(decision, attempts):
+    """Logs a routing decision with its attempts and the latency it saved (or wasted)."""
+    first = attempts[0]
+    escalated = len(attempts) > 1
+    if escalated:
+        outcome = "escalated"
+    else:
+        outcome = "accepted" if first['problem'] is None else "invalid"
+    saved_seconds = wasted_seconds = 0.0
+    estimate_source = None
+    with _routing_lock:
+        if decision['tier'] == "fast" and not first['cached']:
+            if escalated:
+                wasted_seconds = first['seconds'] # The rejected fast attempt only added latency
+            elif first['problem'] is None:
+                strong_seconds, estimate_source = _strong_latency_estimate(decision['task'], first['seconds'])
+                saved_seconds = max(0.0, strong_seconds - first['seconds'])
+        for attempt in attempts:
+            if not attempt['cached']:
+                stats = _routing_latency.setdefault((decision['task'], attempt['tier']), [0, 0.0])
+                stats[0] += 1
+                stats[1] += attempt['seconds']
+        _routing_log.append(dict(
+            decision, outcome=outcome, attempts=attempts, saved_seconds=saved_seconds,
+            wasted_seconds=wasted_seconds, estimate_source=estimate_source, at=time.time(),
+        ))
+    registry = get_metrics_registry()
+    registry.increment('model_routing_decisions', task=decision['task'], tier=decision['tier'], outcome=outcome)
+    if saved_seconds:
+        registry.increment('model_routing_saved_seconds', saved_seconds, task=decision['task'])
+    if wasted_seconds:
+        registry.increment('model_routing_wasted_seconds', wasted_seconds, task=decision['task'])
+
+
+def get_routing_stats(recent=20):
+    """Summarises routing decisions so the ROUTING_FAST_* thresholds can be tuned."""
+    with _routing_lock:
+        log = list(_routing_log)
+    return {
+        'enabled': MODEL_ROUTING_ENABLED,
+        'decisions': len(log),
+        'fast': sum(1 for entry in log if entry['tier'] == "fast"),
+        'strong': sum(1 for entry in log if entry['tier'] == "strong"),
+        'escalations': sum(1 for entry in log if entry['outcome'] == "escalated"),
+        'saved_seconds': sum(entry['saved_seconds'] for entry in log),
+        'wasted_seconds': sum(entry['wasted_seconds'] for entry in log),
+        'recent': log[-recent:],
+    }
+
+
+def _timed_attempt(tier, call, validate):
+    started = time.perf_counter()
+    result = call()
+    seconds = time.perf_counter() - started
+    return result, {
+        'tier': tier, 'seconds': round(seconds, 3),
+        'cached': getattr(_call_state, 'cache_hit', False), 'problem': validate(result),
+    }
+
+
+def _routed_call(task, prompt, api_key, validate, fixed_model, complexity=None):
+    """Calls Gemini on the routed tier, escalating once to the strong tier if the fast output is rejected.
+
+    ``validate(text)`` returns None for usable output or a short reason. With routing disabled
+    ``fixed_model`` is used as before. Returns the last response text.
+    """
+    if not MODEL_ROUTING_ENABLED:
+        return call_gemini(prompt, fixed_model, api_key)
 
+    decision = route_model(task, prompt, complexity)
+    text, attempt = _timed_attempt(decision['tier'], lambda: call_gemini(prompt, decision['model'], api_key), validate)
+    attempts = [attempt]
+    if attempt['problem'] and decision['tier'] == "fast":
+        notify(f"Fast model output for {task} failed validation ({attempt['problem']}); escalating to {GEMINI_MODEL_STRONG}.")
+        text, attempt = _timed_attempt("strong", lambda: call_gemini(prompt, GEMINI_MODEL_STRONG, api_key), validate)
+        attempts.append(attempt)
+    _record_routing(decision, attempts)
+    return text
 
-def generate_test_cases(requirement_text, api_key):
-    """Generates structured test cases using Gemini, with more flexible negative test expectations."""
-    from config import GEMINI_MODEL_TEST_CASE
 
-    prompt = f"""
+def _test_cases_problem(raw_response):
+    """Validation for routed test case generation: the response must contain test case objects."""
+    if not raw_response:
+        return "empty response"
+    objects, _ = extract_json_objects(raw_response)
+    return None if objects else "no parseable test case objects"
+
+
+_SCRIPT_BLOCK_RE = re.compile(r"```python\s*(.*?)\s*```", re.DOTALL | re.IGNORECASE)
+
+
+def _find_script_code(response_content):
+    """Returns ``(code, fenced)`` from a response, or ``(None, False)`` if it holds no Python code."""
+    match = _SCRIPT_BLOCK_RE.search(response_content or "")
+    if match:
+        return match.group(1).strip(), True
+    stripped = (response_content or "").strip()
+    if stripped.startswith("import ") or stripped.startswith("from "):
+        return stripped, False
+    return None, False
+
+
+def _script_problem(response_content, function_names=()):
+    """Validation for routed script generation: a Python block that compiles and defines the expected functions."""
+    if not response_content:
+        return "empty response"
+    code, _ = _find_script_code(response_content)
+    if code is None:
+        return "no python code block"
+    try:
+        compile(code, "<generated script>", "exec")
+    except (SyntaxError, ValueError) as e:
+        return f"code does not compile ({getattr(e, 'msg', e)} at line {getattr(e, 'lineno', '?')})"
+    missing = [name for name in function_names if not re.search(rf"^def {re.escape(name)}\(", code, re.MULTILINE)]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    return None
+
+
+def _build_test_case_prompt(requirement_text):
+    """Builds the prompt asking Gemini for a JSON array of test cases."""
+    return f"""
     You are an expert Software Quality Assurance Engineer. Based on the following software requirement description, generate a comprehensive list of test cases in JSON format ONLY.
 
     Software Requirement:
@@ -67,86 +490,86 @@ def generate_test_cases(requirement_text, api_key):
     Generate the JSON output now:
     """
 
-    raw_response = call_gemini(prompt, GEMINI_MODEL_TEST_CASE, api_key)
-    if raw_response:
-        try:
-            cleaned_response = raw_response.strip()
-            # Remove markdown fences (```json ... ``` or ``` ... ```)
-            if cleaned_response.startswith("```json"):
-                cleaned_response = cleaned_response[7:]
-                if cleaned_response.endswith("```"):
-                    cleaned_response = cleaned_response[:-3]
-            elif cleaned_response.startswith("```"):
-                cleaned_response = cleaned_response[3:]
-                if cleaned_response.endswith("```"):
-                    cleaned_response = cleaned_response[:-3]
-            cleaned_response = cleaned_response.strip()
-
-            json_start_index = cleaned_response.find('[')
-            json_end_index = cleaned_response.rfind(']')
-
-            if json_start_index != -1 and json_end_index != -1 and json_start_index < json_end_index:
-                cleaned_response = cleaned_response[json_start_index : json_end_index + 1]
-            else:
-                first_brace = cleaned_response.find('{')
-                last_brace = cleaned_response.rfind('}')
-                if first_brace != -1 and last_brace != -1 and first_brace < last_brace:
-                     cleaned_response = cleaned_response[first_brace : last_brace + 1]
-                     if not cleaned_response.startswith('['):
-                         cleaned_response = f"[{cleaned_response}]"
-                else:
-                    return None
-
-            cleaned_response = re.sub(r",\s*(}|])", r"\1", cleaned_response)
-
-            cleaned_response = re.sub(r'\[\s*\d+\s*:\s*', '[', cleaned_response)
-            cleaned_response = re.sub(r',\s*\d+\s*:\s*', ',', cleaned_response)
-
-            parsed_json = json.loads(cleaned_response)
-            return parsed_json
-
-        except json.JSONDecodeError as e:
-            st.error(f"LLM generated invalid JSON even after cleaning attempts: {e}")
-            st.text_area("JSON After Cleaning (Failed Parse):", cleaned_response, height=200)
-            st.text_area("Original Raw Response from LLM:", raw_response, height=100)
-            return None
-        except Exception as e_clean:
-            st.error(f"Unexpected error processing/cleaning LLM response: {e_clean}")
-            st.text_area("Raw Response Causing Processing Error:", raw_response, height=200)
-            return None
-    else:
-        st.warning("Received no response from LLM for test case generation.")
-    return None
 
+def _unwrap_test_cases(objects):
+    """Unwraps responses shaped like {"test_cases": [...]} into the inner list."""
+    if len(objects) == 1 and 'id' not in objects[0]:
+        for value in objects[0].values():
+            if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+                return value
+    return objects
 
-def generate_script(test_cases_list_of_dicts, url, html_excerpt, api_key):
-    """Generates a Python Selenium script with structured output based on test cases and HTML."""
-    from config import GEMINI_MODEL_SCRIPT
 
-    try:
-        test_cases_json_str = json.dumps(test_cases_list_of_dicts, indent=2)
-    except Exception as e:
-        st.error(f"Error converting test cases to JSON string: {e}")
+def _parse_test_cases_response(raw_response):
+    """Recovers the list of test case dicts from a raw (possibly malformed) Gemini response."""
+    if not raw_response:
+        notify("Received no response from LLM for test case generation.", "warning")
         return None
 
-    prompt = f"""
-    You are an expert Python Test Automation Engineer specializing in Selenium WebDriver.
-    Your task is to generate a complete Python script to automate the provided test cases (in JSON format) against a web application.
-    The script MUST output results for each test case to `stdout` in a specific structured format.
+    test_cases, parse_errors = extract_json_objects(raw_response)
+    for parse_error in parse_errors:
+        notify(parse_error, "warning")
 
-    Target URL: {url}
+    if not test_cases:
+        notify("LLM response did not contain any parseable test case objects.", "error")
+        logger.warning("Unparseable test case response from LLM:\n%s", raw_response)
+        return None
+    return _unwrap_test_cases(test_cases)
 
-    Test Cases (JSON):
-    ```json
-    {test_cases_json_str}
-    ```
 
-    HTML Excerpt (from the target URL's initial load, use for selector guidance):
-    ```html
-    {html_excerpt}
-    ... (HTML may be truncated) ...
-    ```
+def stream_test_cases(requirement_text, api_key):
+    """Streams test cases from Gemini, yielding each test case dict as soon as it is complete.
+
+    With routing enabled a fast-tier stream that yields no test case at all is retried on the
+    strong tier (test cases already shown cannot be taken back, so partial output is kept).
+    """
+    prompt = _build_test_case_prompt(requirement_text)
+    if MODEL_ROUTING_ENABLED:
+        decision = route_model("test_cases", prompt)
+        tiers = [(decision['tier'], decision['model'])]
+        if decision['tier'] == "fast":
+            tiers.append(("strong", GEMINI_MODEL_STRONG))
+    else:
+        decision = None
+        tiers = [("fixed", GEMINI_MODEL_TEST_CASE)]
+
+    attempts = []
+    for tier, model in tiers:
+        parser = TestCaseStreamParser()
+        raw_chunks = []
+        yielded_count = 0
+        started = time.perf_counter()
 
+        chunks = call_gemini(prompt, model, api_key, stream=True)
+        cached = getattr(_call_state, 'cache_hit', False)
+        for chunk in chunks:
+            raw_chunks.append(chunk)
+            for test_case in _unwrap_test_cases(parser.feed(chunk)):
+                yielded_count += 1
+                yield test_case
+        for test_case in _unwrap_test_cases(parser.close()):
+            yielded_count += 1
+            yield test_case
+
+        for parse_error in parser.errors:
+            notify(parse_error, "warning")
+
+        attempts.append({
+            'tier': tier, 'seconds': round(time.perf_counter() - started, 3), 'cached': cached,
+            'problem': None if yielded_count else _test_cases_problem("".join(raw_chunks)) or "no complete test cases",
+        })
+        if yielded_count or tier != "fast":
+            break
+        notify(f"Fast model returned no usable test cases ({attempts[-1]['problem']}); escalating to {GEMINI_MODEL_STRONG}.")
+
+    if decision is not None:
+        _record_routing(decision, attempts)
+    if yielded_count == 0:
+        # Reports the empty/unparseable response to the user
+        _parse_test_cases_response("".join(raw_chunks))
+
+
+_SCRIPT_OUTPUT_FORMAT = """
     **Critical Output Format for each test case (to `stdout`):**
     Each test function must print its result in the following multi-line format. This exact format is essential.
     ```
@@ -161,24 +584,13 @@ def generate_script(test_cases_list_of_dicts, url, html_excerpt, api_key):
     - `STATUS: FAIL` if an assertion fails or a specific expected negative outcome is not met correctly.
     - `STATUS: ERROR` if an unexpected Selenium exception (e.g., NoSuchElementException) occurs that prevents test completion.
     - `MESSAGE` should be concise and informative.
+"""
 
-    Python Script Generation Instructions:
-    1. **No writing the JSON data that was attached to the script:** Do not include the JSON data in the script. The script should be able to run without needing to parse or include the JSON data directly.
-    2.  **Script Structure:**
-        * Generate a complete, runnable Python script using Selenium with Python.
-        * Include necessary imports: `selenium`, `time`, `argparse`, `sys`, `webdriver_manager.chrome`, `selenium.webdriver.support.ui.WebDriverWait`, `selenium.webdriver.support.expected_conditions as EC`, `selenium.webdriver.common.by.By`, `selenium.common.exceptions`.
-        * Implement each test case from the JSON as a separate function (e.g., `def test_TC001(driver, test_case_data):`). Pass the `driver` and the corresponding `test_case_data` (dict for that TC) to each test function.
-    3.  **Main Execution Block (`if __name__ == "__main__":`)**:
-        * This block MUST orchestrate the running of ALL test functions.
-        * It MUST handle WebDriver setup (using `webdriver_manager.chrome.ChromeDriverManager` and respecting a `--headless` argument via `argparse`).
-        * For each test case mentioned in the JSON:
-            * Call the corresponding test function (e.g., `test_TC001(driver, tc_data)`).
-            * **Crucially, the call to EACH test function MUST be wrapped in its own `try...except Exception as e:` block.**
-            * If an *unexpected* exception occurs within a test function's `try` block (not an `AssertionError` that you handle to set FAIL status), this main loop's `except` block should catch it. It should then print the structured output with `STATUS: ERROR` and the exception message.
-            * Detailed tracebacks for these unexpected errors should still be printed to `sys.stderr` using `traceback.print_exc(file=sys.stderr)`.
-        * Maintain counters for total passed, failed, and errored tests. Print a summary to `stdout` at the very end (e.g., "EXECUTION SUMMARY: Passed: X, Failed: Y, Errored: Z").
-        * Ensure `driver.quit()` is in a `finally` block associated with the main WebDriver setup.
-    4.  **Test Implementation (Inside each `def test_TCXXX(driver, test_case_data):` function):**
+
+def _test_implementation_instructions(url, section_number):
+    """The per-test-function instructions shared by the full-script and shard prompts."""
+    return f"""
+    {section_number}.  **Test Implementation (Inside each `def test_TCXXX(driver, test_case_data):` function):**
         * The function should start by printing the `TEST_RESULT_START`, `ID`, and `DESCRIPTION` lines using `test_case_data['id']` and `test_case_data['description']`.
         * Implement steps from `test_case_data['steps']`. Navigate to `{url}` at the start of each test for independence.
         * **Selector Strategy:** Use the HTML Excerpt for robust selectors (`By.ID`, `By.NAME`, `By.CSS_SELECTOR`, `By.XPATH`). Prioritize reliable ones. If HTML is limited, make reasonable choices and add a comment.
@@ -191,26 +603,146 @@ def generate_script(test_cases_list_of_dicts, url, html_excerpt, api_key):
             * If an `AssertionError` occurs, it should be caught within the test function. Print `STATUS: FAIL` with a message detailing the assertion failure, then `TEST_RESULT_END`.
             * If an *unexpected* Selenium exception occurs (e.g. `TimeoutException`, `NoSuchElementException`), let it propagate to be caught by the main loop's `try...except`, which will then print the `STATUS: ERROR` block.
             * Ensure `TEST_RESULT_END` is always printed for each test attempt, even after a FAIL. If an unhandled exception causes it to be skipped, the main loop's error handler will deal with it.
+"""
+
+
+def _extract_script_code(response_content):
+    """Pulls the Python code block out of a Gemini response."""
+    with span("script_extraction") as labels:
+        code, fenced = _find_script_code(response_content)
+        if code is not None and not fenced:
+            notify("Response did not contain ```python markers, but starts like Python code. Using the full response.", "warning")
+        if code is None:
+            labels['outcome'] = "error"
+            notify("Could not extract Python code block from the Gemini response.", "error")
+            # st.text_area("Raw Gemini Response (Code Block Extraction Failed):", response_content, height=200)
+        return code
+
+
+def _run_in_threads(func, items, max_workers):
+    """Maps func over items on a bounded thread pool, sending notify() messages where this thread's go."""
+    sink = current_sink()
+
+    def run(item):
+        with notes_to(sink):
+            return func(item)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        return list(pool.map(run, items))
+
+
+def _build_shard_prompt(shard_test_cases, url, html_excerpt):
+    """Builds the prompt for one shard: imports, helpers and test functions but no main block."""
+    test_cases_json_str = json.dumps(shard_test_cases, indent=2)
+    function_names = ", ".join(f"`{test_function_name(tc.get('id', ''))}`" for tc in shard_test_cases)
+
+    return f"""
+    You are an expert Python Test Automation Engineer specializing in Selenium WebDriver.
+    Your task is to generate Python test functions that automate the provided test cases (in JSON format) against a web application.
+    These functions will be merged with functions generated for other test cases into one script that already has its own `if __name__ == "__main__":` orchestrator.
+
+    Target URL: {url}
+
+    Test Cases (JSON):
+    ```json
+    {test_cases_json_str}
+    ```
+
+    HTML Excerpt (from the target URL's initial load, use for selector guidance):
+    ```html
+    {html_excerpt}
+    ... (HTML may be truncated) ...
+    ```
+
+    {_SCRIPT_OUTPUT_FORMAT}
+
+    Python Code Generation Instructions:
+    1.  **Functions only:** Generate the imports the functions need, any small helper functions, and exactly one function per test case with these names: {function_names}. Each has the signature `(driver, test_case_data)`.
+    2.  **No orchestration:** Do NOT write an `if __name__ == "__main__":` block, do NOT create or quit a WebDriver, and do NOT define `TEST_CASES` or `run_test_cases`. The orchestrator passes an already started `driver`, catches unexpected exceptions and prints the `STATUS: ERROR` block and summary itself.
+    3.  **No writing the JSON data that was attached to the script:** Do not include the JSON data in the code.
+    {_test_implementation_instructions(url, 4)}
     5.  **Output Format:** Generate ONLY the Python code block, enclosed in triple backticks (```python ... ```). No explanations outside the code block.
-    Generate the Python script now:
+    Generate the Python code now:
     """
 
-    response_content = call_gemini(prompt, GEMINI_MODEL_SCRIPT, api_key)
-    if response_content:
-        script_code = None
-        match = re.search(r"```python\s*(.*?)\s*```", response_content, re.DOTALL | re.IGNORECASE)
-        if match:
-            script_code = match.group(1).strip()
-        else:
-            if response_content.strip().startswith("import ") or response_content.strip().startswith("from "):
-                st.warning("Response did not contain ```python markers, but starts like Python code. Using the full response.")
-                script_code = response_content.strip()
-            else:
-                st.error("Could not extract Python code block from the Gemini response.")
-                # st.text_area("Raw Gemini Response (Code Block Extraction Failed):", response_content, height=200)
-                return None
 
-        return script_code
-    else:
-        st.warning("Received no response from LLM for script generation.")
-    return None
\ No newline at end of file
+def _generate_shard_sources(test_cases, url, html_excerpt, api_key, shard_size):
+    """Splits test cases into shards and generates their code concurrently.
+
+    Returns a list of ``(shard_test_cases, code_or_None)`` pairs.
+    """
+    shard_size = max(1, shard_size)
+    shards = [test_cases[i:i + shard_size] for i in range(0, len(test_cases), shard_size)]
+    notify(f"Generating script in {len(shards)} shard(s) of up to {shard_size} test case(s)...")
+
+    def generate_shard(shard_test_cases):
+        try:
+            prompt = _build_shard_prompt(shard_test_cases, url, html_excerpt)
+        except Exception as e:
+            notify(f"Error converting test cases to JSON string: {e}", "error")
+            return None
+        function_names = [test_function_name(tc.get('id', '')) for tc in shard_test_cases]
+        response_content = _routed_call(
+            "script_shard", prompt, api_key, lambda text: _script_problem(text, function_names), GEMINI_MODEL_SCRIPT,
+            complexity=_test_case_complexity(shard_test_cases),
+        )
+        if not response_content:
+            return None
+        return _extract_script_code(response_content)
+
+    shard_sources = _run_in_threads(generate_shard, shards, SCRIPT_SHARD_MAX_WORKERS)
+    for shard_test_cases, source in zip(shards, shard_sources):
+        if not source:
+            missing_ids = ", ".join(str(tc.get('id')) for tc in shard_test_cases)
+            notify(f"Script generation failed for {missing_ids}; they will be reported as ERROR when run.", "warning")
+    return list(zip(shards, shard_sources))
+
+
+def generate_script_incremental(test_cases_list_of_dicts, url, html_excerpt, api_key, function_store, page_hash=None, shard_size=SCRIPT_SHARD_SIZE):
+    """Regenerates only added or edited test cases and splices unchanged functions back in.
+
+    ``function_store`` maps ``test_case_hash`` values to previously generated parts and is
+    updated in place: new functions are added and entries for deleted cases are dropped.
+    ``html_excerpt`` is only used when something needs generating (see ``pending_test_cases``).
+    Passing the scraped page's ``page_hash`` regenerates every function once the DOM changes.
+    """
+    test_cases = [tc for tc in test_cases_list_of_dicts if isinstance(tc, dict)]
+    if not test_cases:
+        notify("No test cases to generate a script for.", "error")
+        return None
+
+    case_hashes = [test_case_hash(tc, url, page_hash) for tc in test_cases]
+    pending = [tc for tc, case_hash in zip(test_cases, case_hashes) if case_hash not in function_store]
+    notify(f"Reusing {len(test_cases) - len(pending)} unchanged test function(s); generating {len(pending)}.")
+
+    if pending:
+        for shard_test_cases, source in _generate_shard_sources(pending, url, html_excerpt, api_key, shard_size):
+            if not source:
+                continue
+            try:
+                imports, helpers, test_functions = split_generated_code(source)
+            except SyntaxError as e:
+                notify(f"Generated code for {', '.join(str(tc.get('id')) for tc in shard_test_cases)} is not valid Python ({e}).", "warning")
+                continue
+            for tc in shard_test_cases:
+                function_name = test_function_name(tc.get('id', ''))
+                if function_name not in test_functions:
+                    notify(f"Gemini did not generate `{function_name}` for {tc.get('id')}.", "warning")
+                    continue
+                function_store[test_case_hash(tc, url, page_hash)] = {
+                    'id': tc.get('id'),
+                    'imports': imports,
+                    'helpers': helpers,
+                    'function': test_functions[function_name],
+                    'function_name': function_name,
+                }
+
+    current_hashes = set(case_hashes)
+    for stale_hash in [h for h in function_store if h not in current_hashes]:
+        del function_store[stale_hash]
+
+    parts = [function_store[h] for h in case_hashes if h in function_store]
+    if not parts:
+        notify("Received no usable response from LLM for script generation.", "warning")
+        return None
+    return assemble_script_from_parts(parts, test_cases)
@@ -0,0 +1,253 @@
+import hashlib
+import os
+import sqlite3
+import statistics
+import threading
+from contextlib import contextmanager
+from config import (
+    HISTORY_DB_PATH, HISTORY_MAX_RUNS, HISTORY_DURATION_SAMPLES, HISTORY_FAILURE_LOOKBACK, HISTORY_FLAKY_WINDOW,
+)
+
+_MAX_MESSAGE_LENGTH = 2000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scripts (
+    script_hash TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    script_hash TEXT NOT NULL,
+    url TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    exit_code INTEGER,
+    rerun INTEGER NOT NULL DEFAULT 0,
+    passed INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    errored INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    test_key TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    script_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    message TEXT,
+    duration_ms INTEGER,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_by_test ON results (test_key, finished_at);
+CREATE INDEX IF NOT EXISTS results_by_run ON results (run_id);
+"""
+
+
+def script_hash(script):
+    """Short content hash identifying one version of a script in the history."""
+    return hashlib.sha256((script or "").encode('utf-8')).hexdigest()[:16]
+
+
+class RunHistory:
+    """SQLite store of past executions: one row per run and one per test result.
+
+    Results are keyed by a test key (``script_utils.test_case_hash`` of the test case and URL,
+    since IDs like TC001 repeat across suites) and the script hash, so durations and failures
+    carry over while a test is unchanged, and status flips under the same script reveal flaky
+    tests. Each call uses its own connection, so jobs on different threads can record
+    concurrently.
+    """
+
+    def __init__(self, path, max_runs):
+        self.path = path
+        self.max_runs = max_runs
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL") # Readers don't block the job recording a run
+            connection.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connection(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        try:
+            connection.execute("PRAGMA foreign_keys=ON")
+            with connection: # Commits, or rolls back if the block raises
+                yield connection
+        finally:
+            connection.close()
+
+    def record_run(self, script, results, test_keys, exit_code, started_at, finished_at, url=None, rerun=False):
+        """Stores one execution and its per-test results; returns the run ID.
+
+        ``results`` are report result dicts (``id``, ``status``, ``message`` and, when known,
+        ``duration_ms``); ``test_keys`` maps their IDs to test keys. Runs beyond ``max_runs``
+        are pruned oldest first.
+        """
+        digest = script_hash(script)
+        statuses = [result['status'] for result in results]
+        passed, failed = statuses.count("PASS"), statuses.count("FAIL")
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO scripts (script_hash, created_at, content) VALUES (?, ?, ?)",
+                (digest, finished_at, script),
+            )
+            cursor = connection.execute(
+                "INSERT INTO runs (script_hash, url, started_at, finished_at, exit_code, rerun, passed, failed, errored)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, url, started_at, finished_at, exit_code, int(rerun), passed, failed, len(statuses) - passed - failed),
+            )
+            run_id = cursor.lastrowid
+            connection.executemany(
+                "INSERT INTO results (run_id, test_key, test_id, script_hash, status, message, duration_ms, finished_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (run_id, test_keys.get(str(result['id']), f"{url}#{result['id']}"), str(result['id']), digest,
+                     result['status'], (result.get('message') or "")[:_MAX_MESSAGE_LENGTH], result.get('duration_ms'),
+                     finished_at)
+                    for result in results
+                ],
+            )
+            connection.execute(
+                "DELETE FROM runs WHERE id NOT IN (SELECT id FROM runs ORDER BY id DESC LIMIT ?)", (self.max_runs,)
+            )
+            connection.execute("DELETE FROM scripts WHERE script_hash NOT IN (SELECT script_hash FROM runs)")
+        return run_id
+
+    def test_stats(self, digest, test_keys, lookback=None):
+        """Per test ID in ``test_keys`` (ID -> test key): ``expected_seconds`` (median recent
+        duration, None if never timed), ``recent_failures`` among the last ``lookback`` results
+        and ``last_status``.
+
+        Durations measured under the script version ``digest`` are preferred; other versions
+        of the same test are the fallback.
+        """
+        samples = HISTORY_DURATION_SAMPLES
+        lookback = HISTORY_FAILURE_LOOKBACK if lookback is None else lookback
+        stats = {}
+        with self._connection() as connection:
+            for test_id, test_key in test_keys.items():
+                rows = connection.execute(
+                    "SELECT script_hash, status, duration_ms FROM results WHERE test_key = ?"
+                    " ORDER BY finished_at DESC LIMIT ?",
+                    (test_key, max(samples, lookback) * 4),
+                ).fetchall()
+                same_script = [row['duration_ms'] for row in rows if row['script_hash'] == digest and row['duration_ms'] is not None]
+                any_script = [row['duration_ms'] for row in rows if row['duration_ms'] is not None]
+                durations = (same_script or any_script)[:samples]
+                stats[str(test_id)] = {
+                    'expected_seconds': statistics.median(durations) / 1000 if durations else None,
+                    'recent_failures': sum(1 for row in rows[:lookback] if row['status'] != "PASS"),
+                    'last_status': rows[0]['status'] if rows else None,
+                }
+        return stats
+
+    def execution_plan(self, digest, test_keys):
+        """Orders tests fail-fast then longest-first and estimates each one's duration.
+
+        ``test_keys`` maps test IDs (in their current order) to test keys. Returns
+        ``(ordered_ids, expected_seconds)`` keyed by ID. Tests that failed recently come first (most
+        failures first), the rest longest first; tests never timed are assumed to take the
+        median known duration. With no history at all the order is unchanged and
+        ``expected_seconds`` is None.
+        """
+        test_ids = list(test_keys)
+        stats = self.test_stats(digest, test_keys)
+        known = [s['expected_seconds'] for s in stats.values() if s['expected_seconds'] is not None]
+        if not known and not any(s['recent_failures'] for s in stats.values()):
+            return test_ids, None
+        default_seconds = statistics.median(known) if known else 0.0
+        expected = {
+            test_id: default_seconds if stats[test_id]['expected_seconds'] is None else stats[test_id]['expected_seconds']
+            for test_id in test_ids
+        }
+        ordered = sorted(test_ids, key=lambda test_id: (-stats[test_id]['recent_failures'], -expected[test_id]))
+        return ordered, expected
+
+    def flaky_tests(self, window=None):
+        """Tests whose status flipped between PASS and not-PASS under an unchanged script.
+
+        Looks at the last ``window`` results of each test and script version and returns
+        ``[{'test_id', 'script_hash', 'runs', 'flips', 'pass_rate', 'last_status'}]``, most
+        flips first.
+        """
+        window = HISTORY_FLAKY_WINDOW if window is None else window
+        with self._connection() as connection:
+            rows = connection.execute(
+                "SELECT test_key, test_id, script_hash, status FROM ("
+                "  SELECT test_key, test_id, script_hash, status, finished_at, ROW_NUMBER() OVER ("
+                "    PARTITION BY test_key, script_hash ORDER BY finished_at DESC, run_id DESC) AS recency"
+                "  FROM results)"
+                " WHERE recency <= ? ORDER BY test_key, script_hash, finished_at, recency DESC",
+                (window,),
+            ).fetchall()
+        series = {}
+        names = {}
+        for row in rows:
+            series.setdefault((row['test_key'], row['script_hash']), []).append(row['status'])
+            names[row['test_key']] = row['test_id']
+        flaky = []
+        for (test_key, digest), statuses in series.items():
+            outcomes = [status == "PASS" for status in statuses]
+            flips = sum(1 for previous, current in zip(outcomes, outcomes[1:]) if previous != current)
+            if flips:
+                flaky.append({
+                    'test_id': names[test_key], 'script_hash': digest, 'runs': len(statuses), 'flips': flips,
+                    'pass_rate': sum(outcomes) / len(outcomes), 'last_status': statuses[-1],
+                })
+        flaky.sort(key=lambda entry: (-entry['flips'], entry['test_id']))
+        return flaky
+
+    def recent_runs(self, limit=20):
+        with self._connection() as connection:
+            rows = connection.execute(
+                "SELECT id, script_hash, url, started_at, finished_at, exit_code, rerun, passed, failed, errored"
+                " FROM runs ORDER BY id DESC LIMIT ?", (limit,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def script(self, digest):
+        """The stored content of a script version, or None."""
+        with self._connection() as connection:
+            row = connection.execute("SELECT content FROM scripts WHERE script_hash = ?", (digest,)).fetchone()
+        return row['content'] if row else None
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM results")
+            connection.execute("DELETE FROM runs")
+            connection.execute("DELETE FROM scripts")
+
+
+_run_history = None
+_run_history_lock = threading.Lock()
+
+
+def get_run_history():
+    """Returns the process-wide run history, opening (and creating) the database on first use."""
+    global _run_history
+    with _run_history_lock:
+        if _run_history is None:
+            _run_history = RunHistory(HISTORY_DB_PATH, HISTORY_MAX_RUNS)
+        return _run_history
+
+
+def durations_from_arrivals(results, arrivals, started_at):
+    """Fills in ``duration_ms`` for results without one from the gaps between result arrivals.
+
+    ``arrivals`` maps test IDs to the time their result block was read; in a serial run the
+    gap since the previous result (or since ``started_at``) is that test's duration.
+    """
+    timed = []
+    previous = started_at
+    gaps = {}
+    for test_id, arrived_at in sorted(arrivals.items(), key=lambda item: item[1]):
+        gaps[test_id] = int(max(0.0, arrived_at - previous) * 1000)
+        previous = arrived_at
+    for result in results:
+        if result.get('duration_ms') is None and str(result['id']) in gaps:
+            result = dict(result, duration_ms=gaps[str(result['id'])])
+        timed.append(result)
+    return timed
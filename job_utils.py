@@ -0,0 +1,209 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from config import JOBS_DIR, JOB_MAX_WORKERS, JOB_RETENTION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Live partial results are persisted at most this often; status changes are written immediately
+_PERSIST_INTERVAL_SECONDS = 0.5
+
+
+class JobContext:
+    """Handle a job function uses to report stages, partial results and notes."""
+
+    def __init__(self, manager, job_id):
+        self._manager = manager
+        self.job_id = job_id
+
+    @contextmanager
+    def stage(self, name):
+        """Marks a pipeline stage running, then succeeded or failed, with its timings."""
+        self._manager._update(self.job_id, stage=name, stage_status=(name, "running"))
+        try:
+            yield
+        except Exception as e:
+            self._manager._update(self.job_id, stage_status=(name, "failed"), note=f"{name} failed: {e}")
+            raise
+        self._manager._update(self.job_id, stage_status=(name, "succeeded"))
+
+    def add_result(self, result):
+        """Appends one partial result (a streamed test case, a finished test) for live display."""
+        self._manager._update(self.job_id, partial_result=result)
+
+    def note(self, message):
+        """Adds a user-facing message to the job log."""
+        self._manager._update(self.job_id, note=message)
+
+
+class JobManager:
+    """Runs pipeline work on a bounded thread pool and persists each job's state as JSON on disk.
+
+    Jobs outlive the Streamlit session that submitted them: any session (or the same one
+    after a browser refresh) can look a job up by ID. Jobs found on disk in an active state
+    that this process is not running were cut off by a restart and are reported as interrupted.
+    """
+
+    def __init__(self, directory, max_workers, retention_seconds):
+        self.directory = directory
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="job")
+        self._jobs = {}
+        self._last_persisted = {}
+        self._lock = threading.Lock()
+        self._prune()
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def submit(self, kind, func, *args, label="", **kwargs):
+        """Queues ``func(job_context, *args, **kwargs)`` and returns the new job's ID.
+
+        The function's return value must be JSON-serializable; it becomes the job's ``result``.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        job = {
+            'id': job_id, 'kind': kind, 'label': label, 'status': "queued",
+            'stage': None, 'stages': {}, 'partial_results': [], 'notes': [],
+            'result': None, 'error': None,
+            'created_at': now, 'started_at': None, 'finished_at': None, 'updated_at': now,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._persist(job)
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        self._update(job_id, status="running", started_at=time.time())
+        try:
+            result = func(JobContext(self, job_id), *args, **kwargs)
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            self._update(job_id, status="failed", error=str(e) or type(e).__name__, finished_at=time.time())
+        else:
+            self._update(job_id, status="succeeded", result=result, finished_at=time.time())
+
+    def _update(self, job_id, stage=None, stage_status=None, partial_result=None, note=None, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            now = time.time()
+            if stage is not None:
+                job['stage'] = stage
+            if stage_status is not None:
+                name, status = stage_status
+                stage_info = job['stages'].setdefault(name, {'status': status, 'started_at': now, 'finished_at': None})
+                stage_info['status'] = status
+                if status != "running":
+                    stage_info['finished_at'] = now
+            if partial_result is not None:
+                job['partial_results'].append(partial_result)
+            if note is not None:
+                job['notes'].append(note)
+            job.update(fields)
+            job['updated_at'] = now
+            # Partial results stream in quickly; only they are throttled
+            if partial_result is None or now - self._last_persisted.get(job_id, 0) >= _PERSIST_INTERVAL_SECONDS:
+                persisted = self._persist(job)
+                if persisted and job['status'] not in ACTIVE_STATUSES:
+                    # Finished jobs are served from disk so memory stays flat on a busy deployment
+                    del self._jobs[job_id]
+                    self._last_persisted.pop(job_id, None)
+
+    def _persist(self, job):
+        """Atomically writes a job's state and returns whether it succeeded; called with the lock held."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._path(job['id']) + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as job_file:
+                json.dump(job, job_file, default=str)
+            os.replace(tmp_path, self._path(job['id']))
+            self._last_persisted[job['id']] = time.time()
+            return True
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Could not persist job %s to %s: %s", job['id'], self.directory, e)
+            return False
+
+    def get(self, job_id):
+        """Returns a snapshot of the job, or None if it is unknown or has expired."""
+        if not job_id:
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return json.loads(json.dumps(job, default=str))
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as job_file:
+                job = json.load(job_file)
+        except (OSError, ValueError):
+            return None
+        if job.get('status') in ACTIVE_STATUSES:
+            job['status'] = "interrupted"
+            job['error'] = "The server restarted before this job finished."
+        return job
+
+    def list_jobs(self, limit=20):
+        """Returns the most recently updated jobs, newest first, loading only those from disk."""
+        updated = {}
+        try:
+            for name in os.listdir(self.directory):
+                if name.endswith('.json'):
+                    try:
+                        updated[name[:-len('.json')]] = os.path.getmtime(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        with self._lock:
+            for job_id, job in self._jobs.items():
+                updated[job_id] = job['updated_at']
+        newest = sorted(updated, key=updated.get, reverse=True)[:limit]
+        return [job for job in map(self.get, newest) if job is not None]
+
+    def stats(self):
+        with self._lock:
+            statuses = [job['status'] for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ACTIVE_STATUSES}
+
+    def _prune(self):
+        """Deletes persisted jobs older than the retention period."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        cutoff = time.time() - self.retention_seconds
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Returns the process-wide job manager shared by every Streamlit session."""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager(JOBS_DIR, JOB_MAX_WORKERS, JOB_RETENTION_SECONDS)
+            atexit.register(_job_manager.shutdown)
+        return _job_manager
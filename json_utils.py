@@ -0,0 +1,255 @@
+import json
+import re
+
+# Well-formed objects are decoded in C by raw_decode; only objects it rejects are
+# re-tokenized by the lenient scanner below, so every character is visited a bounded
+# number of times and the whole extraction stays linear in the response size.
+_DECODER = json.JSONDecoder(strict=False)
+_scan_once = _DECODER.scan_once
+
+# raw_decode runs on bounded windows of the text, each ending at a likely top-level object
+# end (a closing brace followed by the next element, the end of the array or the end of the
+# text). JSONDecodeError counts newlines from the start of the string it was given, so
+# decoding against the whole response would make every failed decode O(n) and a response
+# with many bad objects O(n^2).
+_WINDOW_SIZE = 16 * 1024
+_OBJECT_END_RE = re.compile(r"\}(?=\s*,?\s*(?:\d+\s*:\s*)?(?:\{|\]|```|\Z))")
+
+_TOKEN_RE = re.compile(
+    r"(?P<ws>\s+)"
+    r"|(?P<comment>//[^\n]*|/\*.*?\*/)"
+    r"|(?P<quote>[\"'])"
+    r"|(?P<open>[{\[])"
+    r"|(?P<close>[}\]])"
+    r"|(?P<comma>,)"
+    r"|(?P<colon>:)"
+    r"|(?P<literal>[^\s{}\[\],:\"']+)"
+    r"|(?P<other>.)",
+    re.DOTALL,
+)
+_TRAILING_COMMA_RE = re.compile(r",(?=\s*[}\]])")
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_BAD_ESCAPE_RE = re.compile(r"\\(?![\"\\/bfnrtu])")
+_UNESCAPED_DOUBLE_QUOTE_RE = re.compile(r'(?<!\\)"')
+_LITERAL_FIXES = {'True': 'true', 'False': 'false', 'None': 'null'}
+_CLOSERS = {'{': '}', '[': ']'}
+_VALUE_END_KINDS = ('string', 'literal', 'close')
+_STRING_TERMINATORS = ',:}]\n'
+
+
+def _scan_string(text, content_start, quote):
+    """Finds the closing quote of a string, treating quotes followed by more prose as inner quotes.
+
+    Returns ``(close_index, inner_quote_indices)`` or ``(None, None)`` if the string never ends.
+    """
+    inner_quotes = []
+    search_from = content_start
+    text_length = len(text)
+    while True:
+        close = text.find(quote, search_from)
+        if close == -1:
+            return None, None
+
+        backslashes = 0
+        k = close - 1
+        while k >= content_start and text[k] == '\\':
+            backslashes += 1
+            k -= 1
+        if backslashes % 2:
+            search_from = close + 1
+            continue
+
+        j = close + 1
+        while j < text_length and text[j] in ' \t\r':
+            j += 1
+        if j >= text_length or text[j] in _STRING_TERMINATORS or text[j] == quote:
+            return close, inner_quotes
+
+        # e.g. "Click "Login" button" -- the quote is part of the value
+        inner_quotes.append(close)
+        search_from = close + 1
+
+
+def _json_string(text, content_start, close, inner_quotes, quote):
+    """Re-emits a scanned string as a valid JSON string literal."""
+    if quote == "'":
+        content = text[content_start:close].replace("\\'", "'")
+        content = _UNESCAPED_DOUBLE_QUOTE_RE.sub(r'\\"', content)
+    elif inner_quotes:
+        pieces = []
+        previous = content_start
+        for quote_index in inner_quotes:
+            pieces.append(text[previous:quote_index])
+            pieces.append('\\"')
+            previous = quote_index + 1
+        pieces.append(text[previous:close])
+        content = "".join(pieces)
+    else:
+        content = text[content_start:close]
+    if '\\' in content:
+        content = _BAD_ESCAPE_RE.sub(r'\\\\', content)
+    return '"' + content + '"'
+
+
+def _repair_object(text, start):
+    """Leniently tokenizes the object starting at ``text[start] == '{'`` and rebuilds it as JSON.
+
+    Repairs trailing and missing commas, numbered pseudo-keys inside arrays (``[1: {...}``),
+    single-quoted or unescaped-inner-quote strings, Python literals, bare words, comments and
+    mismatched closing brackets. Returns ``(end_index, repaired_text)``, or ``(None, None)``
+    when the object is not terminated yet.
+    """
+    out = []
+    stack = []
+    pending_comma = False
+    previous_kind = None
+    pos = start
+    text_length = len(text)
+
+    while pos < text_length:
+        match = _TOKEN_RE.match(text, pos)
+        kind = match.lastgroup
+        token = match.group()
+        pos = match.end()
+
+        if kind in ('ws', 'comment', 'other'):
+            continue
+
+        if kind == 'quote':
+            close, inner_quotes = _scan_string(text, pos, token)
+            if close is None:
+                return None, None
+            token = _json_string(text, pos, close, inner_quotes, token)
+            pos = close + 1
+            kind = 'string'
+        elif kind == 'literal':
+            token = _LITERAL_FIXES.get(token, token)
+            if token not in ('true', 'false', 'null') and not _NUMBER_RE.fullmatch(token):
+                token = json.dumps(token)
+
+        if kind == 'comma':
+            pending_comma = True
+            continue
+
+        if kind == 'close':
+            pending_comma = False # A comma right before a closer is a trailing comma
+            opener = '{' if token == '}' else '['
+            if opener not in stack:
+                continue
+            while stack[-1] != opener:
+                out.append(_CLOSERS[stack.pop()])
+            stack.pop()
+            out.append(token)
+            previous_kind = 'close'
+            if not stack:
+                return pos, "".join(out)
+            continue
+
+        if kind == 'colon':
+            if stack[-1] == '[' and previous_kind == 'literal' and _NUMBER_RE.fullmatch(out[-1]):
+                # Numbered pseudo-key inside an array: drop "<n>:"
+                out.pop()
+                previous_kind = 'comma' if out and out[-1] == ',' else 'open'
+                continue
+            out.append(':')
+            previous_kind = 'colon'
+            pending_comma = False
+            continue
+
+        if (pending_comma or previous_kind in _VALUE_END_KINDS) and previous_kind not in (None, 'open', 'colon'):
+            out.append(',')
+        pending_comma = False
+        out.append(token)
+        if kind == 'open':
+            stack.append(token)
+        previous_kind = kind
+
+    return None, None
+
+
+def _scan_objects(text, pos, final):
+    """Extracts top-level JSON objects from ``text[pos:]`` in one forward pass.
+
+    Returns ``(objects, resume_pos, errors)``. When ``final`` is False an unterminated
+    trailing object is left for the next call; otherwise it is reported as truncated.
+    """
+    objects = []
+    errors = []
+    text_length = len(text)
+    window = ""
+    window_start = window_end = 0
+
+    while pos < text_length:
+        start = text.find('{', pos)
+        if start == -1:
+            return objects, text_length, errors
+
+        if start >= window_end:
+            boundary = _OBJECT_END_RE.search(text, min(start + _WINDOW_SIZE, text_length))
+            window_start = start
+            window_end = boundary.end() if boundary else text_length
+            window = text[window_start:window_end]
+            if _TRAILING_COMMA_RE.search(window):
+                # Blank out trailing commas in C; same length, so offsets still map onto text
+                window = _TRAILING_COMMA_RE.sub(" ", window)
+        try:
+            parsed, end = _scan_once(window, start - window_start)
+            end += window_start
+        except (json.JSONDecodeError, StopIteration):
+            end, repaired = _repair_object(text, start)
+            if end is None:
+                if not final:
+                    return objects, start, errors
+                errors.append(f"Truncated JSON object at character {start} was ignored.")
+                return objects, text_length, errors
+            try:
+                parsed = _DECODER.decode(repaired)
+            except json.JSONDecodeError as e:
+                errors.append(f"Skipped malformed JSON object at character {start}: {e}")
+                pos = end
+                continue
+
+        if isinstance(parsed, dict):
+            objects.append(parsed)
+        pos = end
+
+    return objects, pos, errors
+
+
+def extract_json_objects(text):
+    """Recovers every top-level JSON object from a possibly malformed LLM response.
+
+    Markdown fences, prose, numbered keys and other text between objects is skipped, and a
+    malformed object only loses itself rather than the whole response.
+    Returns ``(objects, errors)``.
+    """
+    if not text:
+        return [], []
+    objects, _, errors = _scan_objects(text, 0, final=True)
+    return objects, errors
+
+
+class TestCaseStreamParser:
+    """Incrementally pulls complete top-level JSON objects out of a growing JSON array."""
+
+    def __init__(self):
+        self._buffer = ""
+        self.errors = []
+
+    def feed(self, text):
+        """Adds a chunk of text and returns the list of test case dicts completed by it."""
+        if not text:
+            return []
+        self._buffer += text
+        objects, resume_pos, errors = _scan_objects(self._buffer, 0, final=False)
+        # Keep only the unfinished object (if any) so the buffer stays small
+        self._buffer = self._buffer[resume_pos:]
+        self.errors.extend(errors)
+        return objects
+
+    def close(self):
+        """Flushes the buffer at end of stream, reporting a truncated trailing object."""
+        objects, _, errors = _scan_objects(self._buffer, 0, final=True)
+        self._buffer = ""
+        self.errors.extend(errors)
+        return objects
@@ -0,0 +1,234 @@
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import METRICS_MAX_SAMPLES, METRICS_LATENCY_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "testgen"
+
+COUNTER_HELP = {
+    'gemini_prompt_chars': "Characters sent in Gemini prompts.",
+    'gemini_input_tokens': "Prompt tokens reported in Gemini usage metadata.",
+    'gemini_output_tokens': "Response tokens reported in Gemini usage metadata.",
+    'gemini_requests': "Gemini API requests (each may make several attempts).",
+    'gemini_retries': "Gemini attempts retried after a transient error.",
+    'gemini_hedges': "Gemini requests that sent a hedged duplicate after exceeding the p95 latency.",
+    'gemini_hedge_wins': "Hedged duplicates that finished before the original request.",
+    'gemini_circuit_rejections': "Gemini requests refused while the circuit breaker was open.",
+    'model_routing_decisions': "Gemini requests by routed tier and outcome (accepted, escalated, invalid).",
+    'model_routing_saved_seconds': "Estimated latency saved by fast-tier responses that passed validation.",
+    'model_routing_wasted_seconds': "Latency spent on fast-tier responses that were rejected and escalated.",
+}
+
+
+def _percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(labels, extra=None):
+    pairs = list(labels) + (list(extra) if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Process-wide stage durations (as histograms plus a window of recent samples) and counters."""
+
+    def __init__(self, max_samples, buckets):
+        self.max_samples = max_samples
+        self.buckets = tuple(sorted(buckets))
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, **labels):
+        """Records one duration for ``stage``; labels should be low-cardinality (model, mode, outcome)."""
+        key = (stage, tuple(sorted((name, str(value)) for name, value in labels.items())))
+        with self._lock:
+            series = self._stages.get(key)
+            if series is None:
+                series = self._stages[key] = {
+                    'count': 0, 'sum': 0.0, 'bucket_counts': [0] * len(self.buckets),
+                    'samples': deque(maxlen=self.max_samples), 'last': None, 'last_at': None,
+                }
+            series['count'] += 1
+            series['sum'] += seconds
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series['bucket_counts'][index] += 1
+            series['samples'].append(seconds)
+            series['last'] = seconds
+            series['last_at'] = time.time()
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted((label, str(label_value)) for label, label_value in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        """Returns ``{'stages': [...], 'counters': [...]}`` with p50/p95 over the recent samples."""
+        with self._lock:
+            stages = [
+                (stage, labels, dict(series, samples=sorted(series['samples']), bucket_counts=list(series['bucket_counts'])))
+                for (stage, labels), series in self._stages.items()
+            ]
+            counters = list(self._counters.items())
+        stage_rows = []
+        for stage, labels, series in sorted(stages, key=lambda item: (item[0], item[1])):
+            samples = series['samples']
+            stage_rows.append({
+                'stage': stage,
+                'labels': dict(labels),
+                'count': series['count'],
+                'sum_seconds': series['sum'],
+                'mean_seconds': series['sum'] / series['count'],
+                'p50_seconds': _percentile(samples, 0.50),
+                'p95_seconds': _percentile(samples, 0.95),
+                'max_seconds': samples[-1] if samples else None,
+                'last_seconds': series['last'],
+                'last_at': series['last_at'],
+                'buckets': dict(zip(self.buckets, series['bucket_counts'])),
+            })
+        counter_rows = [
+            {'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in sorted(counters)
+        ]
+        return {'generated_at': time.time(), 'stages': stage_rows, 'counters': counter_rows}
+
+    def to_json(self):
+        snapshot = self.snapshot()
+        for row in snapshot['stages']:
+            row['buckets'] = {str(bound): count for bound, count in row['buckets'].items()}
+        return json.dumps(snapshot, indent=2)
+
+    def to_prometheus(self):
+        """Renders the Prometheus text exposition format.
+
+        Durations are exported as histograms rather than summaries so p50/p95 can be
+        aggregated across instances with ``histogram_quantile``.
+        """
+        snapshot = self.snapshot()
+        name = f"{METRIC_PREFIX}_stage_duration_seconds"
+        lines = [f"# HELP {name} Time spent in each pipeline stage.", f"# TYPE {name} histogram"]
+        for row in snapshot['stages']:
+            labels = [('stage', row['stage'])] + sorted(row['labels'].items())
+            for bound, count in row['buckets'].items():
+                lines.append(f"{name}_bucket{_label_text(labels, [('le', repr(float(bound)))])} {count}")
+            lines.append(f"{name}_bucket{_label_text(labels, [('le', '+Inf')])} {row['count']}")
+            lines.append(f"{name}_sum{_label_text(labels)} {row['sum_seconds']:.6f}")
+            lines.append(f"{name}_count{_label_text(labels)} {row['count']}")
+
+        by_name = {}
+        for row in snapshot['counters']:
+            by_name.setdefault(row['name'], []).append(row)
+        for counter, rows in by_name.items():
+            metric = f"{METRIC_PREFIX}_{counter}_total"
+            lines.append(f"# HELP {metric} {COUNTER_HELP.get(counter, counter)}")
+            lines.append(f"# TYPE {metric} counter")
+            for row in rows:
+                lines.append(f"{metric}{_label_text(sorted(row['labels'].items()))} {row['value']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+
+_registry = MetricsRegistry(METRICS_MAX_SAMPLES, METRICS_LATENCY_BUCKETS)
+
+
+def get_metrics_registry():
+    return _registry
+
+
+@contextmanager
+def span(stage, **labels):
+    """Times the enclosed block as ``stage``.
+
+    Yields the label dict so the block can refine it, e.g. ``labels['outcome'] = "error"`` for
+    failures that are reported rather than raised. Raised exceptions are recorded as errors and
+    a generator closed before it finished as cancelled.
+    """
+    labels.setdefault('outcome', "ok")
+    started = time.perf_counter()
+    try:
+        yield labels
+    except GeneratorExit:
+        labels['outcome'] = "cancelled"
+        raise
+    except BaseException:
+        labels['outcome'] = "error"
+        raise
+    finally:
+        _registry.observe(stage, time.perf_counter() - started, **labels)
+
+
+def record_gemini_usage(model, prompt, response):
+    """Counts prompt size and the token usage Gemini reports for a response (when it has any)."""
+    _registry.increment('gemini_prompt_chars', len(str(prompt)), model=model)
+    try:
+        usage = response.usage_metadata
+        input_tokens = usage.prompt_token_count
+        output_tokens = usage.candidates_token_count
+    except Exception:
+        return # Blocked or incomplete responses may carry no usage metadata
+    if input_tokens:
+        _registry.increment('gemini_input_tokens', input_tokens, model=model)
+    if output_tokens:
+        _registry.increment('gemini_output_tokens', output_tokens, model=model)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body, content_type = _registry.to_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body, content_type = _registry.to_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass # Scrapes every few seconds would flood the console
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(host, port):
+    """Serves /metrics (Prometheus text) and /metrics.json once per process; returns False if it can't bind."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return True
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning("Could not start the metrics server on %s:%s: %s", host, port, e)
+            return False
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info("Serving metrics on http://%s:%s/metrics", host, port)
+        return True
@@ -0,0 +1,55 @@
+import threading
+from contextlib import contextmanager
+
+try:
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError: # Headless use (batch.py) does not need Streamlit installed
+    st = None
+
+    def get_script_run_ctx():
+        return None
+
+# Pipeline code runs on job threads without a ScriptRunContext, where st.* calls are silently
+# dropped. Diagnostics go through notify(), which hands them to the sink installed for the
+# current thread (a job's note) and only falls back to st.* on the Streamlit script thread.
+
+_LEVEL_PREFIXES = {'warning': "Warning: ", 'error': "Error: "}
+
+_sink = threading.local()
+
+
+@contextmanager
+def notes_to(callback):
+    """Sends notify() messages raised on this thread to ``callback(message)`` inside the block."""
+    previous = getattr(_sink, 'callback', None)
+    _sink.callback = callback
+    try:
+        yield
+    finally:
+        _sink.callback = previous
+
+
+def current_sink():
+    """The callback installed on this thread, for passing on to helper threads (see notes_to)."""
+    return getattr(_sink, 'callback', None)
+
+
+def notify(message, level="info"):
+    """Reports a user-facing message at ``level`` ("info", "success", "warning" or "error").
+
+    With a sink installed, warnings and errors are prefixed with their level. Without one,
+    the message is shown with st.* on the script thread, or printed anywhere else.
+    """
+    callback = current_sink()
+    if callback is not None:
+        callback(_LEVEL_PREFIXES.get(level, "") + message)
+    elif get_script_run_ctx() is not None:
+        getattr(st, level)(message)
+    else:
+        print(_LEVEL_PREFIXES.get(level, "") + message)
+
+
+def is_problem(note):
+    """Whether a job note was reported as a warning or an error."""
+    return note.startswith(tuple(_LEVEL_PREFIXES.values()))
@@ -0,0 +1,202 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from config import HTML_DISTILL_TOKEN_BUDGET, SELECTOR_CHECK_ENABLED, SELECTOR_SKIP_DEAD_TESTS, HISTORY_ENABLED
+from metrics_utils import span
+from notes_utils import notes_to
+from gemini_utils import stream_test_cases, generate_script_incremental
+from script_utils import pending_test_cases, plan_test_cases, test_function_name, test_case_hash
+from selenium_utils import fetch_page, distill_html, cached_page
+from execution_utils import execute_script_parallel
+from preflight_utils import preflight_script, preflight_errors, format_issue
+from selector_utils import verify_selectors, missing_selectors, format_locator
+from reporting_utils import parse_execution_output
+from history_utils import get_run_history, script_hash, durations_from_arrivals
+
+# The pipeline stages as job functions (see job_utils.JobManager.submit). They run off the
+# Streamlit script thread, so failures are raised for the job to record instead of only
+# being shown with st.error, and diagnostics from the utils become job notes.
+
+PAGE_SUMMARY_KEYS = ('url', 'content_hash', 'structure_hash', 'fetched_at', 'from_cache', 'readiness')
+
+
+@contextmanager
+def _stage(job, name):
+    """Enters the job's stage and records its duration (excluding any queueing the job does first).
+
+    notify() messages raised during the stage are added to the job's notes.
+    """
+    with job.stage(name), span(name), notes_to(job.note):
+        yield
+
+
+def relevance_text(test_cases):
+    """Text the HTML distiller scores elements against: what the test cases describe and do."""
+    return " ".join(
+        " ".join([tc.get('description', ''), tc.get('expected_outcome', '')] + list(tc.get('steps', [])))
+        for tc in test_cases
+    )
+
+
+def run_test_case_generation(job, requirement_text, api_key):
+    """Streams test cases from Gemini, publishing each one as a partial result as it arrives."""
+    test_cases = []
+    with _stage(job, "generate_test_cases"):
+        for test_case in stream_test_cases(requirement_text, api_key):
+            test_cases.append(test_case)
+            job.add_result(test_case)
+        if not test_cases:
+            raise RuntimeError("Failed to generate test cases or result was empty.")
+    return test_cases
+
+
+def run_script_generation(job, test_cases, url, api_key, function_store, force_refresh=False):
+    """Scrapes the target page, distills it and generates the script for the changed test cases.
+
+    ``function_store`` (see ``generate_script_incremental``) is read but not modified; the
+    updated store comes back in the result for the caller to keep. Returns ``{'script',
+    'test_cases', 'page', 'function_store'}`` where ``page`` summarises the snapshot used.
+    """
+    function_store = dict(function_store)
+    with _stage(job, "scrape"):
+        page = fetch_page(url, force_refresh=force_refresh)
+        if not page or not page['html']:
+            raise RuntimeError("Failed to scrape target URL.")
+
+    with _stage(job, "distill"):
+        # Unchanged test cases on an unchanged DOM reuse their stored functions
+        changed_test_cases = pending_test_cases(test_cases, url, function_store, page['structure_hash'])
+        html_excerpt = ""
+        if changed_test_cases:
+            html_excerpt = distill_html(page['html'], relevance_text(changed_test_cases), HTML_DISTILL_TOKEN_BUDGET)
+        job.note(f"{len(changed_test_cases)} of {len(test_cases)} test cases need new code.")
+
+    with _stage(job, "generate_script"):
+        script = generate_script_incremental(
+            test_cases, url, html_excerpt, api_key, function_store, page_hash=page['structure_hash']
+        )
+        if not script:
+            raise RuntimeError("Failed to generate Python script.")
+
+    return {
+        'script': script,
+        'test_cases': test_cases,
+        'page': {key: page.get(key) for key in PAGE_SUMMARY_KEYS},
+        'function_store': function_store,
+    }
+
+
+def check_selectors(script, url):
+    """Resolves the script's locators against the cached snapshot of ``url`` (see selector_utils).
+
+    Returns None when there is no snapshot or the script does not parse.
+    """
+    page = cached_page(url) if url else None
+    if not page or not page.get('html'):
+        return None
+    try:
+        return verify_selectors(script, page['html'], page['url'])
+    except SyntaxError:
+        return None
+
+
+def _dead_selector_skips(script, test_cases, dead):
+    """Maps the ID of every test case whose function has dead selectors to a skip reason."""
+    skips = {}
+    for tc in plan_test_cases(script, test_cases):
+        locators = dead.get(test_function_name(tc['id']))
+        if locators:
+            skips[str(tc['id'])] = "selector not found on the scraped page: " + ", ".join(map(format_locator, locators))
+    return skips
+
+
+def run_execution(job, script, headless_mode, parallel=True, workers=None, test_cases=None,
+                  allow_preflight_errors=False, url=None, skip_dead_selectors=None, test_ids=None):
+    """Executes the script, publishing each finished test as a partial result.
+
+    The script is checked statically first (see preflight_utils); preflight errors fail the
+    job before a browser starts unless ``allow_preflight_errors`` is set, warnings become notes.
+    With ``url``, its locators are then resolved against the cached page snapshot and tests
+    with dead selectors are noted, or reported as ERROR without running when
+    ``skip_dead_selectors`` (default SELECTOR_SKIP_DEAD_TESTS) is set. ``test_ids`` runs only
+    those test cases, e.g. the failures of the previous run (see reporting_utils.merge_rerun).
+
+    With HISTORY_ENABLED, past runs of the same tests order this one (recent failures first,
+    then longest first) and balance the workers by expected duration, and the results are
+    recorded afterwards; history errors only become notes. Returns ``{'stdout', 'stderr',
+    'exit_code', 'records', 'preflight', 'selectors', 'test_ids', 'script_hash'}``.
+    """
+    with _stage(job, "preflight"):
+        issues = preflight_script(script, test_cases)
+    for issue in issues:
+        job.note(f"Preflight {issue['level']}: {format_issue(issue)}")
+    errors = preflight_errors(issues)
+    if errors and not allow_preflight_errors:
+        raise RuntimeError(
+            "Preflight check failed, the script was not run: " + "; ".join(format_issue(issue) for issue in errors)
+        )
+
+    if skip_dead_selectors is None:
+        skip_dead_selectors = SELECTOR_SKIP_DEAD_TESTS
+    selectors = None
+    skip_reasons = {}
+    if url and SELECTOR_CHECK_ENABLED:
+        with _stage(job, "verify_selectors"):
+            selectors = check_selectors(script, url)
+        if selectors is None:
+            job.note(f"No cached snapshot of {url}; selectors were not checked.")
+        else:
+            dead = missing_selectors(selectors)
+            for function_name, locators in dead.items():
+                job.note(f"{function_name}: not on the scraped page: {', '.join(map(format_locator, locators))}")
+            if skip_dead_selectors:
+                skip_reasons = _dead_selector_skips(script, test_cases, dead)
+                if skip_reasons:
+                    job.note(f"Skipping {len(skip_reasons)} test(s) with dead selectors.")
+
+    digest = script_hash(script)
+    test_keys = {}
+    test_order = expected_seconds = None
+    if HISTORY_ENABLED:
+        with _stage(job, "schedule"):
+            test_keys = {str(tc['id']): test_case_hash(tc, url) for tc in plan_test_cases(script, test_cases)}
+            try:
+                test_order, expected_seconds = get_run_history().execution_plan(digest, test_keys)
+            except (sqlite3.Error, OSError) as e:
+                job.note(f"Run history unavailable, tests run in their original order: {e}")
+        if test_order and test_order != list(test_keys):
+            job.note(f"Ordered from run history: {', '.join(test_order)}")
+        elif test_order:
+            test_order = None
+
+    arrivals = {}
+
+    def on_result(record):
+        arrivals.setdefault(str(record.get('id')), time.time())
+        job.add_result(record)
+
+    started_at = time.time()
+    with _stage(job, "execute"):
+        stdout, stderr, exit_code, records = execute_script_parallel(
+            script, headless_mode, workers if parallel else 1, test_cases, on_result=on_result,
+            skip_reasons=skip_reasons, test_ids=test_ids, test_order=test_order, expected_seconds=expected_seconds,
+        )
+    finished_at = time.time()
+
+    if HISTORY_ENABLED:
+        with _stage(job, "record_history"):
+            parsed = parse_execution_output(stdout, records)
+            results = parsed.results
+            if not records: # Parsed from one serial stdout stream: arrival gaps are the durations
+                results = durations_from_arrivals(results, arrivals, started_at)
+            results = [result for result in results if result['id'] not in skip_reasons] # Never ran
+            try:
+                get_run_history().record_run(
+                    script, results, test_keys, exit_code, started_at, finished_at, url=url, rerun=test_ids is not None,
+                )
+            except (sqlite3.Error, OSError) as e:
+                job.note(f"The run could not be recorded in the history: {e}")
+    return {
+        'stdout': stdout, 'stderr': stderr, 'exit_code': exit_code, 'records': records,
+        'preflight': issues, 'selectors': selectors, 'test_ids': test_ids, 'script_hash': digest,
+    }
@@ -0,0 +1,197 @@
+import ast
+import builtins
+import functools
+import importlib.util
+from script_utils import RESULTS_FILE_OPTION, _is_main_guard, test_function_name
+
+# Markers every script must print for its results to be parsed (see reporting_utils)
+REQUIRED_OUTPUT_MARKERS = ("TEST_RESULT_START", "TEST_RESULT_END", "STATUS:")
+
+_IMPLICIT_NAMES = set(dir(builtins)) | {"__name__", "__file__", "__doc__", "__builtins__", "__spec__", "__loader__"}
+
+
+def _issue(level, check, message, line=None):
+    return {'level': level, 'check': check, 'message': message, 'line': line}
+
+
+@functools.lru_cache(maxsize=256)
+def _module_available(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def _bound_names(tree):
+    """Every name the module binds anywhere (imports, defs, arguments, assignments, handlers)."""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add(alias.asname or alias.name.split(".")[0])
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arguments):
+            for arg in node.posonlyargs + node.args + node.kwonlyargs + [node.vararg, node.kwarg]:
+                if arg is not None:
+                    names.add(arg.arg)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            names.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            names.add(node.rest)
+    return names
+
+
+def _check_imports(tree):
+    issues = []
+    star_import = False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [(alias.name, node.lineno) for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules = [(node.module, node.lineno)]
+            star_import = star_import or any(alias.name == "*" for alias in node.names)
+        else:
+            continue
+        for module, line in modules:
+            top_level = module.split(".")[0]
+            if not _module_available(top_level):
+                issues.append(_issue("error", "imports", f"Module `{top_level}` is not installed in this environment.", line))
+
+    if star_import:
+        return issues # Names may come from the star import; can't tell which are undefined
+    bound = _bound_names(tree) | _IMPLICIT_NAMES
+    reported = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in bound and node.id not in reported:
+            reported.add(node.id)
+            issues.append(_issue("error", "imports", f"`{node.id}` is used but never imported or defined.", node.lineno))
+    return issues
+
+
+def _embedded_test_cases(tree):
+    """The ``TEST_CASES`` literal of an orchestrated script, or None."""
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "TEST_CASES" for t in node.targets):
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                return None
+            return [tc for tc in value if isinstance(tc, dict)] if isinstance(value, list) else None
+    return None
+
+
+def _check_test_functions(tree, test_cases):
+    functions = {
+        node.name: node.lineno for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test_")
+    }
+    if not functions:
+        return [_issue("error", "test functions", "The script defines no top-level `test_*` functions.")]
+    if test_cases is None:
+        test_cases = _embedded_test_cases(tree)
+    if not test_cases:
+        return []
+
+    issues = []
+    expected = {test_function_name(tc.get('id', '')): tc.get('id') for tc in test_cases}
+    missing = [test_id for name, test_id in expected.items() if name not in functions]
+    if len(missing) == len(expected):
+        issues.append(_issue("error", "test functions", "No test function matches any test case ID."))
+    elif missing:
+        issues.append(_issue(
+            "warning", "test functions",
+            f"No test function for {', '.join(str(test_id) for test_id in missing)}; they will be reported as ERROR.",
+        ))
+    extra = [name for name in functions if name not in expected]
+    if extra:
+        issues.append(_issue(
+            "warning", "test functions",
+            f"{', '.join(extra)} match no test case ID and will run with a placeholder description.",
+            functions[extra[0]],
+        ))
+    return issues
+
+
+def _calls_quit(nodes):
+    return any(
+        isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "quit"
+        for statement in nodes for node in ast.walk(statement)
+    )
+
+
+def _string_constants(tree):
+    """Every literal string in the script, including the literal parts of f-strings."""
+    return [node.value for node in ast.walk(tree) if isinstance(node, ast.Constant) and isinstance(node.value, str)]
+
+
+def _check_orchestration(tree):
+    issues = []
+    if not any(_is_main_guard(node) for node in tree.body):
+        issues.append(_issue("error", "orchestrator", "No `if __name__ == \"__main__\":` block; running the script would do nothing."))
+    if not any(isinstance(node, ast.Try) and _calls_quit(node.finalbody) for node in ast.walk(tree)):
+        issues.append(_issue("warning", "orchestrator", "`driver.quit()` is not in a `finally` block; a failing run may leave Chrome running."))
+
+    options = {
+        arg.value for node in ast.walk(tree)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "add_argument"
+        for arg in node.args if isinstance(arg, ast.Constant) and isinstance(arg.value, str)
+    }
+    if options and "--headless" not in options:
+        issues.append(_issue("error", "orchestrator", "The argument parser has no `--headless` option, so the run would exit with a usage error."))
+    if RESULTS_FILE_OPTION in options and not any(isinstance(n, ast.Import) and any(a.name == "json" for a in n.names) for n in ast.walk(tree)):
+        issues.append(_issue("warning", "orchestrator", f"`{RESULTS_FILE_OPTION}` is accepted but `json` is never imported."))
+    return issues
+
+
+def _check_output_contract(tree):
+    text = "\n".join(_string_constants(tree))
+    issues = [
+        _issue("error", "output contract", f"The script never prints `{marker}`, so its results cannot be parsed.")
+        for marker in REQUIRED_OUTPUT_MARKERS if marker not in text
+    ]
+    if "EXECUTION SUMMARY" not in text:
+        issues.append(_issue("warning", "output contract", "No `EXECUTION SUMMARY` line; the summary will be computed from the results."))
+    return issues
+
+
+def preflight_script(script, test_cases=None):
+    """Statically checks a generated script before any browser is started.
+
+    Compiles it, then walks the AST for missing imports and undefined names, test functions
+    that don't match the test case IDs (``test_cases``, or the script's own ``TEST_CASES``),
+    a missing ``__main__`` orchestrator or ``driver.quit()`` in a ``finally``, and the
+    structured output markers. Returns a list of ``{'level', 'check', 'message', 'line'}``
+    issues where ``level`` is ``"error"`` (the run is pointless) or ``"warning"``.
+    """
+    if not script or not script.strip():
+        return [_issue("error", "syntax", "The script is empty.")]
+    try:
+        compile(script, "<generated script>", "exec")
+        tree = ast.parse(script)
+    except SyntaxError as e:
+        return [_issue("error", "syntax", f"{e.msg}: {(e.text or '').strip()}", e.lineno)]
+    except ValueError as e:
+        return [_issue("error", "syntax", str(e))]
+
+    return (
+        _check_imports(tree)
+        + _check_test_functions(tree, test_cases)
+        + _check_orchestration(tree)
+        + _check_output_contract(tree)
+    )
+
+
+def preflight_errors(issues):
+    return [issue for issue in issues if issue['level'] == "error"]
+
+
+def format_issue(issue):
+    location = f" (line {issue['line']})" if issue.get('line') else ""
+    return f"[{issue['check']}] {issue['message']}{location}"
@@ -1,77 +1,441 @@
-import streamlit as st
 import html
+import math
+import os
 import re
+import shutil
+import time
+import uuid
+from config import (
+    REPORTS_DIR, REPORTS_MAX_KEPT, REPORT_PAGE_SIZE, REPORT_LOG_PREVIEW_LINES, REPORT_LOG_PREVIEW_CHARS,
+    REPORT_LOG_PAGE_BYTES,
+)
 
-def parse_structured_results(stdout):
-    """Parses the structured test results from stdout."""
-    results = []
-    if not stdout:
-        return results
-
-    pattern = re.compile(
-        r"TEST_RESULT_START\s*"
-        r"ID:\s*(.*?)\s*"
-        r"DESCRIPTION:\s*(.*?)\s*"
-        r"STATUS:\s*(.*?)\s*"
-        r"MESSAGE:\s*(.*?)\s*"
-        r"TEST_RESULT_END",
-        re.DOTALL
-    )
-
-    for match in pattern.finditer(stdout):
-        results.append({
-            "id": match.group(1).strip(),
-            "description": match.group(2).strip(),
-            "status": match.group(3).strip().upper(), # Normalize status
-            "message": match.group(4).strip()
-        })
-    return results
-
-def format_report(stdout, stderr, exit_code):
-    """Formats the execution results into a markdown report, now with a results table."""
-    report_parts = ["## Test Execution Report"]
-
-    report_parts.append(f"**Overall Exit Code:** `{exit_code}`")
+_FIELDS = ("ID", "DESCRIPTION", "STATUS", "MESSAGE")
+_SUMMARY_PREFIX = "EXECUTION SUMMARY:"
+# Outside a block only lines containing one of these markers can change state, so the test
+# chatter between them is skipped with str.find instead of being split and visited line by line
+_BLOCK_MARKER = "TEST_RESULT_"
+_SUMMARY_RE = re.compile(r"Passed:\s*(\d+),\s*Failed:\s*(\d+),\s*Errored:\s*(\d+)")
+_STATUS_COLORS = {"PASS": "green", "FAIL": "red", "ERROR": "orange"}
+NO_RESULTS_NOTE = "No structured test results found in standard output. The script might not have run correctly or produced output in the expected format."
+
+
+class ResultStreamParser:
+    """Line-oriented state machine over TEST_RESULT_START/TEST_RESULT_END blocks.
+
+    ``feed`` accepts arbitrary chunks of stdout and returns the results completed by them, so
+    the same parser serves live execution and finished runs. Each line is examined once, so
+    parsing is linear with no backtracking. Unterminated, unopened or incomplete blocks are
+    recorded in ``problems`` rather than silently swallowing the rest of the log.
+    """
+
+    def __init__(self):
+        self.results = []
+        self.problems = []
+        self.summary = None # {'passed', 'failed', 'errored'} from the last EXECUTION SUMMARY line
+        self._pending = []
+        self._line_number = 0
+        self._block = None
+        self._block_line = 0
+        self._field = None
+
+    def feed(self, chunk):
+        """Consumes a chunk of output and returns the list of results it completed."""
+        if not chunk:
+            return []
+        self._pending.append(chunk)
+        if "\n" not in chunk:
+            return []
+        text = "".join(self._pending)
+        end = text.rfind("\n") + 1
+        self._pending = [text[end:]]
+        return self._consume(text, end)
+
+    def _consume(self, text, end):
+        """Processes the complete lines in ``text[:end]``."""
+        completed = []
+        pos = 0
+        summary_at = -2 # Position of the next EXECUTION SUMMARY, searched lazily (-1: none left)
+        while pos < end:
+            if self._block is None:
+                if summary_at != -1 and summary_at < pos:
+                    summary_at = text.find(_SUMMARY_PREFIX, pos, end)
+                marker_at = text.find(_BLOCK_MARKER, pos, end)
+                if marker_at == -1 or (summary_at != -1 and summary_at < marker_at):
+                    marker_at = summary_at
+                if marker_at == -1:
+                    self._line_number += text.count("\n", pos, end)
+                    break
+                line_start = max(pos, text.rfind("\n", pos, marker_at) + 1)
+                self._line_number += text.count("\n", pos, line_start)
+                pos = line_start
+            line_end = text.index("\n", pos, end)
+            result = self._feed_line(text[pos:line_end])
+            if result is not None:
+                completed.append(result)
+            pos = line_end + 1
+        return completed
+
+    def close(self):
+        """Flushes the last partial line and reports a block left open at end of output."""
+        completed = self.feed("\n") if any(self._pending) else []
+        self._pending = []
+        if self._block is not None:
+            completed.append(self._finish_block("no TEST_RESULT_END before the end of output"))
+        return completed
+
+    def _feed_line(self, line):
+        self._line_number += 1
+        stripped = line.strip()
+        if stripped == "TEST_RESULT_START":
+            result = None
+            if self._block is not None:
+                result = self._finish_block(f"a new TEST_RESULT_START at line {self._line_number} came before its TEST_RESULT_END")
+            self._block = {}
+            self._block_line = self._line_number
+            self._field = None
+            return result
+        if stripped == "TEST_RESULT_END":
+            if self._block is None:
+                self.problems.append(f"Line {self._line_number}: TEST_RESULT_END without a matching TEST_RESULT_START.")
+                return None
+            return self._finish_block()
+        if self._block is None:
+            if stripped.startswith(_SUMMARY_PREFIX):
+                summary_match = _SUMMARY_RE.search(stripped)
+                if summary_match:
+                    passed, failed, errored = (int(n) for n in summary_match.groups())
+                    self.summary = {'passed': passed, 'failed': failed, 'errored': errored}
+            return None
+
+        field, separator, value = stripped.partition(":")
+        if separator and field in _FIELDS:
+            self._field = field
+            self._block[field] = [value.strip()] # A repeated field (e.g. a completed STATUS) wins
+        elif self._field is not None:
+            self._block[self._field].append(line.rstrip())
+        return None
+
+    def _finish_block(self, unterminated_reason=None):
+        block, self._block = self._block, None
+        fields = {name: "\n".join(block.get(name, [])).strip() for name in _FIELDS}
+        where = f"Result block at line {self._block_line}"
+        if unterminated_reason:
+            self.problems.append(f"{where} is unterminated: {unterminated_reason}.")
+        if not fields["ID"]:
+            self.problems.append(f"{where} has no ID and was skipped.")
+            return None
+        missing = [name for name in ("STATUS", "MESSAGE") if name not in block]
+        if missing:
+            self.problems.append(f"{where} ({fields['ID']}) is missing {', '.join(missing)}.")
+        status = fields["STATUS"].split()[0].upper() if fields["STATUS"] else "ERROR"
+        message = fields["MESSAGE"]
+        if unterminated_reason and status == "PASS":
+            status = "ERROR" # Output stopped mid-test, so the PASS is not trustworthy
+        if unterminated_reason:
+            message = (message + "\n" if message else "") + "(Result block was not terminated.)"
+        result = {
+            "id": fields["ID"],
+            "description": fields["DESCRIPTION"],
+            "status": status,
+            "message": message,
+        }
+        self.results.append(result)
+        return result
+
+
+def record_to_result(record):
+    """Converts a results-file record into the result dict shape used by the report."""
+    result = {
+        "id": str(record.get('id', '')),
+        "description": str(record.get('description', '')),
+        "status": str(record.get('status', 'ERROR')).upper(),
+        "message": str(record.get('message', '')),
+    }
+    started_at, finished_at = record.get('started_at'), record.get('finished_at')
+    if isinstance(started_at, (int, float)) and isinstance(finished_at, (int, float)):
+        result["duration_ms"] = int((finished_at - started_at) * 1000)
+    return result
+
+
+def _summarize(results):
+    statuses = [result['status'] for result in results]
+    passed, failed = statuses.count("PASS"), statuses.count("FAIL")
+    return {'passed': passed, 'failed': failed, 'errored': len(statuses) - passed - failed}
+
+
+def parse_execution_output(stdout, records=None):
+    """Returns the closed ``ResultStreamParser`` for a finished run.
+
+    Side-channel ``records`` (one dict per test from the results file) are preferred when the
+    script wrote any; stdout is only parsed for scripts without the side channel.
+    """
+    parser = ResultStreamParser()
+    if records:
+        parser.results = [record_to_result(record) for record in records]
+        parser.summary = _summarize(parser.results)
+        return parser
+    parser.feed(stdout or "")
+    parser.close()
+    return parser
+
+
+def failed_test_ids(results):
+    """IDs of the tests that did not pass (FAIL, ERROR or an unrecognised status), in report order."""
+    return [result['id'] for result in results if result['status'] != "PASS"]
+
+
+def merge_rerun(previous, rerun):
+    """Overlays a rerun of some tests on the run it repeated.
+
+    Both arguments and the return value are ``{'stdout', 'stderr', 'exit_code', 'parsed'}``.
+    Results keep the previous run's order, each rerun test replaces its earlier result (marked
+    ``'rerun': True``; earlier duplicates of its ID are dropped) and the summary and exit code
+    are recomputed over the merged results; a timed-out or crashed rerun keeps its own exit code.
+    """
+    fresh = {result['id']: dict(result, rerun=True) for result in rerun['parsed'].results}
+    merged = ResultStreamParser()
+    replaced = set()
+    for result in previous['parsed'].results:
+        if result['id'] not in fresh:
+            merged.results.append(result)
+        elif result['id'] not in replaced:
+            merged.results.append(fresh[result['id']])
+            replaced.add(result['id'])
+    merged.results.extend(result for test_id, result in fresh.items() if test_id not in replaced)
+    merged.problems = previous['parsed'].problems + rerun['parsed'].problems
+    merged.summary = _summarize(merged.results)
+
+    exit_code = rerun['exit_code']
+    if exit_code in (0, 1):
+        exit_code = 1 if merged.summary['failed'] or merged.summary['errored'] else 0
+    banner = f"\n--- Rerun of {len(rerun['parsed'].results)} failed/errored test(s) ---\n"
+    return {
+        'stdout': (previous['stdout'] or "") + banner + (rerun['stdout'] or ""),
+        'stderr': "\n".join(part for part in (previous['stderr'], rerun['stderr']) if part),
+        'exit_code': exit_code,
+        'parsed': merged,
+    }
+
+def _overall_status(stdout, exit_code, results):
+    """``(color, label, detail)`` describing the run as a whole."""
     if exit_code == 0:
-        report_parts.append("**Overall Status:** <span style='color:green; font-weight:bold;'>Execution Completed</span> (Individual test statuses below)")
-    elif exit_code == 1 and ("EXECUTION SUMMARY:" in (stdout or "") or any("FAIL" in r.get("status","") for r in parse_structured_results(stdout))): # common for test runners if failures exist
-        report_parts.append("**Overall Status:** <span style='color:orange; font-weight:bold;'>Execution Completed with Failures</span> (See details below)")
-    elif exit_code == 143 or exit_code == -9 or exit_code == -15: # TERM/KILL
-        report_parts.append("**Overall Status:** <span style='color:red; font-weight:bold;'>Execution Terminated or Timed Out</span>")
-    else:
-        report_parts.append(f"**Overall Status:** <span style='color:red; font-weight:bold;'>Execution Failed or Errored</span> (Exit Code: {exit_code})")
-    report_parts.append("\n---")
+        return "green", "Execution Completed", "(Individual test statuses below)"
+    if exit_code == 1 and (_SUMMARY_PREFIX in (stdout or "") or any("FAIL" in r.get("status", "") for r in results)): # common for test runners if failures exist
+        return "orange", "Execution Completed with Failures", "(See details below)"
+    if exit_code in (143, -9, -15): # TERM/KILL
+        return "red", "Execution Terminated or Timed Out", ""
+    return "red", "Execution Failed or Errored", f"(Exit Code: {exit_code})"
+
+
+def _analysis(exit_code, results, has_output):
+    """``(color, note)`` closing the report; ``color`` is None for the neutral catch-all."""
+    if any(r['status'] in ("FAIL", "ERROR") for r in results):
+        return "red", "One or more tests failed or encountered errors. Review the results table and `stderr` log."
+    if exit_code != 0:
+        return "red", f"Script exited with a non-zero code ({exit_code}). Review `stderr` for critical errors."
+    if not results and has_output:
+        return "orange", "Script ran, but no structured test results were parsed. Check `stdout` for output format compliance or `stderr` for errors during test execution."
+    if not results:
+        return "orange", "Script executed with exit code 0 but produced no output to stdout or stderr. Verify script logging and assertions."
+    if all(r['status'] == "PASS" for r in results):
+        return "green", "All parsed tests passed and script exited successfully."
+    return None, "Review logs and exit code to determine execution status."
+
+
+def log_preview(text, lines=None, chars=None):
+    """The first and last ``lines`` lines of a log, each end capped at ``chars`` characters.
+
+    Returns ``{'head', 'tail', 'lines', 'omitted_lines', 'bytes'}``; a log that fits entirely
+    in the preview is all in ``head`` with an empty ``tail``. Found with ``str.find``/``rfind``
+    from each end, so the middle of a large log is only counted, never copied.
+    """
+    lines = REPORT_LOG_PREVIEW_LINES if lines is None else lines
+    chars = REPORT_LOG_PREVIEW_CHARS if chars is None else chars
+    text = text or ""
+    total_lines = text.count("\n") + (1 if text and not text.endswith("\n") else 0)
+    preview = {'lines': total_lines, 'bytes': len(text.encode('utf-8')), 'omitted_lines': 0, 'tail': ""}
+    if total_lines <= 2 * lines and len(text) <= 2 * chars:
+        preview['head'] = text
+        return preview
 
-    parsed_results = parse_structured_results(stdout)
-    if parsed_results:
+    head_end = 0
+    for _ in range(lines):
+        newline = text.find("\n", head_end)
+        if newline == -1:
+            head_end = len(text)
+            break
+        head_end = newline + 1
+    head_end = min(head_end, chars)
+    tail_start = len(text)
+    for _ in range(lines):
+        if tail_start <= head_end:
+            break
+        tail_start = text.rfind("\n", 0, tail_start - 1) + 1
+    tail_start = max(tail_start, len(text) - chars, head_end)
+    preview['head'] = text[:head_end]
+    preview['tail'] = text[tail_start:]
+    preview['omitted_lines'] = text.count("\n", head_end, tail_start)
+    return preview
+
+
+def _new_report_dir(reports_dir):
+    """Creates a directory for one report's logs and prunes all but the newest REPORTS_MAX_KEPT."""
+    try:
+        os.makedirs(reports_dir, exist_ok=True)
+        existing = sorted(
+            (entry for entry in os.scandir(reports_dir) if entry.is_dir()),
+            key=lambda entry: entry.stat().st_mtime, reverse=True,
+        )
+        for entry in existing[max(0, REPORTS_MAX_KEPT - 1):]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+        report_dir = os.path.join(reports_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(report_dir)
+        return report_dir
+    except OSError:
+        return None
+
+
+class ExecutionReport:
+    """Everything the execution report shows, computed once per run.
+
+    Rendering it costs the same whatever the size of the run: results are shown a page at a
+    time (``results_page``) and each log as a head/tail preview, while the full logs are
+    written to ``log_dir`` to be paged through (``read_log_page``) or downloaded on demand.
+    ``logs`` maps ``stdout``/``stderr`` to their ``log_preview`` plus the ``path`` of the full
+    log (None when it could not be written).
+    """
+
+    def __init__(self, stdout, stderr, exit_code, parsed=None, log_dir=None):
+        if parsed is None:
+            parsed = parse_execution_output(stdout)
+        self.report_id = os.path.basename(log_dir) if log_dir else uuid.uuid4().hex[:8]
+        self.exit_code = exit_code
+        self.results = parsed.results
+        self.not_passed = [result for result in self.results if result['status'] != "PASS"]
+        self.problems = parsed.problems
+        self.summary = parsed.summary
+        self.status = _overall_status(stdout, exit_code, self.results)
+        self.analysis = _analysis(exit_code, self.results, bool(stdout or stderr))
+        self.show_duration = any('duration_ms' in result for result in self.results)
+        self.logs = {}
+        for name, text in (("stdout", stdout), ("stderr", stderr)):
+            preview = log_preview(text)
+            preview['path'] = None
+            if log_dir is not None:
+                path = os.path.join(log_dir, f"{name}.log")
+                try:
+                    with open(path, 'w', encoding='utf-8') as log_file:
+                        log_file.write(text or "")
+                    preview['path'] = path
+                except OSError:
+                    pass
+            self.logs[name] = preview
+
+    def _rows(self, only_failed):
+        return self.not_passed if only_failed else self.results
+
+    def page_count(self, page_size=None, only_failed=False):
+        page_size = page_size or REPORT_PAGE_SIZE
+        return max(1, math.ceil(len(self._rows(only_failed)) / page_size))
+
+    def results_page(self, page, page_size=None, only_failed=False):
+        """Results on 1-based ``page``, clamped to the available pages."""
+        page_size = page_size or REPORT_PAGE_SIZE
+        page = min(max(1, page), self.page_count(page_size, only_failed))
+        return self._rows(only_failed)[(page - 1) * page_size:page * page_size]
+
+
+def build_report(stdout, stderr, exit_code, parsed=None, reports_dir=None):
+    """Builds the ``ExecutionReport`` for a finished run, saving its full logs under ``reports_dir``."""
+    return ExecutionReport(stdout, stderr, exit_code, parsed, _new_report_dir(reports_dir or REPORTS_DIR))
+
+
+def log_page_count(log, page_bytes=None):
+    return max(1, math.ceil(log['bytes'] / (page_bytes or REPORT_LOG_PAGE_BYTES)))
+
+
+def read_log_page(path, page, page_bytes=None):
+    """Reads the 1-based ``page`` of a saved log (``page_bytes`` per page) without loading the rest."""
+    page_bytes = page_bytes or REPORT_LOG_PAGE_BYTES
+    with open(path, 'rb') as log_file:
+        log_file.seek((max(1, page) - 1) * page_bytes)
+        return log_file.read(page_bytes).decode('utf-8', errors='replace') # A page may split a character
+
+
+def status_badge(status):
+    return f"<span style='color:{_STATUS_COLORS.get(status, 'green')}; font-weight:bold;'>{html.escape(status)}</span>"
+
+
+def report_header_markdown(report):
+    color, label, detail = report.status
+    return "\n".join([
+        "## Test Execution Report",
+        f"**Overall Exit Code:** `{report.exit_code}`",
+        f"**Overall Status:** <span style='color:{color}; font-weight:bold;'>{label}</span> {detail}".rstrip(),
+    ])
+
+
+def results_table_markdown(results, show_duration):
+    table_header = "| Test ID | Description | Status | Message |\n|---|---|---|---|"
+    if show_duration:
+        table_header = "| Test ID | Description | Status | Duration | Message |\n|---|---|---|---|---|"
+    rows = [table_header]
+    for res in results:
+        esc_id = html.escape(res['id'])
+        esc_desc = html.escape(res['description'])
+        rerun_note = " (rerun)" if res.get('rerun') else ""
+        esc_msg = html.escape(res['message'].replace("\n", "<br>"))
+
+        duration_cell = ""
+        if show_duration:
+            duration_cell = f" {res['duration_ms'] / 1000:.1f}s |" if 'duration_ms' in res else " |"
+        rows.append(f"| {esc_id} | {esc_desc} | {status_badge(res['status'])}{rerun_note} |{duration_cell} {esc_msg} |")
+    return "\n".join(rows)
+
+
+def report_details_markdown(report):
+    """Output format problems and the script's own execution summary (empty if neither)."""
+    parts = []
+    if report.problems:
+        parts.append("### Output Format Problems")
+        for problem in report.problems:
+            parts.append(f"- {html.escape(problem)}")
+        parts.append("\n")
+    if report.summary:
+        parts.append("### Script Execution Summary")
+        parts.append(f"- **Total Passed:** {report.summary['passed']}")
+        parts.append(f"- **Total Failed:** {report.summary['failed']}")
+        parts.append(f"- **Total Errored:** {report.summary['errored']}")
+    return "\n".join(parts)
+
+
+def analysis_markdown(report):
+    color, note = report.analysis
+    note = f"<span style='color:{color};'>{note}</span>" if color else note
+    return "--- \n **Analysis Notes:**\n" + note
+
+
+def format_report(stdout, stderr, exit_code, parsed=None):
+    """Formats the execution results into a single markdown document with the full logs inlined.
+
+    Used for saved artifacts (batch report.md); the app renders an ``ExecutionReport`` page
+    by page instead. ``parsed`` is the run's ``parse_execution_output(stdout)``; pass it in
+    to reuse one parse instead of re-scanning stdout.
+    """
+    report = ExecutionReport(stdout, stderr, exit_code, parsed)
+    report_parts = [report_header_markdown(report), "\n---"]
+
+    if report.results:
         report_parts.append("### Individual Test Case Results")
-        table_header = "| Test ID | Description | Status | Message |\n|---|---|---|---|"
-        report_parts.append(table_header)
-        for res in parsed_results:
-            status_color = "green"
-            if res['status'] == "FAIL":
-                status_color = "red"
-            elif res['status'] == "ERROR":
-                status_color = "orange"
-            
-            esc_id = html.escape(res['id'])
-            esc_desc = html.escape(res['description'])
-            esc_status = html.escape(res['status'])
-            esc_msg = html.escape(res['message'].replace("\n", "<br>"))
-
-            table_row = f"| {esc_id} | {esc_desc} | <span style='color:{status_color}; font-weight:bold;'>{esc_status}</span> | {esc_msg} |"
-            report_parts.append(table_row)
+        report_parts.append(results_table_markdown(report.results, report.show_duration))
         report_parts.append("\n")
     else:
-        report_parts.append("No structured test results found in standard output. The script might not have run correctly or produced output in the expected format.")
-
-    summary_match = re.search(r"EXECUTION SUMMARY: Passed: (\d+), Failed: (\d+), Errored: (\d+)", stdout or "")
-    if summary_match:
-        passed, failed, errored = summary_match.groups()
-        report_parts.append("### Script Execution Summary")
-        report_parts.append(f"- **Total Passed:** {passed}")
-        report_parts.append(f"- **Total Failed:** {failed}")
-        report_parts.append(f"- **Total Errored:** {errored}")
+        report_parts.append(NO_RESULTS_NOTE)
+
+    details = report_details_markdown(report)
+    if details:
+        report_parts.append(details)
     report_parts.append("\n---")
 
     escaped_stdout = html.escape(stdout or "No standard output captured.")
@@ -82,18 +446,5 @@ def format_report(stdout, stderr, exit_code):
     report_parts.append("<details>\n <summary><strong>Full Standard Error (`stderr`)</strong> - Click to expand</summary>\n"
                         f"<pre><code style='white-space: pre-wrap; word-wrap: break-word;'>{escaped_stderr}</code></pre>\n</details>\n")
 
-    report_parts.append("--- \n **Analysis Notes:**")
-    if any(r['status'] == "FAIL" for r in parsed_results) or any(r['status'] == "ERROR" for r in parsed_results):
-        report_parts.append("<span style='color:red;'>One or more tests failed or encountered errors. Review the results table and `stderr` log.</span>")
-    elif exit_code != 0:
-         report_parts.append(f"<span style='color:red;'>Script exited with a non-zero code ({exit_code}). Review `stderr` for critical errors.</span>")
-    elif not parsed_results and (stdout or stderr):
-        report_parts.append("<span style='color:orange;'>Script ran, but no structured test results were parsed. Check `stdout` for output format compliance or `stderr` for errors during test execution.</span>")
-    elif not parsed_results and not stdout and not stderr and exit_code == 0:
-        report_parts.append("<span style='color:orange;'>Script executed with exit code 0 but produced no output to stdout or stderr. Verify script logging and assertions.</span>")
-    elif all(r['status'] == "PASS" for r in parsed_results) and exit_code == 0:
-        report_parts.append("<span style='color:green;'>All parsed tests passed and script exited successfully.</span>")
-    else: # Catch-all
-        report_parts.append("Review logs and exit code to determine execution status.")
-
-    return "\n".join(report_parts)
\ No newline at end of file
+    report_parts.append(analysis_markdown(report))
+    return "\n".join(report_parts)
@@ -0,0 +1,169 @@
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+# Exception class names raised by google.api_core / HTTP clients for transient failures
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "GatewayTimeout", "BadGateway", "Aborted", "RetryError",
+}
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency while its circuit breaker is open."""
+
+
+def is_retryable(error):
+    """True for rate limits, timeouts, 5xx responses and dropped connections."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    code = getattr(error, 'code', None)
+    code = getattr(code, 'value', code) # grpc StatusCode enums carry (number, name)
+    return isinstance(code, int) and code in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(attempt, base_seconds, max_seconds):
+    """Full-jitter exponential backoff: uniform between 0 and ``base * 2**attempt`` (capped)."""
+    return random.uniform(0, min(max_seconds, base_seconds * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and fails fast for ``reset_seconds``.
+
+    After the cool-down one trial call is let through (half-open); its success closes the
+    circuit and its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running or time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._trial_running or time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def retry_in(self):
+        """Seconds until a trial call will be allowed (0 when closed)."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+
+class LatencyTracker:
+    """Sliding window of call latencies for percentile-based hedging."""
+
+    def __init__(self, window):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction, min_samples=1):
+        """Nearest-rank percentile, or None until ``min_samples`` latencies have been seen."""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def call_with_retries(func, max_retries, base_seconds, max_seconds, deadline=None, breaker=None, on_retry=None):
+    """Calls ``func()`` and retries retryable errors with full-jitter backoff.
+
+    Stops early when the next attempt could not start before ``deadline`` (a ``time.monotonic()``
+    value). With a ``breaker``, calls are refused with CircuitOpenError while it is open and the
+    final outcome of retryable failures is reported to it; other errors (bad requests, blocked
+    prompts) are raised immediately and do not count against the dependency.
+    """
+    attempt = 0
+    while True:
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f"circuit open, retrying in {breaker.retry_in():.0f}s")
+        try:
+            result = func()
+        except Exception as e:
+            retryable = is_retryable(e)
+            if not retryable:
+                if breaker is not None:
+                    breaker.record_success() # The service answered; only the request was bad
+                raise
+            delay = backoff_delay(attempt, base_seconds, max_seconds)
+            out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+            if attempt >= max_retries or out_of_time:
+                if breaker is not None:
+                    breaker.record_failure()
+                raise
+            if on_retry is not None:
+                on_retry(attempt + 1, e, delay)
+            time.sleep(delay)
+            attempt += 1
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+def hedged_call(func, hedge_after, executor):
+    """Runs ``func()`` on ``executor``; if it is still running after ``hedge_after`` seconds a
+    duplicate is started and whichever succeeds first wins.
+
+    Returns ``(result, hedged, duplicate_won)``. The losing call is left to finish in the
+    background (HTTP requests cannot be cancelled mid-flight). If both fail, the last error
+    is raised.
+    """
+    first = executor.submit(func)
+    if hedge_after is None:
+        return first.result(), False, False
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        return first.result(), False, False
+
+    duplicate = executor.submit(func)
+    pending = {first, duplicate}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result(), True, future is duplicate
+            error = future.exception()
+    raise error
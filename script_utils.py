@@ -0,0 +1,339 @@
+import ast
+import hashlib
+import json
+import os
+import pprint
+import re
+from string import Template
+
+# Names the shared orchestrator defines; shard code must not shadow them
+ORCHESTRATOR_NAMES = {
+    "TEST_CASES", "run_test_cases", "_SkippedTest", "_test_function_name", "_print_error_block", "_result_message",
+}
+
+# Command-line option through which scripts that support it receive the JSON-lines results path
+RESULTS_FILE_OPTION = "--results-file"
+
+ORCHESTRATOR_IMPORTS = """\
+import argparse
+import contextlib
+import io
+import json
+import re
+import sys
+import time
+import traceback
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+"""
+
+_ORCHESTRATOR_FUNCTIONS = '''\
+class _SkippedTest(Exception):
+    pass
+
+
+def _test_function_name(test_case_id):
+    return "test_" + re.sub(r"\\W", "_", str(test_case_id))
+
+
+def _print_error_block(test_case, captured, message):
+    """Completes a half-printed result block, or prints a full ERROR block."""
+    if captured.rfind("TEST_RESULT_START") > captured.rfind("TEST_RESULT_END"):
+        print("STATUS: ERROR")
+    else:
+        print("TEST_RESULT_START")
+        print(f"ID: {test_case['id']}")
+        print(f"DESCRIPTION: {test_case.get('description', '')}")
+        print("STATUS: ERROR")
+    print(f"MESSAGE: {message}")
+    print("TEST_RESULT_END")
+
+
+def _result_message(output):
+    """The MESSAGE of the last result block in a test's output."""
+    start = output.rfind("MESSAGE:")
+    if start == -1:
+        return ""
+    end = output.find("TEST_RESULT_END", start)
+    return output[start + len("MESSAGE:"):end if end != -1 else len(output)].strip()
+
+
+def run_test_cases(test_cases, namespace, headless, results_file=None):
+    """Runs each test function with one shared driver and prints the structured results.
+
+    With ``results_file`` (an open text file) one JSON record per test is also appended and
+    flushed as soon as the test finishes. Test cases carrying a ``skip_reason`` are reported
+    as ERROR without being run (no browser is started if every test is skipped).
+    """
+    counts = {"PASS": 0, "FAIL": 0, "ERROR": 0}
+    driver = None
+    try:
+        options = Options()
+        if headless:
+            options.add_argument("--headless")
+            options.add_argument("--disable-gpu")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--window-size=1920,1080")
+        if not all(test_case.get("skip_reason") for test_case in test_cases):
+            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+
+        for test_case in test_cases:
+            test_function = namespace.get(_test_function_name(test_case["id"]))
+            captured = io.StringIO()
+            started_at = time.time()
+            try:
+                if test_case.get("skip_reason"):
+                    raise _SkippedTest(f"Skipped: {test_case['skip_reason']}")
+                if test_function is None:
+                    raise LookupError(f"No test function was generated for {test_case['id']}")
+                with contextlib.redirect_stdout(captured):
+                    test_function(driver, test_case)
+            except _SkippedTest as e:
+                message = str(e)
+                _print_error_block(test_case, "", message)
+                status = "ERROR"
+            except Exception as e:
+                sys.stdout.write(captured.getvalue())
+                traceback.print_exc(file=sys.stderr)
+                message = f"{type(e).__name__}: {e}"
+                _print_error_block(test_case, captured.getvalue(), message)
+                status = "ERROR"
+            else:
+                output = captured.getvalue()
+                sys.stdout.write(output)
+                statuses = re.findall(r"^STATUS:\\s*(\\w+)", output, re.MULTILINE)
+                status = statuses[-1].upper() if statuses else "ERROR"
+                message = _result_message(output)
+                if not statuses:
+                    message = "Test function finished without reporting a status."
+                    _print_error_block(test_case, output, message)
+                status = status if status in counts else "ERROR"
+            counts[status] += 1
+            sys.stdout.flush()
+            if results_file is not None:
+                record = {
+                    "id": str(test_case["id"]),
+                    "description": test_case.get("description", ""),
+                    "status": status,
+                    "message": message,
+                    "started_at": started_at,
+                    "finished_at": time.time(),
+                }
+                results_file.write(json.dumps(record) + "\\n")
+                results_file.flush()
+    finally:
+        if driver:
+            driver.quit()
+
+    print(f"EXECUTION SUMMARY: Passed: {counts['PASS']}, Failed: {counts['FAIL']}, Errored: {counts['ERROR']}")
+    sys.stdout.flush()
+    return counts
+'''
+
+_ORCHESTRATOR_TEMPLATE = Template('''\
+TEST_CASES = $test_cases
+
+
+''' + _ORCHESTRATOR_FUNCTIONS + '''
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--results-file", help="Append one JSON record per test to this file.")
+    args = parser.parse_args()
+    results_file = open(args.results_file, "a", encoding="utf-8") if args.results_file else None
+    try:
+        counts = run_test_cases(TEST_CASES, globals(), args.headless, results_file)
+    finally:
+        if results_file is not None:
+            results_file.close()
+    sys.exit(0 if counts["FAIL"] == 0 and counts["ERROR"] == 0 else 1)
+''')
+
+# Runs a subset of an existing script's test functions in this process with its own driver
+_WORKER_TEMPLATE = Template('''\
+import importlib.util
+$imports
+
+_spec = importlib.util.spec_from_file_location("generated_test_script", $script_path)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+TEST_CASES = json.loads($test_cases)
+
+
+''' + _ORCHESTRATOR_FUNCTIONS + '''
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--results-file", help="Append one JSON record per test to this file.")
+    args = parser.parse_args()
+    results_file = open(args.results_file, "a", encoding="utf-8") if args.results_file else None
+    try:
+        counts = run_test_cases(TEST_CASES, vars(_module), args.headless, results_file)
+    finally:
+        if results_file is not None:
+            results_file.close()
+    sys.exit(0 if counts["FAIL"] == 0 and counts["ERROR"] == 0 else 1)
+''')
+
+
+def test_function_name(test_case_id):
+    """Returns the function name the orchestrator calls for a test case ID."""
+    return "test_" + re.sub(r"\W", "_", str(test_case_id))
+
+
+def build_orchestrator(test_cases):
+    """Renders the shared __main__ orchestrator for the given test cases.
+
+    The full test case dicts are embedded (as a Python literal), exactly as parallel workers
+    receive them, since the test functions read ``steps`` and ``expected_outcome`` from them.
+    """
+    embedded_cases = [json.loads(json.dumps(tc, default=str)) for tc in test_cases if isinstance(tc, dict)]
+    return _ORCHESTRATOR_TEMPLATE.substitute(test_cases=pprint.pformat(embedded_cases, width=100, sort_dicts=False))
+
+
+def _is_main_guard(node):
+    return (
+        isinstance(node, ast.If)
+        and isinstance(node.test, ast.Compare)
+        and isinstance(node.test.left, ast.Name)
+        and node.test.left.id == "__name__"
+    )
+
+
+def _defined_names(node):
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return {node.name}
+    if isinstance(node, (ast.Assign, ast.AnnAssign)):
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        return {target.id for target in targets if isinstance(target, ast.Name)}
+    return set()
+
+
+def _node_source(source_lines, node):
+    """Returns the full source lines of a top-level node, including its decorators."""
+    start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, 'decorator_list', [])])
+    return "\n".join(source_lines[start - 1:node.end_lineno])
+
+
+def test_case_hash(test_case, url, page_hash=None):
+    """Content hash identifying a test case (and its target URL and page DOM) in the function store."""
+    material = json.dumps({'url': url, 'page_hash': page_hash, 'test_case': test_case}, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def split_generated_code(source):
+    """Splits generated code into ``(imports, helpers, test_functions)``.
+
+    ``helpers`` and ``test_functions`` map names to source; ``__main__`` blocks and
+    module docstrings are dropped. Raises SyntaxError if the code does not parse.
+    """
+    tree = ast.parse(source)
+    source_lines = source.splitlines()
+    imports = []
+    helpers = {}
+    test_functions = {}
+
+    for node in tree.body:
+        node_source = _node_source(source_lines, node)
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            imports.append(node_source)
+        elif _is_main_guard(node):
+            continue
+        elif isinstance(node, ast.Expr) and isinstance(getattr(node, 'value', None), ast.Constant):
+            continue # Module docstrings and stray string literals
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test_"):
+            test_functions[node.name] = node_source
+        else:
+            names = _defined_names(node)
+            helpers[next(iter(sorted(names))) if names else node_source] = node_source
+    return imports, helpers, test_functions
+
+
+def assemble_script_from_parts(parts, test_cases):
+    """Builds one runnable script from per-test-case parts and the shared orchestrator.
+
+    Each part is a dict with ``imports`` (list of lines), ``helpers`` (name -> source) and
+    ``function`` (test function source). Imports are de-duplicated, helpers and test
+    functions keep their first definition, and orchestrator names are never shadowed.
+    """
+    import_lines = ORCHESTRATOR_IMPORTS.strip().splitlines()
+    seen_imports = set(import_lines)
+    helper_sections = []
+    function_sections = []
+    defined = set(ORCHESTRATOR_NAMES)
+
+    for part in parts:
+        for import_line in part.get('imports', []):
+            if import_line not in seen_imports:
+                seen_imports.add(import_line)
+                import_lines.append(import_line)
+        for name, helper_source in part.get('helpers', {}).items():
+            if name not in defined:
+                defined.add(name)
+                helper_sections.append(helper_source)
+        function_source = part.get('function')
+        function_name = part.get('function_name')
+        if function_source and function_name not in defined:
+            defined.add(function_name)
+            function_sections.append(function_source)
+
+    script = "\n".join(import_lines) + "\n\n\n" + "\n\n\n".join(helper_sections + function_sections)
+    script += "\n\n\n" + build_orchestrator(test_cases)
+    return script
+
+
+def pending_test_cases(test_cases, url, function_store, page_hash=None):
+    """Returns the test cases that have no generated function in the store yet."""
+    return [
+        tc for tc in test_cases
+        if isinstance(tc, dict) and test_case_hash(tc, url, page_hash) not in function_store
+    ]
+
+
+def find_test_functions(script):
+    """Returns the names of the script's top-level ``test_*`` functions in source order."""
+    try:
+        tree = ast.parse(script)
+    except SyntaxError:
+        return []
+    return [
+        node.name for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test_")
+    ]
+
+
+def plan_test_cases(script, test_cases=None):
+    """Pairs every test function in the script with its test case dict.
+
+    Functions with no matching test case get a minimal ``{'id', 'description'}`` derived
+    from the function name, so the orchestrator can still call and report them.
+    """
+    cases_by_function = {}
+    for tc in test_cases or []:
+        if isinstance(tc, dict):
+            cases_by_function.setdefault(test_function_name(tc.get('id', '')), tc)
+    planned = []
+    for function_name in find_test_functions(script):
+        tc = cases_by_function.get(function_name) or {'id': function_name[len("test_"):], 'description': ''}
+        planned.append(tc)
+    return planned
+
+
+def build_worker_script(script_path, test_cases):
+    """Renders a runner that imports the script at ``script_path`` and runs only ``test_cases``."""
+    return _WORKER_TEMPLATE.substitute(
+        imports=ORCHESTRATOR_IMPORTS.strip(),
+        script_path=repr(os.path.abspath(script_path)),
+        test_cases=repr(json.dumps(test_cases, default=str)),
+    )
+
+
+def supports_results_file(script):
+    """Whether the script accepts ``--results-file`` (older or hand-written scripts may not)."""
+    return RESULTS_FILE_OPTION in script
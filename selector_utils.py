@@ -0,0 +1,757 @@
+import ast
+import functools
+import re
+from collections import defaultdict
+from html.parser import HTMLParser
+
+# Selenium's By constants and the strategies they stand for
+BY_STRATEGIES = {
+    'ID': "id", 'NAME': "name", 'CLASS_NAME': "class name", 'TAG_NAME': "tag name",
+    'LINK_TEXT': "link text", 'PARTIAL_LINK_TEXT': "partial link text",
+    'CSS_SELECTOR': "css selector", 'XPATH': "xpath",
+}
+
+_VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+_TEXTLESS_TAGS = {'script', 'style', 'noscript', 'template'}
+# The scraped HTML is only the <body> contents (see selenium_utils.extract_body_content)
+_OUTSIDE_BODY_TAGS = {'html', 'head', 'title', 'meta', 'link', 'base', 'body'}
+# Waits that expect an element to be absent, so not finding it is not a problem
+_ABSENCE_WAITS = ("invisibility", "staleness")
+
+
+class UnsupportedSelector(ValueError):
+    """The selector uses syntax the offline matcher does not implement."""
+
+
+class DomElement:
+    __slots__ = ('tag', 'attrs', 'classes', 'parent', 'children', 'text', 'content', 'order', '_string')
+
+    def __init__(self, tag, attrs, parent, order):
+        self.tag = tag
+        self.attrs = attrs
+        self.classes = frozenset((attrs.get('class') or "").split())
+        self.parent = parent
+        self.children = []
+        self.text = [] # Direct text nodes (XPath ``text()``)
+        self.content = [] # Text nodes and child elements in document order
+        self.order = order
+        self._string = None
+
+    def string_value(self):
+        """All descendant text, whitespace-normalized (XPath ``.``, Selenium link text)."""
+        if self._string is None:
+            parts = []
+            stack = list(reversed(self.content))
+            while stack:
+                item = stack.pop()
+                if isinstance(item, str):
+                    parts.append(item)
+                else:
+                    stack.extend(reversed(item.content))
+            self._string = " ".join(" ".join(parts).split())
+        return self._string
+
+
+class _IndexParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = DomElement('#document', {}, None, -1)
+        self.elements = []
+        self._stack = [self.root]
+        self._textless_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        element = DomElement(tag, {name: value or "" for name, value in attrs}, self._stack[-1], len(self.elements))
+        self._stack[-1].children.append(element)
+        self._stack[-1].content.append(element)
+        self.elements.append(element)
+        if tag not in _VOID_TAGS:
+            self._stack.append(element)
+            if tag in _TEXTLESS_TAGS:
+                self._textless_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self._stack.pop()
+            if tag in _TEXTLESS_TAGS:
+                self._textless_depth -= 1
+
+    def handle_endtag(self, tag):
+        # Tolerate unclosed tags by popping up to the matching opener
+        for position in range(len(self._stack) - 1, 0, -1):
+            if self._stack[position].tag == tag:
+                for element in self._stack[position:]:
+                    if element.tag in _TEXTLESS_TAGS:
+                        self._textless_depth -= 1
+                del self._stack[position:]
+                return
+
+    def handle_data(self, data):
+        if not self._textless_depth and data.strip():
+            self._stack[-1].text.append(data)
+            self._stack[-1].content.append(data)
+
+
+class DomIndex:
+    """Lookup tables over a page snapshot for resolving Selenium locators without a browser."""
+
+    def __init__(self, html_source):
+        parser = _IndexParser()
+        parser.feed(html_source or "")
+        parser.close()
+        self.root = parser.root
+        self.elements = parser.elements
+        self.by_id = defaultdict(list)
+        self.by_name = defaultdict(list)
+        self.by_class = defaultdict(list)
+        self.by_tag = defaultdict(list)
+        self.by_attribute = defaultdict(list)
+        for element in self.elements:
+            self.by_tag[element.tag].append(element)
+            for name in element.attrs:
+                self.by_attribute[name].append(element)
+            if 'id' in element.attrs:
+                self.by_id[element.attrs['id']].append(element)
+            if 'name' in element.attrs:
+                self.by_name[element.attrs['name']].append(element)
+            for class_name in element.classes:
+                self.by_class[class_name].append(element)
+
+    def find(self, strategy, value):
+        """Elements the locator matches in the snapshot; raises UnsupportedSelector when it can't tell."""
+        if strategy == "id":
+            return list(self.by_id.get(value, ()))
+        if strategy == "name":
+            return list(self.by_name.get(value, ()))
+        if strategy == "tag name":
+            if value.lower() in _OUTSIDE_BODY_TAGS:
+                raise UnsupportedSelector(f"<{value}> is outside the scraped <body>")
+            return list(self.by_tag.get(value.lower(), ()))
+        if strategy == "class name":
+            if len(value.split()) != 1:
+                raise UnsupportedSelector("compound class names are rejected by Selenium")
+            return list(self.by_class.get(value.strip(), ()))
+        if strategy in ("link text", "partial link text"):
+            wanted = " ".join(value.split())
+            if strategy == "link text":
+                return [a for a in self.by_tag.get('a', ()) if a.string_value() == wanted]
+            return [a for a in self.by_tag.get('a', ()) if wanted in a.string_value()]
+        if strategy == "css selector":
+            return self._select_css(value)
+        if strategy == "xpath":
+            return self._select_xpath(value)
+        raise UnsupportedSelector(f"unknown strategy {strategy!r}")
+
+    # CSS selectors
+
+    def _select_css(self, selector):
+        matches = {}
+        for parts in _parse_css(selector):
+            for element in self._css_candidates(parts[-1][1]):
+                if _css_matches(element, parts, len(parts) - 1):
+                    matches[element.order] = element
+        return [matches[order] for order in sorted(matches)]
+
+    def _css_candidates(self, compound):
+        if compound['ids']:
+            return self.by_id.get(compound['ids'][0], ())
+        if compound['classes']:
+            return self.by_class.get(compound['classes'][0], ())
+        if compound['tag']:
+            return self.by_tag.get(compound['tag'], ())
+        if compound['attributes']:
+            return self.by_attribute.get(compound['attributes'][0][0], ())
+        return self.elements
+
+    # XPath expressions
+
+    def _select_xpath(self, expression):
+        matches = {}
+        for path in _split_top_level(expression.strip(), "|"):
+            for element in self._evaluate_path(path.strip()):
+                matches[element.order] = element
+        return [matches[order] for order in sorted(matches)]
+
+    def _evaluate_path(self, path):
+        if path.startswith("."):
+            path = path[1:] # Relative to the document when searched from the driver
+        if not path.startswith("/"):
+            raise UnsupportedSelector("only absolute or // paths are supported")
+        context = [self.root]
+        for descendant, step, predicates in _parse_xpath_steps(path):
+            if descendant:
+                context = _descendants_or_self(context)
+            results = {}
+            for node in context:
+                candidates = [child for child in node.children if step == "*" or child.tag == step]
+                for predicate in predicates:
+                    candidates = _apply_predicate(candidates, predicate)
+                for element in candidates:
+                    results[element.order] = element
+            context = [results[order] for order in sorted(results)]
+            if not context:
+                break
+        return [node for node in context if node is not self.root]
+
+
+@functools.lru_cache(maxsize=8)
+def get_dom_index(html_source):
+    """Builds (once per distinct snapshot) the index used to resolve locators."""
+    return DomIndex(html_source)
+
+
+# --- CSS -------------------------------------------------------------------------------------
+
+_CSS_IDENT = r"-?[_a-zA-Z\u00a0-\uffff][-_a-zA-Z0-9\u00a0-\uffff]*"
+_CSS_TOKEN_RE = re.compile(
+    rf"(?P<combinator>\s*[>+~]\s*|\s+)"
+    rf"|(?P<tag>\*|{_CSS_IDENT})"
+    rf"|#(?P<id>[-_a-zA-Z0-9\u00a0-\uffff]+)"
+    rf"|\.(?P<class>{_CSS_IDENT})"
+    rf"|\[\s*(?P<attribute>{_CSS_IDENT})\s*(?:(?P<operator>[~|^$*]?=)\s*"
+    rf"(?:\"(?P<dquoted>[^\"]*)\"|'(?P<squoted>[^']*)'|(?P<bare>[^\]\s]+))\s*(?P<flag>[iIsS])?\s*)?\]"
+    rf"|:(?P<pseudo>[-a-z]+)(?P<open>\()?"
+)
+_CSS_PSEUDOS = {'first-child', 'last-child', 'only-child', 'first-of-type', 'last-of-type', 'empty',
+                'checked', 'disabled', 'enabled', 'nth-child', 'nth-of-type', 'not'}
+
+
+def _new_compound():
+    return {'tag': None, 'ids': [], 'classes': [], 'attributes': [], 'pseudos': []}
+
+
+def _closing_paren(text, start):
+    depth = 1
+    quote = None
+    for position in range(start, len(text)):
+        char = text[position]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return position
+    raise UnsupportedSelector("unbalanced parentheses")
+
+
+def _parse_css(selector):
+    """Parses a selector list into ``[[(combinator, compound), ...], ...]`` (one list per group)."""
+    if "\\" in selector:
+        raise UnsupportedSelector("escaped characters are not supported")
+    groups = []
+    for group in _split_top_level(selector.strip(), ","):
+        group = group.strip()
+        if not group:
+            raise UnsupportedSelector("empty selector")
+        parts = []
+        combinator = None
+        compound = _new_compound()
+        position = 0
+        while position < len(group):
+            match = _CSS_TOKEN_RE.match(group, position)
+            if not match or match.end() == position:
+                raise UnsupportedSelector(f"unsupported syntax at {group[position:position + 20]!r}")
+            position = match.end()
+            if match.group('combinator') is not None:
+                if compound == _new_compound():
+                    raise UnsupportedSelector("misplaced combinator")
+                parts.append((combinator, compound))
+                combinator = match.group('combinator').strip() or " "
+                compound = _new_compound()
+            elif match.group('tag') is not None:
+                compound['tag'] = None if match.group('tag') == "*" else match.group('tag').lower()
+                if compound['tag'] in _OUTSIDE_BODY_TAGS:
+                    raise UnsupportedSelector(f"<{compound['tag']}> is outside the scraped <body>")
+            elif match.group('id') is not None:
+                compound['ids'].append(match.group('id'))
+            elif match.group('class') is not None:
+                compound['classes'].append(match.group('class'))
+            elif match.group('attribute') is not None:
+                value = next((v for v in (match.group('dquoted'), match.group('squoted'), match.group('bare')) if v is not None), None)
+                ignore_case = (match.group('flag') or "").lower() == "i"
+                compound['attributes'].append((match.group('attribute').lower(), match.group('operator'), value, ignore_case))
+            else:
+                name = match.group('pseudo')
+                if name not in _CSS_PSEUDOS:
+                    raise UnsupportedSelector(f":{name} can't be checked offline")
+                argument = None
+                if match.group('open'):
+                    end = _closing_paren(group, position)
+                    argument = group[position:end].strip()
+                    position = end + 1
+                    if name == "not":
+                        inner = _parse_css(argument)
+                        if any(len(parts) > 1 for parts in inner):
+                            raise UnsupportedSelector(":not() with combinators can't be checked offline")
+                        argument = [parts[0][1] for parts in inner]
+                    elif argument.isdigit():
+                        argument = int(argument)
+                    else:
+                        raise UnsupportedSelector(f":{name}({argument}) can't be checked offline")
+                elif name in ("not", "nth-child", "nth-of-type"):
+                    raise UnsupportedSelector(f":{name} needs an argument")
+                compound['pseudos'].append((name, argument))
+        if compound == _new_compound():
+            raise UnsupportedSelector("selector ends with a combinator")
+        parts.append((combinator, compound))
+        groups.append(parts)
+    return groups
+
+
+def _attribute_matches(element, name, operator, expected, ignore_case):
+    value = element.attrs.get(name)
+    if value is None:
+        return False
+    if operator is None:
+        return True
+    if ignore_case:
+        value, expected = value.lower(), expected.lower()
+    if operator == "=":
+        return value == expected
+    if operator == "~=":
+        return expected in value.split()
+    if operator == "|=":
+        return value == expected or value.startswith(expected + "-")
+    if not expected:
+        return False # [a^=""], [a$=""] and [a*=""] never match
+    if operator == "^=":
+        return value.startswith(expected)
+    if operator == "$=":
+        return value.endswith(expected)
+    return expected in value
+
+
+def _pseudo_matches(element, name, argument):
+    siblings = element.parent.children if element.parent is not None else [element]
+    if name == "not":
+        return not any(_compound_matches(element, compound) for compound in argument)
+    if name == "empty":
+        return not element.children and not element.text
+    if name == "checked":
+        return 'checked' in element.attrs or 'selected' in element.attrs
+    if name == "disabled":
+        return 'disabled' in element.attrs
+    if name == "enabled":
+        return 'disabled' not in element.attrs
+    if name.endswith("of-type"):
+        siblings = [sibling for sibling in siblings if sibling.tag == element.tag]
+    position = siblings.index(element)
+    if name in ("first-child", "first-of-type"):
+        return position == 0
+    if name in ("last-child", "last-of-type"):
+        return position == len(siblings) - 1
+    if name == "only-child":
+        return len(siblings) == 1
+    return position + 1 == argument # nth-child / nth-of-type
+
+
+def _compound_matches(element, compound):
+    if compound['tag'] and element.tag != compound['tag']:
+        return False
+    if any(element.attrs.get('id') != element_id for element_id in compound['ids']):
+        return False
+    if any(class_name not in element.classes for class_name in compound['classes']):
+        return False
+    if not all(_attribute_matches(element, *attribute) for attribute in compound['attributes']):
+        return False
+    return all(_pseudo_matches(element, name, argument) for name, argument in compound['pseudos'])
+
+
+def _css_matches(element, parts, index):
+    combinator, compound = parts[index]
+    if element.tag.startswith("#") or not _compound_matches(element, compound):
+        return False
+    if index == 0:
+        return True
+    if combinator in (" ", ">"):
+        ancestor = element.parent
+        while ancestor is not None and not ancestor.tag.startswith("#"):
+            if _css_matches(ancestor, parts, index - 1):
+                return True
+            if combinator == ">":
+                return False
+            ancestor = ancestor.parent
+        return False
+    siblings = element.parent.children
+    previous = siblings[:siblings.index(element)]
+    if combinator == "+":
+        return bool(previous) and _css_matches(previous[-1], parts, index - 1)
+    return any(_css_matches(sibling, parts, index - 1) for sibling in previous)
+
+
+# --- XPath -----------------------------------------------------------------------------------
+
+_XPATH_STEP_RE = re.compile(r"(//|/)(?:child::)?(\*|[a-zA-Z][-\w]*)")
+_XPATH_LITERAL = r"(?:'(?P<squoted>[^']*)'|\"(?P<dquoted>[^\"]*)\")"
+_XPATH_VALUE = r"@[-\w:]+|text\(\)|\.|string\(\.?\)|normalize-space\((?:\.|text\(\)|@[-\w:]+)?\)"
+_XPATH_COMPARISON_RE = re.compile(rf"(?P<value>{_XPATH_VALUE})\s*(?P<operator>!?=)\s*{_XPATH_LITERAL}$")
+_XPATH_FUNCTION_RE = re.compile(rf"(?P<function>contains|starts-with)\(\s*(?P<value>{_XPATH_VALUE})\s*,\s*{_XPATH_LITERAL}\s*\)$")
+_XPATH_EXISTS_RE = re.compile(rf"(?P<value>{_XPATH_VALUE})$")
+
+
+def _split_top_level(text, separator):
+    """Splits on ``separator`` outside quotes, brackets and parentheses."""
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    position = 0
+    while position < len(text):
+        char = text[position]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif depth == 0 and text.startswith(separator, position):
+            parts.append(text[start:position])
+            start = position + len(separator)
+            position = start
+            continue
+        position += 1
+    parts.append(text[start:])
+    return parts
+
+
+def _parse_xpath_steps(path):
+    """Parses ``/a//b[...]`` into ``[(descendant, name, [predicate, ...]), ...]``."""
+    steps = []
+    position = 0
+    while position < len(path):
+        match = _XPATH_STEP_RE.match(path, position)
+        if not match:
+            raise UnsupportedSelector(f"unsupported XPath step at {path[position:position + 20]!r}")
+        position = match.end()
+        if path.startswith("::", position) or path.startswith("(", position):
+            raise UnsupportedSelector("XPath axes and node tests other than child elements are not supported")
+        predicates = []
+        while position < len(path) and path[position] == "[":
+            end = position + 1
+            depth = 1
+            quote = None
+            while end < len(path) and depth:
+                char = path[end]
+                if quote:
+                    quote = None if char == quote else quote
+                elif char in "'\"":
+                    quote = char
+                elif char == "[":
+                    depth += 1
+                elif char == "]":
+                    depth -= 1
+                end += 1
+            if depth:
+                raise UnsupportedSelector("unbalanced brackets")
+            predicates.append(path[position + 1:end - 1].strip())
+            position = end
+        name = match.group(2).lower()
+        if name in _OUTSIDE_BODY_TAGS:
+            raise UnsupportedSelector(f"<{name}> is outside the scraped <body>")
+        steps.append((match.group(1) == "//", name, predicates))
+    return steps
+
+
+def _descendants_or_self(nodes):
+    found = {}
+    for node in nodes:
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            found[current.order] = current
+            stack.extend(current.children)
+    return [found[order] for order in sorted(found)]
+
+
+def _xpath_values(element, expression):
+    """The candidate string values of ``expression`` (several for ``text()``), or None if absent."""
+    normalize = expression.startswith("normalize-space(")
+    inner = expression[len("normalize-space("):-1] if normalize else expression
+    if inner.startswith("@"):
+        value = element.attrs.get(inner[1:].lower())
+        values = None if value is None else [value]
+    elif inner == "text()":
+        # Compared stripped: whitespace around text nodes rarely reflects what the script meant
+        values = [chunk.strip() for chunk in element.text] or None
+    else: # ".", "", "string()", "string(.)"
+        values = [element.string_value()]
+    if values is not None and normalize:
+        values = [" ".join(value.split()) for value in values]
+    return values
+
+
+def _xpath_term(element, term):
+    term = term.strip()
+    if term.startswith("not(") and term.endswith(")") and _closing_paren(term, 4) == len(term) - 1:
+        return not _xpath_condition(element, term[4:-1])
+    match = _XPATH_FUNCTION_RE.match(term)
+    if match:
+        expected = match.group('squoted') if match.group('squoted') is not None else match.group('dquoted')
+        values = _xpath_values(element, match.group('value')) or []
+        if match.group('function') == "contains":
+            return any(expected in value for value in values)
+        return any(value.startswith(expected) for value in values)
+    match = _XPATH_COMPARISON_RE.match(term)
+    if match:
+        expected = match.group('squoted') if match.group('squoted') is not None else match.group('dquoted')
+        values = _xpath_values(element, match.group('value')) or []
+        if match.group('operator') == "=":
+            return any(value == expected for value in values)
+        return any(value != expected for value in values)
+    match = _XPATH_EXISTS_RE.match(term)
+    if match:
+        values = _xpath_values(element, match.group('value'))
+        return bool(values and any(values))
+    raise UnsupportedSelector(f"unsupported XPath predicate {term!r}")
+
+
+def _xpath_condition(element, condition):
+    return any(
+        all(_xpath_term(element, term) for term in _split_top_level(alternative, " and "))
+        for alternative in _split_top_level(condition, " or ")
+    )
+
+
+def _apply_predicate(candidates, predicate):
+    if predicate.isdigit():
+        index = int(predicate)
+        return [candidates[index - 1]] if 0 < index <= len(candidates) else []
+    if predicate == "last()":
+        return candidates[-1:]
+    return [element for element in candidates if _xpath_condition(element, predicate)]
+
+
+# --- Script analysis -------------------------------------------------------------------------
+
+def _normalize_url(url):
+    return (url or "").split("#", 1)[0].rstrip("/")
+
+
+def _fold_string(node, env):
+    """The value of a string expression built from literals and known names, or None."""
+    if isinstance(node, ast.Constant):
+        return node.value if isinstance(node.value, str) else None
+    if isinstance(node, ast.Name):
+        return env.get(node.id)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left, right = _fold_string(node.left, env), _fold_string(node.right, env)
+        return None if left is None or right is None else left + right
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.FormattedValue):
+                if value.conversion != -1 or value.format_spec is not None:
+                    return None
+                value = value.value
+            part = _fold_string(value, env)
+            if part is None:
+                return None
+            parts.append(part)
+        return "".join(parts)
+    return None
+
+
+def _by_strategy(node):
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "By":
+        return BY_STRATEGIES.get(node.attr)
+    return None
+
+
+def _is_driver(node):
+    if isinstance(node, ast.Name):
+        return "driver" in node.id.lower()
+    return isinstance(node, ast.Attribute) and "driver" in node.attr.lower()
+
+
+def _call_name(node):
+    func = node.func
+    return func.attr if isinstance(func, ast.Attribute) else getattr(func, 'id', "")
+
+
+class _LocatorScanner:
+    """Follows a test function (and the helpers it calls) in source order, tracking whether
+    the browser can still be on the scraped page when each locator is looked up."""
+
+    def __init__(self, tree, page_url):
+        self.page_url = _normalize_url(page_url)
+        self.functions = {
+            node.name: node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+        }
+        self.constants = {}
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                value = _fold_string(node.value, self.constants)
+                if value is not None:
+                    self.constants[node.targets[0].id] = value
+
+    def scan(self, function_name):
+        locators = []
+        self._scan_function(self.functions[function_name], dict(self.constants), "unknown", locators, (function_name,))
+        return locators
+
+    def _scan_function(self, function, env, state, locators, active):
+        parents = {}
+        for node in ast.walk(function):
+            for child in ast.iter_child_nodes(node):
+                parents[child] = node
+        events = []
+        for node in ast.walk(function):
+            if node is function:
+                continue
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+                continue
+            if isinstance(node, ast.Call):
+                events.append(((node.end_lineno, node.end_col_offset, 1), "call", node))
+                if len(node.args) >= 2 and _by_strategy(node.args[0]):
+                    events.append(((node.lineno, node.col_offset, 0), "locator", node))
+            elif isinstance(node, ast.Tuple) and len(node.elts) == 2 and _by_strategy(node.elts[0]):
+                events.append(((node.lineno, node.col_offset, 0), "locator", node))
+        events.sort(key=lambda event: event[0])
+
+        frame_state = None
+        for _, kind, node in events:
+            if kind == "locator":
+                self._record(node, parents, env, state, function.name, locators)
+                continue
+            name = _call_name(node)
+            func = node.func
+            if isinstance(func, ast.Attribute) and _is_driver(func.value):
+                if name == "get" and node.args:
+                    url = _fold_string(node.args[0], env)
+                    state = "page" if url is not None and _normalize_url(url) == self.page_url else "elsewhere"
+                elif name in ("back", "forward", "execute_script", "execute_async_script"):
+                    state = "elsewhere"
+            elif isinstance(func, ast.Attribute) and isinstance(func.value, ast.Attribute) and func.value.attr == "switch_to":
+                if name == "default_content":
+                    state, frame_state = (frame_state, None) if frame_state else (state, None)
+                else:
+                    frame_state = frame_state or state
+                    state = "elsewhere"
+            elif name in ("click", "submit", "perform"):
+                state = "elsewhere"
+            elif name == "send_keys" and any(self._submits(arg) for arg in node.args):
+                state = "elsewhere"
+            elif isinstance(func, ast.Name) and func.id in self.functions and func.id not in active:
+                helper = self.functions[func.id]
+                helper_env = dict(self.constants)
+                parameters = [arg.arg for arg in helper.args.posonlyargs + helper.args.args]
+                for parameter, arg in zip(parameters, node.args):
+                    value = _fold_string(arg, env)
+                    if value is not None:
+                        helper_env[parameter] = value
+                for keyword in node.keywords:
+                    value = _fold_string(keyword.value, env) if keyword.arg else None
+                    if value is not None:
+                        helper_env[keyword.arg] = value
+                state = self._scan_function(helper, helper_env, state, locators, active + (func.id,))
+        return state
+
+    @staticmethod
+    def _submits(node):
+        """Whether a send_keys argument presses Enter anywhere in it (e.g. ``"text" + Keys.ENTER``)."""
+        for part in ast.walk(node):
+            if isinstance(part, ast.Attribute) and part.attr in ("ENTER", "RETURN"):
+                return True
+            if isinstance(part, ast.Constant) and isinstance(part.value, str) and ("\n" in part.value or "\ue007" in part.value):
+                return True
+        return False
+
+    @staticmethod
+    def _catches_no_such_element(node, parents):
+        """Whether the lookup sits in a ``try`` that handles NoSuchElementException (an absence check)."""
+        child, ancestor = node, parents.get(node)
+        while ancestor is not None:
+            if isinstance(ancestor, ast.Try) and any(child is statement for statement in ancestor.body):
+                for handler in ancestor.handlers:
+                    if handler.type is not None and "NoSuchElementException" in ast.unparse(handler.type):
+                        return True
+            child, ancestor = ancestor, parents.get(ancestor)
+        return False
+
+    def _record(self, node, parents, env, state, function_name, locators):
+        strategy_node, value_node = (node.args[0], node.args[1]) if isinstance(node, ast.Call) else node.elts
+        value = _fold_string(value_node, env)
+        if value is None:
+            return # Built at run time; nothing to check
+        if isinstance(node, ast.Call):
+            expects_element = _call_name(node) != "find_elements" # An empty list is a valid answer
+        else:
+            parent = parents.get(node)
+            expects_element = not (
+                isinstance(parent, ast.Call) and any(word in _call_name(parent).lower() for word in _ABSENCE_WAITS)
+            )
+        if expects_element and self._catches_no_such_element(node, parents):
+            expects_element = False
+        locators.append({
+            'strategy': _by_strategy(strategy_node), 'value': value, 'line': node.lineno,
+            'defined_in': function_name, 'on_page': state == "page", 'expects_element': expects_element,
+        })
+
+
+def verify_selectors(script, html_source, page_url):
+    """Resolves every ``By.*`` locator in the script's test functions against a page snapshot.
+
+    Locators are checked only where the browser must still be on the scraped page: after a
+    ``driver.get`` of ``page_url`` and before anything that may navigate or re-render it
+    (clicks, submits, Enter keys, other URLs, frames, ``execute_script``). Each locator is
+    ``"found"``, ``"missing"`` (a lookup that would time out or raise NoSuchElementException)
+    or ``"unverified"`` with a ``reason``. Returns ``{'functions': {name: [locator, ...]},
+    'counts': {status: n}}``; the script must already compile (see preflight_utils).
+    """
+    tree = ast.parse(script)
+    index = get_dom_index(html_source)
+    scanner = _LocatorScanner(tree, page_url)
+    functions = {}
+    counts = {'found': 0, 'missing': 0, 'unverified': 0}
+    for name in scanner.functions:
+        if not name.startswith("test_"):
+            continue
+        checked = []
+        seen = set()
+        for locator in scanner.scan(name):
+            key = (locator['strategy'], locator['value'], locator['on_page'])
+            if key in seen:
+                continue
+            seen.add(key)
+            if not locator['on_page']:
+                status, reason = "unverified", "the page may have changed before this lookup"
+            else:
+                try:
+                    found = bool(index.find(locator['strategy'], locator['value']))
+                except UnsupportedSelector as e:
+                    status, reason = "unverified", str(e)
+                else:
+                    if found:
+                        status, reason = "found", ""
+                    elif not locator['expects_element']:
+                        status, reason = "unverified", "not on the scraped page, but the script may expect that"
+                    else:
+                        status, reason = "missing", "not on the scraped page"
+            checked.append(dict(locator, status=status, reason=reason))
+            counts[status] += 1
+        functions[name] = checked
+    return {'functions': functions, 'counts': counts}
+
+
+def missing_selectors(report):
+    """``{test function name: [missing locator, ...]}`` for the functions with dead selectors."""
+    missing = {}
+    for name, locators in report['functions'].items():
+        dead = [locator for locator in locators if locator['status'] == "missing"]
+        if dead:
+            missing[name] = dead
+    return missing
+
+
+def format_locator(locator):
+    strategy = next((name for name, value in BY_STRATEGIES.items() if value == locator['strategy']), locator['strategy'])
+    return f"By.{strategy} {locator['value']!r} (line {locator['line']})"
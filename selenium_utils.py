@@ -1,16 +1,41 @@
-import streamlit as st
+import atexit
+import functools
+import hashlib
+import json
+import logging
 import time
-import traceback
-import os
 import re
+import html
+import threading
+from contextlib import contextmanager
+from html.parser import HTMLParser
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
+from cache_utils import DiskCache, MemoryCache
+from metrics_utils import span
+from notes_utils import notify
+from config import (
+    HTML_DISTILL_TOKEN_BUDGET, SCRAPE_CACHE_TTL_SECONDS, SCRAPE_CACHE_DIR,
+    SCRAPE_CACHE_MEMORY_ENTRIES, SCRAPE_CACHE_MAX_ENTRIES, SCRAPE_CACHE_MAX_BYTES,
+    DRIVER_POOL_MAX_SIZE, DRIVER_POOL_WARM_SIZE, DRIVER_POOL_MAX_USES, DRIVER_POOL_ACQUIRE_TIMEOUT_SECONDS,
+    PAGE_READY_TIMEOUT_SECONDS, PAGE_READY_QUIET_MS, PAGE_READY_MAX_INFLIGHT_REQUESTS,
+)
 
-def setup_driver(headless_mode=True):
-    """Initializes and returns a Selenium WebDriver."""
-    st.write(f"Setting up WebDriver (Headless: {headless_mode})...")
+logger = logging.getLogger(__name__)
+
+_scrape_memory_cache = MemoryCache(SCRAPE_CACHE_MEMORY_ENTRIES)
+# Disk entries outlive the TTL so a longer ttl_seconds can still use them; freshness is checked per lookup
+_scrape_disk_cache = DiskCache(SCRAPE_CACHE_DIR, SCRAPE_CACHE_MAX_ENTRIES, SCRAPE_CACHE_MAX_BYTES, 24 * 60 * 60)
+
+@functools.lru_cache(maxsize=1)
+def resolve_driver_path():
+    """Resolves (and if needed downloads) the chromedriver binary once per process."""
+    return ChromeDriverManager().install()
+
+
+def _chrome_options(headless_mode):
     options = Options()
     if headless_mode:
         options.add_argument('--headless')
@@ -21,25 +46,290 @@ def setup_driver(headless_mode=True):
     options.add_argument("--window-size=1920,1080")
     options.add_argument('--log-level=3')
     options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    # DevTools network events for readiness detection (see wait_for_page_ready)
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
+def _create_driver(headless_mode=True):
+    """Starts a Chrome WebDriver, raising on failure."""
+    with span("driver_startup", headless=bool(headless_mode)):
+        service = Service(resolve_driver_path())
+        return webdriver.Chrome(service=service, options=_chrome_options(headless_mode))
+
+
+class DriverPool:
+    """Process-wide pool of pre-launched headless WebDrivers.
+
+    Drivers are health-checked on checkout, reset (cookies, storage, about:blank) on
+    return and recycled after ``max_uses`` checkouts or when they stop responding.
+    """
+
+    def __init__(self, max_size, warm_size, max_uses, acquire_timeout):
+        self.max_size = max(1, max_size)
+        self.warm_size = min(warm_size, self.max_size)
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+        self._idle = [] # [{'driver': ..., 'uses': int}]
+        self._total = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def warm(self):
+        """Launches ``warm_size`` idle drivers in the background."""
+        def launch():
+            try:
+                resolve_driver_path()
+            except Exception as e:
+                logger.warning("Could not resolve chromedriver while warming the pool: %s", e)
+                return
+            while True:
+                with self._condition:
+                    if self._closed or self._total >= self.warm_size:
+                        return
+                    self._total += 1
+                pooled = self._launch()
+                with self._condition:
+                    if pooled is None:
+                        return # _launch already released the slot
+                    self._idle.append(pooled)
+                    self._condition.notify()
+
+        threading.Thread(target=launch, name="driver-pool-warmup", daemon=True).start()
+
+    def _launch(self):
+        """Starts a driver for a slot already counted in _total; frees the slot on failure."""
+        try:
+            return {'driver': _create_driver(headless_mode=True), 'uses': 0}
+        except Exception as e:
+            logger.warning("Could not start a pooled WebDriver: %s", e)
+            with self._condition:
+                self._total -= 1
+                self._condition.notify()
+            return None
+
+    def _discard(self, pooled):
+        try:
+            pooled['driver'].quit()
+        except Exception:
+            pass
+        with self._condition:
+            self._total -= 1
+            self._condition.notify()
+
+    @staticmethod
+    def _is_healthy(pooled):
+        try:
+            return pooled['driver'].execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def acquire(self, timeout=None):
+        """Checks out a healthy driver, launching one if below max_size; raises TimeoutError."""
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        while True:
+            pooled = None
+            launch = False
+            with self._condition:
+                while not self._idle and self._total >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No WebDriver became available within the pool limit of {self.max_size}.")
+                    self._condition.wait(remaining)
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    self._total += 1
+                    launch = True
+
+            if launch:
+                pooled = self._launch()
+                if pooled is None:
+                    raise RuntimeError("Failed to start a WebDriver for the pool.")
+            elif not self._is_healthy(pooled):
+                logger.info("Discarding an unresponsive pooled WebDriver.")
+                self._discard(pooled)
+                continue
+
+            pooled['uses'] += 1
+            return pooled
+
+    def release(self, pooled):
+        """Returns a driver to the pool after resetting its state, or recycles it."""
+        if self._closed or pooled['uses'] >= self.max_uses or not self._reset(pooled['driver']):
+            self._discard(pooled)
+            return
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    @staticmethod
+    def _reset(driver):
+        """Clears cookies and web storage and parks the driver on about:blank."""
+        try:
+            try:
+                driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            except Exception:
+                driver.delete_all_cookies()
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except Exception:
+                pass # about:blank and some origins deny storage access
+            driver.set_window_size(1920, 1080)
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            logger.info("Could not reset pooled WebDriver, recycling it: %s", e)
+            return False
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """Context manager that borrows a driver and always gives it back."""
+        pooled = self.acquire(timeout)
+        try:
+            yield pooled['driver']
+        finally:
+            self.release(pooled)
+
+    def shutdown(self):
+        """Quits every idle driver; drivers still checked out are quit when returned."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._discard(pooled)
+
+    def stats(self):
+        with self._condition:
+            return {'idle': len(self._idle), 'total': self._total, 'max_size': self.max_size}
+
 
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """Returns the process-wide driver pool, creating and warming it on first use."""
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            _driver_pool = DriverPool(
+                DRIVER_POOL_MAX_SIZE, DRIVER_POOL_WARM_SIZE, DRIVER_POOL_MAX_USES,
+                DRIVER_POOL_ACQUIRE_TIMEOUT_SECONDS,
+            )
+            _driver_pool.warm()
+            atexit.register(_driver_pool.shutdown)
+        return _driver_pool
+
+_MUTATION_TRACKER_JS = """
+(function () {
+    window.__autotestLastMutation = performance.now();
+    new MutationObserver(function () { window.__autotestLastMutation = performance.now(); })
+        .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+})();
+"""
+_READINESS_PROBE_JS = """
+return [document.readyState,
+        window.__autotestLastMutation === undefined ? null : performance.now() - window.__autotestLastMutation];
+"""
+_REQUEST_STARTED_EVENTS = {'Network.requestWillBeSent'}
+_REQUEST_FINISHED_EVENTS = {'Network.loadingFinished', 'Network.loadingFailed'}
+
+
+def prepare_readiness_tracking(driver):
+    """Installs the DOM mutation tracker for future navigations and drains stale network events.
+
+    Call before ``driver.get``; returns False if the driver has no DevTools support.
+    """
+    supported = True
+    if not getattr(driver, '_readiness_tracker_installed', False):
+        try:
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': _MUTATION_TRACKER_JS})
+            driver._readiness_tracker_installed = True
+        except Exception:
+            supported = False
     try:
-        log_level = 'ERROR'
-        os_environ = os.environ.copy()
-        os_environ['WDM_LOG_LEVEL'] = log_level
-        os_environ['WDM_PRINT_FIRST_EXEC'] = 'False'
-
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        return driver
-    except ValueError as ve:
-         # Catch common error if Chrome is not installed or path is wrong
-         st.error(f"Error setting up WebDriver: {ve}")
-         st.error(traceback.format_exc())
-         return None
-    except Exception as e:
-        st.error(f"Error setting up WebDriver: {e}")
-        st.error(traceback.format_exc())
-        return None
+        driver.get_log('performance')
+    except Exception:
+        supported = False
+    return supported
+
+
+def _drain_network_events(driver, inflight):
+    """Updates the set of in-flight request IDs; returns whether any network event was seen."""
+    activity = False
+    for entry in driver.get_log('performance'):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError, TypeError):
+            continue
+        method = message.get('method', '')
+        if not method.startswith('Network.'):
+            continue
+        activity = True
+        request_id = message.get('params', {}).get('requestId')
+        if method in _REQUEST_STARTED_EVENTS:
+            inflight.add(request_id)
+        elif method in _REQUEST_FINISHED_EVENTS:
+            inflight.discard(request_id)
+    return activity
+
+
+def wait_for_page_ready(driver, timeout_seconds=None, quiet_ms=None, max_inflight=None, poll_interval=0.1):
+    """Waits until the page has settled instead of sleeping for a fixed time.
+
+    A page is settled once ``document.readyState`` is ``complete``, at most ``max_inflight``
+    requests have been outstanding with no network events for ``quiet_ms`` (from DevTools
+    performance logs), and the DOM has not mutated for ``quiet_ms``. Signals the driver
+    cannot provide are treated as satisfied. Gives up after ``timeout_seconds``.
+    Returns the milliseconds at which each condition was last met and ``settled_ms``.
+    """
+    timeout_seconds = PAGE_READY_TIMEOUT_SECONDS if timeout_seconds is None else timeout_seconds
+    quiet_ms = PAGE_READY_QUIET_MS if quiet_ms is None else quiet_ms
+    max_inflight = PAGE_READY_MAX_INFLIGHT_REQUESTS if max_inflight is None else max_inflight
+
+    started = time.monotonic()
+    last_network_activity = started
+    inflight = set()
+    network_tracking = True
+    timings = {'ready_state_ms': None, 'network_idle_ms': None, 'dom_quiet_ms': None}
+
+    while True:
+        now = time.monotonic()
+        elapsed_ms = (now - started) * 1000
+
+        try:
+            ready_state, ms_since_mutation = driver.execute_script(_READINESS_PROBE_JS)
+        except Exception:
+            ready_state, ms_since_mutation = None, None
+        ready = ready_state == 'complete'
+
+        if network_tracking:
+            try:
+                if _drain_network_events(driver, inflight):
+                    last_network_activity = now
+            except Exception:
+                network_tracking = False
+        network_idle = not network_tracking or (
+            len(inflight) <= max_inflight and (now - last_network_activity) * 1000 >= quiet_ms
+        )
+        dom_quiet = ms_since_mutation is None or ms_since_mutation >= quiet_ms
+
+        for key, condition in (('ready_state_ms', ready), ('network_idle_ms', network_idle), ('dom_quiet_ms', dom_quiet)):
+            if not condition:
+                timings[key] = None
+            elif timings[key] is None:
+                timings[key] = round(elapsed_ms)
+
+        settled = ready and network_idle and dom_quiet
+        if settled or elapsed_ms >= timeout_seconds * 1000:
+            timings['settled_ms'] = round(elapsed_ms)
+            timings['timed_out'] = not settled
+            timings['network_tracking'] = network_tracking
+            timings['inflight_requests'] = len(inflight)
+            return timings
+        time.sleep(poll_interval)
+
 
 def extract_body_content(html_source):
     """Extracts content within the <body> tags."""
@@ -49,33 +339,355 @@ def extract_body_content(html_source):
     else:
         return html_source
 
-def scrape_url(url):
-    """Fetches HTML content of a URL using Selenium."""
-    driver = None
-    html_content = None
+# Tags whose whole subtree carries nothing useful for choosing selectors
+_SKIPPED_TAGS = {'script', 'style', 'svg', 'noscript', 'template', 'canvas', 'head', 'iframe', 'object', 'math'}
+_VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+_INTERACTIVE_TAGS = {'a', 'button', 'input', 'select', 'textarea', 'option', 'label', 'form', 'summary', 'details', 'dialog'}
+_HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'title', 'legend', 'th', 'caption'}
+# Kept elements that own the text of their unkept descendants (e.g. <button><span>Login</span></button>)
+_TEXT_OWNER_TAGS = (_INTERACTIVE_TAGS | _HEADING_TAGS) - {'form', 'details', 'dialog'}
+_SELECTOR_ATTRIBUTES = {'id', 'name', 'type', 'value', 'placeholder', 'for', 'href', 'role', 'title', 'alt', 'class'}
+_MAX_ATTRIBUTE_LENGTH = 80
+_MAX_TEXT_LENGTH = 160
+_STOPWORDS = {'the', 'and', 'for', 'with', 'into', 'that', 'this', 'should', 'field', 'page', 'click', 'enter', 'user', 'then', 'from', 'are', 'is'}
+
+
+def _relevance_terms(text):
+    return {word for word in re.findall(r"[a-z0-9]{3,}", (text or "").lower()) if word not in _STOPWORDS}
+
+
+class _DistillNode:
+    __slots__ = ('tag', 'attrs', 'text', 'children', 'parent', 'score', 'index')
+
+    def __init__(self, tag, attrs, parent, index):
+        self.tag = tag
+        self.attrs = attrs
+        self.text = []
+        self.children = []
+        self.parent = parent
+        self.score = 0.0
+        self.index = index
+
+
+class _DistillParser(HTMLParser):
+    """Builds a tree of the elements worth keeping, dropping non-semantic markup."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _DistillNode('#root', [], None, -1)
+        self.nodes = []
+        self._stack = [] # (tag, kept node or None)
+        self._skip_depth = 0
+
+    def _current_node(self):
+        for _, node in reversed(self._stack):
+            if node is not None:
+                return node
+        return self.root
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_depth:
+            if tag not in _VOID_TAGS:
+                self._skip_depth += 1
+            return
+        if tag in _SKIPPED_TAGS:
+            if tag not in _VOID_TAGS:
+                self._skip_depth = 1
+            return
+
+        kept_attrs = []
+        for name, value in attrs:
+            if name in _SELECTOR_ATTRIBUTES or name.startswith('aria-') or name.startswith('data-test') or name == 'data-qa':
+                value = " ".join((value or "").split())
+                if len(value) > _MAX_ATTRIBUTE_LENGTH:
+                    value = value[:_MAX_ATTRIBUTE_LENGTH] + "..."
+                kept_attrs.append((name, value))
+
+        attribute_names = {name for name, _ in kept_attrs}
+        keep = (
+            tag in _INTERACTIVE_TAGS or tag in _HEADING_TAGS
+            or attribute_names & {'id', 'role', 'name'}
+            or any(name.startswith('aria-') or name.startswith('data-test') for name in attribute_names)
+        )
+        node = None
+        if keep:
+            parent = self._current_node()
+            node = _DistillNode(tag, kept_attrs, parent, len(self.nodes))
+            parent.children.append(node)
+            self.nodes.append(node)
+        if tag not in _VOID_TAGS:
+            self._stack.append((tag, node))
+
+    def handle_startendtag(self, tag, attrs):
+        if self._skip_depth or tag in _SKIPPED_TAGS:
+            return # Self-closing, so it neither opens nor closes a skipped region
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self._stack.pop()
+
+    def handle_endtag(self, tag):
+        if self._skip_depth:
+            if tag not in _VOID_TAGS:
+                self._skip_depth -= 1
+            return
+        # Tolerate unclosed tags by popping up to the matching opener
+        for position in range(len(self._stack) - 1, -1, -1):
+            if self._stack[position][0] == tag:
+                del self._stack[position:]
+                return
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        text = " ".join(data.split())
+        if not text:
+            return
+        parent = self._current_node()
+        if parent is self.root or (parent.tag not in _TEXT_OWNER_TAGS and self._stack and self._stack[-1][1] is None):
+            # Free-standing text (paragraphs, messages) becomes its own low-priority node
+            node = _DistillNode('#text', [], parent, len(self.nodes))
+            parent.children.append(node)
+            self.nodes.append(node)
+            parent = node
+        parent.text.append(text)
+
+
+def _render_open_tag(node):
+    if node.tag == '#text':
+        return ""
+    attributes = "".join(f' {name}="{html.escape(value, quote=True)}"' for name, value in node.attrs)
+    return f"<{node.tag}{attributes}>"
+
+
+def _node_text(node):
+    text = " ".join(node.text)
+    if len(text) > _MAX_TEXT_LENGTH:
+        text = text[:_MAX_TEXT_LENGTH] + "..."
+    return html.escape(text, quote=False)
+
+
+def _node_cost(node):
+    """Approximate token cost of a node's own lines (about 4 characters per token)."""
+    length = len(_render_open_tag(node)) + len(_node_text(node)) + len(node.tag) + 4
+    return length // 4 + 1
+
+
+def distill_html(html_source, relevance_text="", token_budget=None):
+    """Reduces page HTML to the interactive and selector-relevant parts that fit a token budget.
+
+    Scripts, styles, SVG and other non-semantic markup are removed, whitespace is collapsed
+    and kept elements carry only selector-relevant attributes (id, name, type, class, aria-*,
+    data-test*, ...). When the result exceeds ``token_budget``, elements are ranked by how
+    well they match ``relevance_text`` (e.g. the test case steps) and the lowest-ranked ones
+    are dropped.
+    """
+    if not html_source:
+        return ""
+    if token_budget is None:
+        token_budget = HTML_DISTILL_TOKEN_BUDGET
+
+    parser = _DistillParser()
     try:
-        driver = setup_driver(headless_mode=True)
-        if driver:
-            st.write(f"Navigating to {url} for scraping...")
-            driver.get(url)
-            time.sleep(5)
-            html_content = driver.page_source
-            html_content = extract_body_content(html_content)
-            if html_content:
-                print(f"Scraping complete. Got {len(html_content)} bytes of HTML.")
-            else:
-                st.warning("Scraping finished, but no HTML content retrieved.")
-            return html_content
+        parser.feed(html_source)
+        parser.close()
+    except Exception as e:
+        notify(f"HTML distillation failed ({e}); falling back to truncated HTML.", "warning")
+        return html_source[:token_budget * 4]
+
+    terms = _relevance_terms(relevance_text)
+    for node in parser.nodes:
+        if node.tag in _INTERACTIVE_TAGS:
+            base = 3.0
+        elif node.tag in _HEADING_TAGS:
+            base = 2.0
+        elif node.tag == '#text':
+            base = 0.5
         else:
-            st.error("Failed to initialize WebDriver for scraping.")
-            return None
+            base = 1.0
+        node_terms = _relevance_terms(" ".join(value for _, value in node.attrs) + " " + " ".join(node.text))
+        node.score = base + 2.0 * len(node_terms & terms)
+
+    # Greedily keep the best nodes (plus their ancestors for context) until the budget is spent
+    selected = set()
+    used_tokens = 0
+    for node in sorted(parser.nodes, key=lambda n: (-n.score, n.index)):
+        if node.index in selected:
+            continue
+        chain = []
+        current = node
+        while current is not None and current is not parser.root and current.index not in selected:
+            chain.append(current)
+            current = current.parent
+        cost = sum(_node_cost(member) for member in chain)
+        if used_tokens + cost > token_budget:
+            continue
+        used_tokens += cost
+        selected.update(member.index for member in chain)
+
+    lines = []
+
+    def render(node, depth):
+        indent = "  " * depth
+        kept_children = [child for child in node.children if child.index in selected]
+        open_tag = _render_open_tag(node)
+        text = _node_text(node)
+        if node.tag == '#text':
+            lines.append(f"{indent}{text}")
+        elif node.tag in _VOID_TAGS:
+            lines.append(f"{indent}{open_tag}")
+        elif not kept_children:
+            lines.append(f"{indent}{open_tag}{text}</{node.tag}>")
+        else:
+            lines.append(f"{indent}{open_tag}{text}")
+            for child in kept_children:
+                render(child, depth + 1)
+            lines.append(f"{indent}</{node.tag}>")
+
+    for child in parser.root.children:
+        if child.index in selected:
+            render(child, 0)
+
+    distilled = "\n".join(lines)
+    dropped = len(parser.nodes) - len(selected)
+    notify(f"Distilled {len(html_source)} bytes of HTML to {len(distilled)} bytes ({len(selected)} elements kept, {dropped} dropped by budget).")
+    return distilled
+
+
+def _scrape_cache_key(url, viewport=None, cookies=None):
+    key_material = json.dumps({'url': url, 'viewport': viewport, 'cookies': cookies}, sort_keys=True, default=str)
+    return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+
+def clear_scrape_cache():
+    """Empties both scrape cache tiers."""
+    _scrape_memory_cache.clear()
+    _scrape_disk_cache.clear()
+
+
+# Attributes that identify an element to a selector; values, text and links (which carry
+# nonces, CSRF tokens and timestamps) are left out of the structure hash
+_STRUCTURE_ATTRIBUTES = {'id', 'name', 'type', 'for', 'role', 'class'}
+
+
+def structure_hash(html_source):
+    """Returns a sha256 of the page's element structure, stable across re-scrapes of the same DOM.
+
+    Hashes the distilled element tree (tags, nesting, ids, names, types, classes, roles and
+    data-test attributes, so forms and their fields count) without text or attribute values
+    like ``value``/``href`` that change on every load.
+    """
+    parser = _DistillParser()
+    try:
+        parser.feed(html_source or "")
+        parser.close()
     except Exception as e:
-        st.error(f"Error scraping URL {url}: {e}")
-        st.error(traceback.format_exc())
+        notify(f"Structure hashing failed ({e}); hashing the raw HTML instead.", "warning")
+        return hashlib.sha256((html_source or "").encode('utf-8')).hexdigest()
+
+    lines = []
+
+    def walk(node, depth):
+        if node.tag != '#text':
+            attributes = []
+            for name, value in node.attrs:
+                if name == 'class':
+                    value = " ".join(sorted(set(value.split())))
+                if name in _STRUCTURE_ATTRIBUTES or name.startswith('data-test') or name == 'data-qa':
+                    attributes.append(f"{name}={value}")
+            lines.append(f"{depth} {node.tag} {' '.join(sorted(attributes))}")
+        for child in node.children:
+            walk(child, depth + 1)
+
+    for child in parser.root.children:
+        walk(child, 0)
+    return hashlib.sha256("\n".join(lines).encode('utf-8')).hexdigest()
+
+
+def _load_page(url, viewport=None, cookies=None):
+    """Loads a page in a pooled WebDriver and waits for it to settle.
+
+    Returns ``(html, readiness_timings)``, or ``(None, None)`` on failure.
+    """
+    try:
+        with get_driver_pool().driver() as driver:
+            if viewport:
+                driver.set_window_size(*viewport)
+            with span("page_load") as labels:
+                prepare_readiness_tracking(driver)
+                notify(f"Navigating to {url} for scraping...")
+                driver.get(url)
+                if cookies:
+                    for cookie in cookies:
+                        driver.add_cookie(cookie)
+                    prepare_readiness_tracking(driver)
+                    driver.get(url)
+                readiness = wait_for_page_ready(driver)
+                if readiness['timed_out']:
+                    labels['outcome'] = "timed_out"
+                html_content = extract_body_content(driver.page_source)
+        if readiness['timed_out']:
+            notify(f"Page timed out after {readiness['settled_ms']} ms: {readiness}", "warning")
+        else:
+            notify(f"Page settled after {readiness['settled_ms']} ms: {readiness}")
+        if html_content:
+            notify(f"Scraping complete. Got {len(html_content)} bytes of HTML.")
+        else:
+            notify("Scraping finished, but no HTML content retrieved.", "warning")
+        return html_content, readiness
+    except TimeoutError as e:
+        notify(f"Failed to get a WebDriver for scraping: {e}", "error")
+        return None, None
+    except Exception as e:
+        notify(f"Error scraping URL {url}: {e}", "error")
+        logger.exception("Scraping %s failed", url)
+        return None, None
+
+
+def fetch_page(url, force_refresh=False, viewport=None, cookies=None, ttl_seconds=None):
+    """Returns the scraped page as a dict, serving it from the scrape cache while fresh.
+
+    The dict has ``html``, ``content_hash`` (sha256 of the HTML), ``structure_hash`` (see
+    ``structure_hash``, so callers can tell when the DOM actually changed), ``fetched_at``, ``readiness`` (see ``wait_for_page_ready``) and
+    ``from_cache``. Lookups go memory tier, then
+    disk tier, then a live browser load. ``force_refresh`` skips both tiers.
+    Returns None if the page could not be scraped.
+    """
+    ttl = SCRAPE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+    cache_key = _scrape_cache_key(url, viewport, cookies)
+
+    if not force_refresh and ttl > 0:
+        page = _scrape_memory_cache.get(cache_key, ttl)
+        if page is None:
+            page = _scrape_disk_cache.get(cache_key, ttl)
+            if page is not None:
+                _scrape_memory_cache.put(cache_key, page, created=page['fetched_at'])
+        if page is not None:
+            if 'structure_hash' not in page: # Cached before structure hashes were recorded
+                page = dict(page, structure_hash=structure_hash(page['html']))
+            notify(f"Scrape cache hit for {url} (fetched {time.time() - page['fetched_at']:.0f}s ago).")
+            return dict(page, from_cache=True)
+
+    html_content, readiness = _load_page(url, viewport, cookies)
+    if html_content is None:
         return None
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except Exception as e_quit:
-                 st.warning(f"Error closing WebDriver after scraping: {e_quit}")
\ No newline at end of file
+    page = {
+        'url': url,
+        'html': html_content,
+        'content_hash': hashlib.sha256(html_content.encode('utf-8')).hexdigest(),
+        'structure_hash': structure_hash(html_content),
+        'fetched_at': time.time(),
+        'readiness': readiness,
+    }
+    if html_content:
+        _scrape_memory_cache.put(cache_key, page, created=page['fetched_at'])
+        _scrape_disk_cache.put(cache_key, page)
+    return dict(page, from_cache=False)
+
+
+def cached_page(url, viewport=None, cookies=None):
+    """The latest snapshot of ``url`` in the scrape cache regardless of age, or None; never opens a browser."""
+    cache_key = _scrape_cache_key(url, viewport, cookies)
+    page = _scrape_memory_cache.get(cache_key, float('inf'))
+    if page is None:
+        page = _scrape_disk_cache.get(cache_key)
+    return dict(page, from_cache=True) if page else None
@@ -0,0 +1,226 @@
+import functools
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# Text fields every test case has and their defaults, in serialization order (before the lists)
+_TEXT_DEFAULTS = {'description': 'N/A', 'test_type': 'Functional', 'expected_outcome': 'N/A'}
+_CORE_FIELDS = ('id', 'description', 'test_type', 'expected_outcome', 'preconditions', 'steps')
+# Editor columns holding a list field as one item per line
+_EDIT_COLUMNS = {'preconditions_edit': 'preconditions', 'steps_edit': 'steps'}
+
+_VIEW_CACHE_SIZE = 16
+
+
+def _lines(text):
+    return tuple(line.strip() for line in str(text).split("\n") if line.strip())
+
+
+def _joined(value):
+    """Editor text for a list field; anything but a list is shown empty."""
+    return "\n".join(str(item) for item in value) if isinstance(value, list) else ""
+
+
+class TestCase:
+    """One test case as an immutable, slotted record.
+
+    ``preconditions`` and ``steps`` are tuples and ``extra`` holds any further fields as
+    ``(key, value)`` pairs. ``edited`` returns a new record that shares every value it did not
+    change, and the record's JSON and content hash are computed at most once.
+    """
+
+    __slots__ = ('id', 'description', 'test_type', 'expected_outcome', 'preconditions', 'steps', 'extra', '_json', '_hash')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TestCase records are immutable; use edited() for a changed copy")
+
+    @classmethod
+    def from_editor_row(cls, row, position):
+        """Converts a data editor row; ``position`` (1-based) numbers the ID of a row without one."""
+        preconditions = row.get('preconditions_edit', '')
+        steps = row.get('steps_edit', '')
+        return cls(
+            id=str(row.get('id', f"TC_AutoGen_ID_{position}")),
+            **{name: str(row.get(name, default)) for name, default in _TEXT_DEFAULTS.items()},
+            preconditions=_lines(preconditions),
+            steps=_lines(steps),
+            extra=tuple((key, value) for key, value in row.items() if key not in _CORE_FIELDS and not key.endswith('_edit')),
+        )
+
+    @classmethod
+    def from_test_case(cls, test_case, position):
+        """Converts a generated test case dict the same way as its unedited editor row."""
+        return cls.from_editor_row(dict(
+            test_case,
+            preconditions_edit=_joined(test_case.get('preconditions', [])),
+            steps_edit=_joined(test_case.get('steps', [])),
+        ), position)
+
+    def edited(self, changes):
+        """A new record with a data editor row's ``changes`` (column -> value) applied."""
+        fields = {name: getattr(self, name) for name in _CORE_FIELDS}
+        extra = dict(self.extra)
+        for column, value in changes.items():
+            if column in _EDIT_COLUMNS:
+                fields[_EDIT_COLUMNS[column]] = _lines(value)
+            elif column == 'id' or column in _TEXT_DEFAULTS:
+                fields[column] = str(value)
+            elif column not in _CORE_FIELDS and not column.endswith('_edit'):
+                extra[column] = value
+        return TestCase(extra=tuple(extra.items()), **fields)
+
+    def to_dict(self):
+        """The test case as script generation expects it (a fresh dict)."""
+        test_case = {'id': self.id}
+        for name in _TEXT_DEFAULTS:
+            test_case[name] = getattr(self, name)
+        test_case['preconditions'] = list(self.preconditions)
+        test_case['steps'] = list(self.steps)
+        test_case.update(self.extra)
+        return test_case
+
+    def editor_row(self):
+        row = {
+            'id': self.id, 'description': self.description,
+            'preconditions_edit': "\n".join(self.preconditions), 'steps_edit': "\n".join(self.steps),
+            'expected_outcome': self.expected_outcome, 'test_type': self.test_type,
+        }
+        row.update(self.extra)
+        return row
+
+    def to_json(self):
+        """``json.dumps(self.to_dict(), indent=4)``, serialized once. Raises TypeError for unserializable extras."""
+        if self._json is None:
+            object.__setattr__(self, '_json', json.dumps(self.to_dict(), indent=4))
+        return self._json
+
+    def content_hash(self):
+        if self._hash is None:
+            material = json.dumps(self.to_dict(), sort_keys=True, default=str)
+            object.__setattr__(self, '_hash', hashlib.sha256(material.encode('utf-8')).hexdigest())
+        return self._hash
+
+
+_view_cache = OrderedDict()
+_view_cache_lock = threading.Lock()
+
+
+def _memoized_view(kind, digest, build):
+    """Returns the ``kind`` view of the suite with content hash ``digest``, building it on a miss."""
+    key = (kind, digest)
+    with _view_cache_lock:
+        if key in _view_cache:
+            _view_cache.move_to_end(key)
+            return _view_cache[key]
+    value = build()
+    with _view_cache_lock:
+        _view_cache[key] = value
+        while len(_view_cache) > _VIEW_CACHE_SIZE:
+            _view_cache.popitem(last=False)
+    return value
+
+
+class TestCaseSet:
+    """An ordered, immutable suite of TestCase records.
+
+    Versions made by ``apply_editor_deltas`` share the records of untouched rows, so only the
+    rows that changed are converted or serialized again. The editor rows and JSON are
+    memoized by ``content_hash``.
+    """
+
+    __slots__ = ('records', '_hash')
+
+    def __init__(self, records):
+        self.records = tuple(records)
+        self._hash = None
+
+    @classmethod
+    def from_test_cases(cls, test_cases):
+        records = []
+        for test_case in test_cases:
+            if isinstance(test_case, dict):
+                records.append(TestCase.from_test_case(test_case, len(records) + 1))
+        return cls(records)
+
+    @classmethod
+    def from_editor_rows(cls, rows):
+        records = []
+        for row in rows:
+            if isinstance(row, dict):
+                records.append(TestCase.from_editor_row(row, len(records) + 1))
+        return cls(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def content_hash(self):
+        if self._hash is None:
+            material = "\n".join(record.content_hash() for record in self.records)
+            self._hash = hashlib.sha256(material.encode('utf-8')).hexdigest()
+        return self._hash
+
+    def to_dicts(self):
+        return [record.to_dict() for record in self.records]
+
+    def editor_rows(self):
+        """The ``st.data_editor`` rows, as fresh copies of the memoized view.
+
+        The view is shared by every suite (in any session) with the same content, so callers
+        get their own list and row dicts to hand to the editor or change.
+        """
+        rows = _memoized_view("editor", self.content_hash(), lambda: [record.editor_row() for record in self.records])
+        return [dict(row) for row in rows]
+
+    def to_json(self):
+        """Same text as ``json.dumps(self.to_dicts(), indent=4)``, joined from each record's cached JSON."""
+        def build():
+            if not self.records:
+                return "[]"
+            body = ",\n".join(record.to_json() for record in self.records)
+            return "[\n" + "\n".join("    " + line for line in body.split("\n")) + "\n]"
+        return _memoized_view("json", self.content_hash(), build)
+
+
+def apply_editor_deltas(test_cases, deltas):
+    """Applies ``st.data_editor`` deltas (``edited_rows``, ``deleted_rows``, ``added_rows``) to a TestCaseSet.
+
+    Only edited and added rows are converted; every other record is reused, and a suite with
+    no deltas is returned unchanged so its memoized views still apply.
+    """
+    edited = {int(index): changes for index, changes in (deltas.get("edited_rows") or {}).items() if isinstance(changes, dict)}
+    deleted = {int(index) for index in deltas.get("deleted_rows") or []}
+    added = [row for row in deltas.get("added_rows") or [] if isinstance(row, dict)]
+    if not edited and not deleted and not added:
+        return test_cases
+
+    records = list(test_cases.records)
+    for index, changes in edited.items():
+        if 0 <= index < len(records):
+            records[index] = records[index].edited(changes)
+    if deleted:
+        records = [record for index, record in enumerate(records) if index not in deleted]
+    for row in added:
+        records.append(TestCase.from_editor_row(row, len(records) + 1))
+    return TestCaseSet(records)
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_json(text):
+    return json.loads(text)
+
+
+def load_test_cases_json(text):
+    """Parses a test case JSON string, reusing the parse while the string is unchanged.
+
+    Returns a fresh list of shallow copies, or None if ``text`` is not valid JSON.
+    """
+    try:
+        value = _parse_json(text or "[]")
+    except (TypeError, ValueError):
+        return None
+    return [dict(item) if isinstance(item, dict) else item for item in value] if isinstance(value, list) else value
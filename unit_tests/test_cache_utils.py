@@ -0,0 +1,102 @@
+import builtins
+import json
+import os
+import time
+
+from cache_utils import DiskCache
+
+
+def make_cache(tmp_path, max_entries=10, max_bytes=10**6, max_age_seconds=100):
+    return DiskCache(str(tmp_path), max_entries, max_bytes, max_age_seconds)
+
+
+def age(tmp_path, key, seconds):
+    """Moves an entry's stored ``created`` time back while leaving its mtime fresh."""
+    path = tmp_path / f"{key}.json"
+    entry = json.loads(path.read_text())
+    entry['created'] -= seconds
+    path.write_text(json.dumps(entry))
+
+
+def keys(tmp_path):
+    return sorted(name[:-5] for name in os.listdir(tmp_path) if name.endswith(".json"))
+
+
+def test_round_trip_and_max_age(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("a", {'x': 1})
+    assert cache.get("a") == {'x': 1}
+    assert cache.get("a", max_age_seconds=-1) is None # Too old for this lookup, kept for others
+    assert keys(tmp_path) == ["a"]
+    assert cache.get("missing") is None
+
+
+def test_expiry_uses_created_even_after_hits(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("a", 1)
+    age(tmp_path, "a", 1000)
+    assert cache.get("a") is None
+    assert keys(tmp_path) == []
+
+
+def test_eviction_expires_by_created_when_over_budget(tmp_path):
+    make_cache(tmp_path).put("old", 1)
+    age(tmp_path, "old", 1000)
+    os.utime(tmp_path / "old.json", None) # A recent hit does not make it younger
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put("b", 2)
+    assert keys(tmp_path) == ["b", "old"] # Within budget: nothing is evicted
+    cache.put("c", 3)
+    assert keys(tmp_path) == ["b", "c"]
+
+
+def test_least_recently_used_is_evicted_first(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put("a", 1)
+    time.sleep(0.01)
+    cache.put("b", 2)
+    time.sleep(0.01)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert keys(tmp_path) == ["a", "c"]
+    assert cache.stats()['evictions'] == 1
+
+
+def test_size_limit(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=250)
+    for key in "abcde":
+        cache.put(key, "x" * 60)
+        time.sleep(0.01)
+    assert keys(tmp_path) == ["d", "e"]
+
+
+def test_put_reads_no_other_entries(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, max_entries=100)
+    for index in range(20):
+        cache.put(f"k{index}", index)
+    opened = []
+    real_open = builtins.open
+    monkeypatch.setattr(builtins, "open", lambda path, *args, **kwargs: opened.append(str(path)) or real_open(path, *args, **kwargs))
+    monkeypatch.setattr(os, "listdir", lambda path: (_ for _ in ()).throw(AssertionError("listed the cache directory")))
+    cache.put("new", 1)
+    assert opened == [str(tmp_path / "new.json.tmp")]
+
+
+def test_index_is_rebuilt_from_an_existing_directory(tmp_path):
+    first = make_cache(tmp_path)
+    first.put("a", 1)
+    time.sleep(0.01)
+    first.put("b", 2)
+    (tmp_path / "broken.json").write_text("not json")
+    second = make_cache(tmp_path, max_entries=2)
+    second.put("c", 3)
+    assert keys(tmp_path) == ["b", "c"]
+
+
+def test_clear(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("a", 1)
+    cache.clear()
+    assert keys(tmp_path) == []
+    cache.put("b", 2)
+    assert cache.get("b") == 2
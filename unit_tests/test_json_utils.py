@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+import json_utils
+
+
+def _stream(text, chunk_size):
+    """Feeds ``text`` to a fresh TestCaseStreamParser in chunks; returns (objects, parser)."""
+    parser = json_utils.TestCaseStreamParser()
+    objects = []
+    for start in range(0, len(text), chunk_size):
+        objects.extend(parser.feed(text[start:start + chunk_size]))
+    objects.extend(parser.close())
+    return objects, parser
+
+
+def test_clean_array():
+    text = '[{"id": "TC1", "steps": ["a", "b"]}, {"id": "TC2", "negative": false}]'
+    assert json_utils.extract_json_objects(text) == (json.loads(text), [])
+
+
+def test_fenced_array_with_prose():
+    text = 'Here are the test cases:\n```json\n[{"id": "TC1"}]\n```\nLet me know.'
+    assert json_utils.extract_json_objects(text) == ([{'id': "TC1"}], [])
+
+
+def test_trailing_commas_are_dropped():
+    text = '[{"id": "TC1", "steps": ["a", "b",],}, {"id": "TC2",},]'
+    objects, errors = json_utils.extract_json_objects(text)
+    assert objects == [{'id': "TC1", 'steps': ["a", "b"]}, {'id': "TC2"}]
+    assert errors == []
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('{"id": "TC1", "steps": ["Click "Login" button", "Then go"]}', {'id': "TC1", 'steps': ['Click "Login" button', "Then go"]}),
+    ('{"id": "TC1", "expected_outcome": "Shows "Welcome" message"}', {'id': "TC1", 'expected_outcome': 'Shows "Welcome" message'}),
+])
+def test_unescaped_inner_quotes_are_kept(raw, expected):
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(raw) # The legacy json.loads pipeline lost the whole response here
+    assert json_utils.extract_json_objects(f"[{raw}]") == ([expected], [])
+
+
+def test_python_literals_and_single_quotes():
+    objects, errors = json_utils.extract_json_objects("[{'id': 'TC1', 'negative': True, 'note': None}]")
+    assert objects == [{'id': "TC1", 'negative': True, 'note': None}]
+    assert errors == []
+
+
+def test_numbered_pseudo_keys_are_dropped():
+    objects, _ = json_utils.extract_json_objects('[1: {"id": "TC1"}, 2: {"id": "TC2"}]')
+    assert objects == [{'id': "TC1"}, {'id': "TC2"}]
+
+
+def test_malformed_object_only_loses_itself():
+    objects, errors = json_utils.extract_json_objects('[{"id": "TC1"}, {"id": TC2 oops: }, {"id": "TC3"}]')
+    assert objects == [{'id': "TC1"}, {'id': "TC3"}]
+    assert len(errors) == 1 and errors[0].startswith("Skipped malformed JSON object at character 16")
+
+
+def test_truncated_final_object_is_reported():
+    objects, errors = json_utils.extract_json_objects('[{"id": "TC1"}, {"id": "TC2", "steps": ["a"')
+    assert objects == [{'id': "TC1"}]
+    assert errors == ["Truncated JSON object at character 16 was ignored."]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1000])
+def test_stream_objects_split_across_chunks(chunk_size):
+    text = '```json\n[{"id": "TC1", "steps": ["Click "Go" now", "b",]}, {"id": "TC2", "note": "{not a brace}"}]\n```'
+    objects, parser = _stream(text, chunk_size)
+    assert objects == [{'id': "TC1", 'steps': ['Click "Go" now', "b"]}, {'id': "TC2", 'note': "{not a brace}"}]
+    assert parser.errors == []
+
+
+def test_stream_yields_each_object_as_soon_as_it_closes():
+    parser = json_utils.TestCaseStreamParser()
+    assert parser.feed('[{"id": "TC1"') == []
+    assert parser.feed('}, {"id": ') == [{'id': "TC1"}]
+    assert parser.feed('"TC2"}]') == [{'id': "TC2"}]
+    assert parser.close() == []
+
+
+def test_stream_truncated_final_object_is_reported_on_close():
+    parser = json_utils.TestCaseStreamParser()
+    assert parser.feed('[{"id": "TC1"}, {"id": "TC2", "steps": ["a"') == [{'id': "TC1"}]
+    assert parser.errors == []
+    assert parser.close() == []
+    assert parser.errors == ["Truncated JSON object at character 0 was ignored."]
@@ -0,0 +1,121 @@
+import pytest
+
+from execution_utils import _LiveResults, merge_worker_outputs
+from reporting_utils import ResultStreamParser, merge_rerun, parse_execution_output
+
+
+def block(test_id, status, message="ok"):
+    return (
+        "TEST_RESULT_START\n"
+        f"ID: {test_id}\n"
+        f"DESCRIPTION: checks {test_id}\n"
+        f"STATUS: {status}\n"
+        f"MESSAGE: {message}\n"
+        "TEST_RESULT_END\n"
+    )
+
+
+def result(test_id, status, message="ok"):
+    return {'id': test_id, 'description': f"checks {test_id}", 'status': status, 'message': message}
+
+
+def run(stdout, exit_code=0, stderr=""):
+    return {'stdout': stdout, 'stderr': stderr, 'exit_code': exit_code, 'parsed': parse_execution_output(stdout)}
+
+
+def test_parses_blocks_around_chatter_and_summary():
+    stdout = "Setting up...\n" + block("TC1", "PASS") + "driver log\n" + block("TC2", "FAIL", "boom\n  at line 3")
+    stdout += "EXECUTION SUMMARY: Passed: 1, Failed: 1, Errored: 0\n"
+    parsed = parse_execution_output(stdout)
+    assert parsed.results == [result("TC1", "PASS"), result("TC2", "FAIL", "boom\n  at line 3")]
+    assert parsed.summary == {'passed': 1, 'failed': 1, 'errored': 0}
+    assert parsed.problems == []
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 16, 10_000])
+def test_partial_lines_across_chunk_boundaries(chunk_size):
+    stdout = block("TC1", "PASS") + "noise TEST_RESULT_ in prose\n" + block("TC2", "ERROR", "timeout")
+    parser = ResultStreamParser()
+    completed = []
+    for start in range(0, len(stdout), chunk_size):
+        completed.extend(parser.feed(stdout[start:start + chunk_size]))
+    completed.extend(parser.close())
+    assert completed == [result("TC1", "PASS"), result("TC2", "ERROR", "timeout")]
+    assert parser.problems == []
+
+
+def test_result_is_reported_when_its_end_line_arrives():
+    parser = ResultStreamParser()
+    text = block("TC1", "PASS")
+    assert parser.feed(text[:-4]) == []
+    assert parser.feed(text[-4:]) == [result("TC1", "PASS")]
+
+
+def test_unterminated_block_is_an_error_not_a_pass():
+    parsed = parse_execution_output(block("TC1", "PASS").replace("TEST_RESULT_END\n", "") + block("TC2", "FAIL"))
+    assert [(r['id'], r['status']) for r in parsed.results] == [("TC1", "ERROR"), ("TC2", "FAIL")]
+    assert len(parsed.problems) == 1 and "unterminated" in parsed.problems[0]
+
+
+def test_duplicate_test_ids_are_all_kept():
+    parsed = parse_execution_output(block("TC1", "PASS") + block("TC1", "FAIL", "boom"))
+    assert parsed.results == [result("TC1", "PASS"), result("TC1", "FAIL", "boom")]
+
+
+def test_interleaved_worker_output_is_parsed_per_worker():
+    workers = [
+        (block("TC1", "PASS") + block("TC3", "FAIL")).splitlines(keepends=True),
+        (block("TC2", "ERROR") + block("TC4", "PASS")).splitlines(keepends=True),
+    ]
+    reported = []
+    live = _LiveResults(reported.append)
+    for line_pair in zip(*workers): # Worker lines alternate the way the reader threads deliver them
+        for worker, line in enumerate(line_pair):
+            live.feed(worker, line)
+    assert [(r['id'], r['status']) for r in reported] == [("TC1", "PASS"), ("TC2", "ERROR"), ("TC3", "FAIL"), ("TC4", "PASS")]
+
+
+def test_merge_worker_outputs_reports_tests_a_crashed_worker_never_ran():
+    outputs = [
+        (block("TC1", "PASS") + "EXECUTION SUMMARY: Passed: 1, Failed: 0, Errored: 0\n", "", 0, []),
+        ("", "Traceback: no browser", 1, []),
+    ]
+    stdout, stderr, exit_code, records = merge_worker_outputs(outputs, [[{'id': "TC1"}], [{'id': "TC2", 'description': "d"}]])
+    parsed = parse_execution_output(stdout)
+    assert [(r['id'], r['status']) for r in parsed.results] == [("TC1", "PASS"), ("TC2", "ERROR")]
+    assert parsed.summary == {'passed': 1, 'failed': 0, 'errored': 1}
+    assert stdout.count("EXECUTION SUMMARY") == 1
+    assert exit_code == 1
+    assert "Worker 2 (exit code 1)" in stderr
+    assert records == [{'id': "TC2", 'description': "d", 'status': "ERROR", 'message': "Worker 2 exited with code 1 before reporting this test."}]
+
+
+def test_rerun_overrides_earlier_fail_and_error_rows():
+    previous = run(block("TC1", "PASS") + block("TC2", "FAIL", "boom") + block("TC3", "ERROR", "timeout"), exit_code=1)
+    rerun = run(block("TC3", "PASS") + block("TC2", "PASS"))
+    merged = merge_rerun(previous, rerun)
+    assert merged['parsed'].results == [
+        result("TC1", "PASS"), dict(result("TC2", "PASS"), rerun=True), dict(result("TC3", "PASS"), rerun=True),
+    ]
+    assert merged['parsed'].summary == {'passed': 3, 'failed': 0, 'errored': 0}
+    assert merged['exit_code'] == 0
+    assert "--- Rerun of 2 failed/errored test(s) ---" in merged['stdout']
+
+
+def test_rerun_still_failing_keeps_the_run_failed():
+    merged = merge_rerun(run(block("TC1", "PASS") + block("TC2", "FAIL"), exit_code=1), run(block("TC2", "ERROR", "again"), exit_code=1))
+    assert [(r['id'], r['status']) for r in merged['parsed'].results] == [("TC1", "PASS"), ("TC2", "ERROR")]
+    assert merged['exit_code'] == 1
+
+
+def test_rerun_replaces_every_earlier_row_of_a_duplicate_id():
+    previous = run(block("TC1", "FAIL", "first") + block("TC2", "PASS") + block("TC1", "ERROR", "second"), exit_code=1)
+    merged = merge_rerun(previous, run(block("TC1", "PASS")))
+    assert merged['parsed'].results == [dict(result("TC1", "PASS"), rerun=True), result("TC2", "PASS")]
+    assert merged['exit_code'] == 0
+
+
+def test_rerun_timeout_keeps_its_exit_code():
+    merged = merge_rerun(run(block("TC1", "FAIL"), exit_code=1), run("", exit_code=143))
+    assert merged['parsed'].results == [result("TC1", "FAIL")]
+    assert merged['exit_code'] == 143
@@ -0,0 +1,188 @@
+import textwrap
+
+import pytest
+
+from selector_utils import DomIndex, UnsupportedSelector, missing_selectors, verify_selectors
+
+PAGE_URL = "https://example.test/login"
+
+HTML = """
+<header><h1 id="title" class="brand main">Sign in</h1></header>
+<form id="login" class="card" action="/session">
+  <label for="user">Username</label>
+  <input id="user" name="username" type="text" class="field required" placeholder="Email">
+  <input id="pass" name="password" type="password" class="field" data-test="pw" lang="en-US">
+  <input id="remember" type="checkbox" checked>
+  <button id="submit" type="submit" disabled>Log <b>in</b></button>
+  <p class="hint"></p>
+</form>
+<ul id="links">
+  <li><a id="help" href="/help">  Need   help? </a></li>
+  <li><a id="reset" href="/reset">Reset password</a></li>
+  <li><span id="note">Only <em>text</em></span></li>
+</ul>
+<script>var x = "<a id='fake'>not an element</a>";</script>
+"""
+
+
+@pytest.fixture(scope="module")
+def index():
+    return DomIndex(HTML)
+
+
+def ids(elements):
+    return [element.attrs.get('id') or element.tag for element in elements]
+
+
+@pytest.mark.parametrize("strategy, value, expected", [
+    ("id", "user", ["user"]),
+    ("id", "nope", []),
+    ("name", "password", ["pass"]),
+    ("class name", "field", ["user", "pass"]),
+    ("tag name", "BUTTON", ["submit"]),
+    ("link text", "Need help?", ["help"]),
+    ("link text", "Need", []),
+    ("partial link text", "password", ["reset"]),
+    # CSS: simple selectors and compounds
+    ("css selector", "#login", ["login"]),
+    ("css selector", "input.field.required", ["user"]),
+    ("css selector", "*[data-test]", ["pass"]),
+    ("css selector", "h1.brand", ["title"]),
+    # CSS: attribute operators
+    ("css selector", "input[type='password']", ["pass"]),
+    ("css selector", 'input[placeholder="email" i]', ["user"]),
+    ("css selector", "[class~=required]", ["user"]),
+    ("css selector", "[lang|=en]", ["pass"]),
+    ("css selector", "a[href^='/re']", ["reset"]),
+    ("css selector", "a[href$=help]", ["help"]),
+    ("css selector", "a[href*=ese]", ["reset"]),
+    ("css selector", "a[href^='']", []),
+    # CSS: combinators and groups
+    ("css selector", "form input", ["user", "pass", "remember"]),
+    ("css selector", "ul > li > a", ["help", "reset"]),
+    ("css selector", "form > b", []),
+    ("css selector", "label + input", ["user"]),
+    ("css selector", "#user ~ input", ["pass", "remember"]),
+    ("css selector", "#help, #reset", ["help", "reset"]),
+    # CSS: pseudo-classes
+    ("css selector", "li:first-child a", ["help"]),
+    ("css selector", "li:last-child span", ["note"]),
+    ("css selector", "input:nth-of-type(2)", ["pass"]),
+    ("css selector", "li:nth-child(2) a", ["reset"]),
+    ("css selector", "input:checked", ["remember"]),
+    ("css selector", "button:disabled", ["submit"]),
+    ("css selector", "input:enabled:not(.required):not([type=checkbox])", ["pass"]),
+    ("css selector", "p:empty", ["p"]),
+    # XPath: paths, predicates and functions
+    ("xpath", "//input[@id='user']", ["user"]),
+    ("xpath", "/form/input", ["user", "pass", "remember"]),
+    ("xpath", "//form/*[2]", ["user"]),
+    ("xpath", "//li[last()]/span", ["note"]),
+    ("xpath", "//button[.='Log in']", ["submit"]),
+    ("xpath", "//button[text()='Log']", ["submit"]),
+    ("xpath", "//a[normalize-space()='Need help?']", ["help"]),
+    ("xpath", "//a[contains(@href, 'set')]", ["reset"]),
+    ("xpath", "//a[starts-with(text(), 'Reset')]", ["reset"]),
+    ("xpath", "//input[@type='text' or @type='password']", ["user", "pass"]),
+    ("xpath", "//input[@name and not(@data-test)]", ["user"]),
+    ("xpath", "//input[@type!='checkbox']", ["user", "pass"]),
+    ("xpath", "//h1 | //button", ["title", "submit"]),
+    ("xpath", ".//ul//a[2]", []),
+    ("xpath", "//a[@id='fake']", []), # Script text is not markup
+])
+def test_supported_selectors(index, strategy, value, expected):
+    assert ids(index.find(strategy, value)) == expected
+
+
+@pytest.mark.parametrize("strategy, value", [
+    ("class name", "field required"),
+    ("tag name", "title"),
+    ("css selector", "input:hover"),
+    ("css selector", "li:nth-child(2n+1)"),
+    ("css selector", "form:not(div > p)"),
+    ("css selector", "a\\:b"),
+    ("css selector", "body #login"),
+    ("css selector", "form >"),
+    ("xpath", "//input/following-sibling::button"),
+    ("xpath", "//input[position()>1]"),
+    ("xpath", "input"),
+    ("xpath", "//head/title"),
+    ("xpath", "//a[contains(translate(., 'A', 'a'), 'help')]"),
+    ("link", "anything"),
+])
+def test_unsupported_selectors_raise(index, strategy, value):
+    with pytest.raises(UnsupportedSelector):
+        index.find(strategy, value)
+
+
+def _script(body):
+    return textwrap.dedent('''
+        from selenium.webdriver.common.by import By
+        from selenium.common.exceptions import NoSuchElementException
+        from selenium.webdriver.support import expected_conditions as EC
+
+        BASE_URL = "https://example.test"
+
+        def test_tc001(driver, test_case_data):
+    ''') + textwrap.indent(textwrap.dedent(body), "    ")
+
+
+def _statuses(script):
+    report = verify_selectors(script, HTML, PAGE_URL)
+    return [(locator['value'], locator['status']) for locator in report['functions']['test_tc001']]
+
+
+def test_found_and_missing_on_the_scraped_page():
+    script = _script('''
+        driver.get(BASE_URL + "/login")
+        driver.find_element(By.ID, "user").send_keys("a")
+        driver.find_element(By.CSS_SELECTOR, "#login .missing")
+    ''')
+    assert _statuses(script) == [("user", "found"), ("#login .missing", "missing")]
+    assert list(missing_selectors(verify_selectors(script, HTML, PAGE_URL))) == ["test_tc001"]
+
+
+@pytest.mark.parametrize("locator", [
+    'By.CSS_SELECTOR, "input:hover"',
+    'By.XPATH, "//input/following-sibling::button"',
+    'By.CLASS_NAME, "field required"',
+])
+def test_unsupported_is_unverified_never_missing(locator):
+    script = _script(f'''
+        driver.get("{PAGE_URL}")
+        driver.find_element({locator})
+    ''')
+    report = verify_selectors(script, HTML, PAGE_URL)
+    [checked] = report['functions']['test_tc001']
+    assert checked['status'] == "unverified"
+    assert checked['reason']
+    assert missing_selectors(report) == {}
+
+
+@pytest.mark.parametrize("body", [
+    # Not known to be on the scraped page yet, or navigated/re-rendered since
+    'driver.find_element(By.ID, "gone")',
+    'driver.get("https://example.test/other")\ndriver.find_element(By.ID, "gone")',
+    f'driver.get("{PAGE_URL}")\ndriver.find_element(By.ID, "submit").click()\ndriver.find_element(By.ID, "gone")',
+    f'driver.get("{PAGE_URL}")\ndriver.find_element(By.ID, "pass").send_keys("x" + Keys.ENTER)\ndriver.find_element(By.ID, "gone")',
+    # Absence is what the script expects
+    f'driver.get("{PAGE_URL}")\nWebDriverWait(driver, 5).until(EC.invisibility_of_element_located((By.ID, "gone")))',
+    f'driver.get("{PAGE_URL}")\nassert not driver.find_elements(By.ID, "gone")',
+    f'driver.get("{PAGE_URL}")\ntry:\n    driver.find_element(By.ID, "gone")\nexcept NoSuchElementException:\n    pass',
+])
+def test_absent_locator_is_not_dead_when_the_page_may_differ(body):
+    statuses = dict(_statuses(_script(body)))
+    assert statuses["gone"] == "unverified"
+
+
+def test_locators_passed_through_helpers_are_checked():
+    script = _script(f'''
+        driver.get("{PAGE_URL}")
+        fill(driver, "username", "a")
+        fill(driver, "nickname", "b")
+    ''') + textwrap.dedent('''
+
+        def fill(driver, field, value):
+            driver.find_element(By.NAME, field).send_keys(value)
+    ''')
+    assert _statuses(script) == [("username", "found"), ("nickname", "missing")]
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+import testcase_utils
+
+
+def case(test_id, **fields):
+    test_case = {
+        'id': test_id, 'description': f"checks {test_id}", 'test_type': "Functional",
+        'expected_outcome': "works", 'preconditions': ["logged out"], 'steps': ["open", "submit"],
+    }
+    test_case.update(fields)
+    return test_case
+
+
+@pytest.fixture
+def suite():
+    return testcase_utils.TestCaseSet.from_test_cases([case("TC1"), case("TC2", priority="high"), case("TC3")])
+
+
+def ids(test_cases):
+    return [record.id for record in test_cases.records]
+
+
+def test_from_test_case_matches_its_unedited_editor_row():
+    generated = case("TC1", priority="high", tags=["smoke"])
+    record = testcase_utils.TestCase.from_test_case(generated, 1)
+    assert record.to_dict() == generated
+    assert record.editor_row()['steps_edit'] == "open\nsubmit"
+    assert testcase_utils.TestCase.from_editor_row(record.editor_row(), 1).to_dict() == generated
+
+
+def test_from_test_case_fills_defaults_and_blanks_non_list_fields():
+    record = testcase_utils.TestCase.from_test_case({'steps': "not a list", 'preconditions': None}, 4)
+    assert record.to_dict() == {
+        'id': "TC_AutoGen_ID_4", 'description': "N/A", 'test_type': "Functional", 'expected_outcome': "N/A",
+        'preconditions': [], 'steps': [],
+    }
+
+
+def test_records_are_immutable(suite):
+    with pytest.raises(AttributeError):
+        suite.records[0].description = "changed"
+
+
+def test_no_deltas_returns_the_same_suite(suite):
+    assert testcase_utils.apply_editor_deltas(suite, {}) is suite
+    assert testcase_utils.apply_editor_deltas(suite, {'edited_rows': {}, 'deleted_rows': [], 'added_rows': []}) is suite
+
+
+def test_edit_then_delete_then_add_by_original_positions(suite):
+    deltas = {
+        'edited_rows': {"2": {'description': "edited TC3"}, 0: {'steps_edit': "a\n\n  b  \n"}},
+        'deleted_rows': [0],
+        'added_rows': [{'description': "new one", 'steps_edit': "x"}],
+    }
+    edited = testcase_utils.apply_editor_deltas(suite, deltas)
+    # Row indexes refer to the suite before the change: the edit to row 0 is deleted with it
+    assert ids(edited) == ["TC2", "TC3", "TC_AutoGen_ID_3"]
+    assert edited.records[1].description == "edited TC3"
+    assert edited.records[2].to_dict()['steps'] == ["x"]
+    assert edited.records[0] is suite.records[1] # Untouched rows are reused, not rebuilt
+    assert ids(suite) == ["TC1", "TC2", "TC3"] # The original version is unchanged
+
+
+def test_edits_outside_the_suite_are_ignored(suite):
+    edited = testcase_utils.apply_editor_deltas(suite, {'edited_rows': {"7": {'description': "nowhere"}}})
+    assert edited.to_dicts() == suite.to_dicts()
+
+
+def test_hidden_columns_survive_edits(suite):
+    edited = testcase_utils.apply_editor_deltas(suite, {'edited_rows': {"1": {'steps_edit': "only step"}}})
+    assert edited.records[1].to_dict() == case("TC2", priority="high", steps=["only step"])
+
+
+def test_hidden_columns_can_be_edited_and_added(suite):
+    edited = testcase_utils.apply_editor_deltas(suite, {
+        'edited_rows': {"1": {'priority': "low", 'owner': "qa"}},
+        'added_rows': [{'id': "TC9", 'steps_edit': "go", 'priority': "high", 'extra_edit': "dropped"}],
+    })
+    assert edited.records[1].to_dict()['priority'] == "low"
+    assert edited.records[1].to_dict()['owner'] == "qa"
+    added = edited.records[3].to_dict()
+    assert added['priority'] == "high"
+    assert 'extra_edit' not in added # Editor-only columns never become test case fields
+
+
+def test_edited_list_columns_are_split_into_lines(suite):
+    edited = testcase_utils.apply_editor_deltas(suite, {'edited_rows': {"0": {'preconditions_edit': " a \n\nb"}}})
+    assert edited.records[0].to_dict()['preconditions'] == ["a", "b"]
+
+
+def test_to_json_matches_json_dumps(suite):
+    edited = testcase_utils.apply_editor_deltas(suite, {'edited_rows': {"0": {'description': 'quote " and ü'}}})
+    assert edited.to_json() == json.dumps(edited.to_dicts(), indent=4)
+    assert testcase_utils.TestCaseSet([]).to_json() == "[]"
+
+
+def test_views_are_shared_across_sessions_but_rows_are_copies():
+    cases = [case("TC1"), case("TC2")]
+    first = testcase_utils.TestCaseSet.from_test_cases(cases)
+    second = testcase_utils.TestCaseSet.from_test_cases(json.loads(json.dumps(cases))) # Another session, same content
+    assert first.content_hash() == second.content_hash()
+    assert first.to_json() is second.to_json() # One memoized string for both
+
+    rows = first.editor_rows()
+    rows[0]['description'] = "changed by st.data_editor"
+    rows.append({'id': "TC3"})
+    assert second.editor_rows() == [record.editor_row() for record in second.records]
+
+
+def test_different_content_gets_its_own_view(suite):
+    edited = testcase_utils.apply_editor_deltas(suite, {'edited_rows': {"0": {'description': "other"}}})
+    assert edited.content_hash() != suite.content_hash()
+    assert edited.editor_rows()[0]['description'] == "other"
+    assert suite.editor_rows()[0]['description'] == "checks TC1"
+
+
+def test_load_test_cases_json_returns_fresh_copies():
+    text = json.dumps([case("TC1")])
+    first = testcase_utils.load_test_cases_json(text)
+    first[0]['id'] = "changed"
+    assert testcase_utils.load_test_cases_json(text)[0]['id'] == "TC1"
+    assert testcase_utils.load_test_cases_json("not json") is None